@@ -36,16 +36,30 @@ REVENUES_CATEGORIES = {
     }
 
 
-def init_country(qt = False):  # drop_survey_only_variables = False, simulate_f6de = False, start_from = 'imposable'
-    """Create a country-specific TaxBenefitSystem."""
+def init_country(qt = False, lazy = False, use_legislation_snapshot = False):
+    # drop_survey_only_variables = False, simulate_f6de = False, start_from = 'imposable'
+    """Create a country-specific TaxBenefitSystem.
+
+    When lazy is True, the formulas modules are imported only when one of their variables is requested.
+    When use_legislation_snapshot is True, the preprocessed legislation is saved after its first parsing and reloaded
+    from this snapshot by the next processes. The snapshots are stored in the cache directory of the user (see
+    legislation_snapshots.py).
+    """
+    import importlib
     # from openfisca_core.columns import FloatCol
-    from openfisca_core.taxbenefitsystems import LegacyTaxBenefitSystem
+    from openfisca_core import legislations, legislationsxml, taxbenefitsystems
+    from openfisca_core.taxbenefitsystems import AbstractTaxBenefitSystem, LegacyTaxBenefitSystem
     if qt:
         from openfisca_qt import widgets as qt_widgets
 
-    from . import decompositions, entities, scenarios
+    from . import decompositions, entities, legislation_snapshots, scenarios
     from .model import datatrees
-    from .model import model  # Load output variables into entities. # noqa analysis:ignore
+    from .model import lazy_loading
+    if lazy:
+        for module_name in lazy_loading.eager_module_names:
+            importlib.import_module(module_name)
+    else:
+        from .model import model  # Load output variables into entities. # noqa analysis:ignore
     from .model.prelevements_obligatoires.prelevements_sociaux.cotisations_sociales import preprocessing
     if qt:
         from .widgets.Composition import CompositionWidget
@@ -96,6 +110,32 @@ def init_country(qt = False):  # drop_survey_only_variables = False, simulate_f6
         REVENUES_CATEGORIES = REVENUES_CATEGORIES
         Scenario = scenarios.Scenario
 
+        def __init__(self):
+            # The snapshot depends on the parameters, on their conversion to JSON and on their preprocessing.
+            snapshot_source_file_paths = [self.legislation_xml_file_path] + [
+                legislation_snapshots.get_module_source_file_path(module)
+                for module in (legislations, legislationsxml, preprocessing, taxbenefitsystems)
+                ]
+            legislation_json = legislation_snapshots.load_legislation_json(snapshot_source_file_paths) \
+                if use_legislation_snapshot else None
+            if legislation_json is None:
+                super(TaxBenefitSystem, self).__init__()
+                if use_legislation_snapshot:
+                    legislation_snapshots.save_legislation_json(snapshot_source_file_paths, self.legislation_json)
+            else:
+                # Skip the parsing and preprocessing of the XML parameters done by LegacyTaxBenefitSystem.
+                AbstractTaxBenefitSystem.__init__(
+                    self,
+                    entity_class_by_key_plural = self.entity_class_by_key_plural,
+                    legislation_json = legislation_json,
+                    )
+            if lazy:
+                column_by_name = lazy_loading.LazyColumnByName(self.column_by_name)
+                column_by_name.entity_classes = entities.entity_class_by_symbol.values()
+                column_by_name.module_name_by_column_name = lazy_loading.load_manifest()
+                column_by_name.update_from_entity_classes()
+                self.column_by_name = column_by_name
+
         def prefill_cache(self):
             # Compute one "zone APL" variable, to pre-load CSV of "code INSEE commune" to "Zone APL".
             from .model.prestations import aides_logement
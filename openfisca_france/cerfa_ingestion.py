@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+
+
+# OpenFisca -- A versatile microsimulation software
+# By: OpenFisca Team <contact@openfisca.fr>
+#
+# Copyright (C) 2011, 2012, 2013, 2014, 2015 OpenFisca Team
+# https://github.com/openfisca
+#
+# This file is part of OpenFisca.
+#
+# OpenFisca is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# OpenFisca is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Bulk ingestion of income tax declarations, given as a flat file with one row per foyer fiscal.
+
+The columns of the file are named by CERFA codes (1AJ, 2DC, 7UF, etc.). Each code is resolved, through an index built
+once from the cerfa_field of the columns, to a variable of the foyer fiscal or of one of its persons. The persons of
+each foyer are given by the section 0 of the declaration:
+
+- 0DA and 0DB: birth years of the declarants (no spouse when 0DB is empty);
+- 0F0, 0F1, etc.: birth years of the persons à charge (in the order of the roles pac1, pac2, etc.);
+- 0AM, 0AO, 0AD, 0AC, 0AV: marital status of the declarants (married, pacsed, divorced, single, widowed);
+- 0AE, 0AF, 0AG, 0AK, 0AL, 0AN, 0AP, 0AS, 0AW, 0BT, 0CR, 0DN: cases of the quotient familial.
+
+Each foyer fiscal is also a famille and a ménage, with the same persons. The boxes of a missing person are ignored.
+The holders are filled directly with whole arrays, without building a test case per foyer:
+
+    array_by_code = read_declarations(u'declarations.csv')
+    simulation = new_simulation_from_declarations(tax_benefit_system, array_by_code, 2014)
+    irpp = simulation.calculate('irpp')
+"""
+
+
+import csv
+import logging
+
+import numpy as np
+from openfisca_core import periods
+
+from . import entities
+from .microsimulation import new_chunk_simulation
+from .sparse_inputs import SparseInputStore
+
+
+__all__ = [
+    'build_cerfa_index',
+    'new_simulation_from_declarations',
+    'read_declarations',
+    ]
+
+log = logging.getLogger(__name__)
+birth_codes = ('0DA', '0DB')
+# Section 0 codes of the cases, which have a single letter as cerfa_field.
+section_0_column_name_by_code = {
+    '0AE': 'caseE',
+    '0AF': 'caseF',
+    '0AG': 'caseG',
+    '0AK': 'caseK',
+    '0AL': 'caseL',
+    '0AN': 'caseN',
+    '0AP': 'caseP',
+    '0AS': 'caseS',
+    '0AW': 'caseW',
+    '0BT': 'caseT',
+    '0CR': 'nbR',
+    '0DN': 'nbN',
+    }
+# Boxes of the marital status, in the order used when several are checked
+statmarit_code_and_label_couples = [
+    ('0AM', u"Marié"),
+    ('0AO', u"Pacsé"),
+    ('0AD', u"Divorcé"),
+    ('0AC', u"Célibataire"),
+    ('0AV', u"Veuf"),
+    ]
+
+
+def build_cerfa_index(tax_benefit_system, period):
+    """Return the column name and the QUIFOY role (None for a variable of the foyer) of each CERFA code at period."""
+    period = periods.period(period)
+    start_date = period.start.date
+    stop_date = period.stop.date
+    index = {}
+    for column_name, column in sorted(tax_benefit_system.column_by_name.iteritems()):
+        cerfa_field = column.cerfa_field
+        if cerfa_field is None:
+            continue
+        if column.start is not None and column.start > stop_date or column.end is not None and column.end < start_date:
+            continue
+        if isinstance(cerfa_field, dict):
+            role_by_code = dict((code.upper(), role) for role, code in cerfa_field.iteritems())
+        elif len(cerfa_field) > 1:
+            role_by_code = {cerfa_field.upper(): None}
+        else:
+            continue  # Case of section 0, see section_0_column_name_by_code.
+        for code, role in role_by_code.iteritems():
+            if code in index:
+                log.warning(u'CERFA code {} of column {} is already used by column {}; ignoring it'.format(code,
+                    column_name, index[code][0]))
+                continue
+            index[code] = (column_name, role)
+    for code, column_name in section_0_column_name_by_code.iteritems():
+        if column_name in tax_benefit_system.column_by_name:
+            index[code] = (column_name, None)
+    return index
+
+
+def new_simulation_from_declarations(tax_benefit_system, array_by_code, period, cerfa_index = None, sparse = False):
+    """Return a simulation with one foyer fiscal (and one famille and ménage) per row of the declarations.
+
+    array_by_code gives the arrays of the declarations, one per CERFA code, each with one row per foyer. When sparse is
+    True, the CERFA boxes are stored by a SparseInputStore.
+    """
+    period = periods.period(period)
+    if cerfa_index is None:
+        cerfa_index = build_cerfa_index(tax_benefit_system, period)
+    foyers_count = len(array_by_code[birth_codes[0]])
+
+    # Persons: the 2 declarants, then the persons à charge. Their role is the same in every entity.
+    pac_codes = sorted(code for code in array_by_code if code.startswith('0F'))
+    assert len(pac_codes) <= 9, u'Too many persons à charge: {}'.format(u', '.join(pac_codes))
+    birth_years_matrix = np.column_stack([
+        np.asarray(array_by_code[code]) if code in array_by_code else np.zeros(foyers_count)
+        for code in birth_codes + tuple(pac_codes)
+        ]).astype(np.int64)
+    present_matrix = birth_years_matrix > 0
+    present_matrix[:, 0] = True
+    foyer_index_array = np.repeat(np.arange(foyers_count), present_matrix.shape[1]).reshape(present_matrix.shape)[
+        present_matrix]
+    role_matrix = np.tile(np.arange(present_matrix.shape[1]), foyers_count).reshape(present_matrix.shape)
+    role_matrix[:, 2:] = 1 + np.cumsum(present_matrix[:, 2:], axis = 1)  # pac1, pac2, etc. without gaps
+    role_array = role_matrix[present_matrix]
+    birth_years = birth_years_matrix[present_matrix]
+    birth_years[birth_years <= 0] = tax_benefit_system.column_by_name['birth'].default.year
+    array_by_name = dict(birth = (birth_years - 1970).astype('datetime64[Y]').astype('datetime64[D]'))
+    for entity_class in entities.entity_class_by_key_plural.itervalues():
+        if not getattr(entity_class, 'is_persons_entity', False):
+            array_by_name[entity_class.index_for_person_variable_name] = foyer_index_array
+            array_by_name[entity_class.role_for_person_variable_name] = role_array
+    simulation = new_chunk_simulation(tax_benefit_system, array_by_name, period)[0]
+    persons_count = len(role_array)
+    sparse_input_store = SparseInputStore(simulation) if sparse else None
+
+    # Marital status of the declarants
+    statmarit_column = tax_benefit_system.column_by_name['statmarit']
+    statmarit = np.empty(foyers_count, dtype = statmarit_column.dtype)
+    statmarit.fill(statmarit_column.default)
+    for code, label in reversed(statmarit_code_and_label_couples):
+        if code in array_by_code:
+            statmarit[np.asarray(array_by_code[code]) != 0] = statmarit_column.enum[label]
+    persons_statmarit = np.empty(persons_count, dtype = statmarit_column.dtype)
+    persons_statmarit.fill(statmarit_column.default)
+    declarants = role_array <= 1
+    persons_statmarit[declarants] = statmarit[foyer_index_array[declarants]]
+    simulation.get_or_new_holder('statmarit').array = persons_statmarit
+
+    # CERFA boxes
+    array_by_column_name = {}
+    section_0_codes = set(birth_codes + tuple(pac_codes))
+    section_0_codes.update(code for code, label in statmarit_code_and_label_couples)
+    unknown_codes = []
+    for code, values in sorted(array_by_code.iteritems()):
+        if code in section_0_codes:
+            continue
+        column_name, role = cerfa_index.get(code, (None, None))
+        if column_name is None:
+            unknown_codes.append(code)
+            continue
+        column = tax_benefit_system.column_by_name[column_name]
+        values = np.asarray(values)
+        if column.dtype == np.bool:
+            values = values != 0
+        if role is None:
+            array_by_column_name[column_name] = values.astype(column.dtype)
+            continue
+        array = array_by_column_name.get(column_name)
+        if array is None:
+            array = array_by_column_name[column_name] = np.empty(persons_count, dtype = column.dtype)
+            array.fill(column.default)
+        persons = role_array == role
+        array[persons] = values[foyer_index_array[persons]]
+    if unknown_codes:
+        log.warning(u'Ignoring unknown CERFA codes: {}'.format(u', '.join(unknown_codes)))
+    for column_name, array in array_by_column_name.iteritems():
+        if sparse_input_store is None:
+            simulation.get_or_new_holder(column_name).set_array(period, array)
+        else:
+            sparse_input_store.set_dense_input(column_name, period, array)
+    return simulation
+
+
+def read_declarations(file_path, delimiter = ','):
+    """Return the arrays of a CSV file of declarations, whose header gives the CERFA codes. Empty cells are 0."""
+    with open(file_path, 'rb') as csv_file:
+        reader = csv.reader(csv_file, delimiter = delimiter)
+        codes = [code.strip().upper() for code in reader.next()]
+        rows = list(reader)
+    return dict(
+        (code, np.array([float(cell) if cell.strip() else 0 for cell in cells]))
+        for code, cells in zip(codes, zip(*rows) if rows else [[]] * len(codes))
+        )
@@ -0,0 +1,424 @@
+# -*- coding: utf-8 -*-
+
+
+# OpenFisca -- A versatile microsimulation software
+# By: OpenFisca Team <contact@openfisca.fr>
+#
+# Copyright (C) 2011, 2012, 2013, 2014, 2015 OpenFisca Team
+# https://github.com/openfisca
+#
+# This file is part of OpenFisca.
+#
+# OpenFisca is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# OpenFisca is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""Dependency graph of the variables, recorded by tracing a simulation, and evaluation plans derived from it.
+
+Formulas request their inputs imperatively, so the graph is recorded by computing the targets on a (small) simulation:
+each (variable, period) computed while another one is being computed is one of its dependencies. The graph only
+contains the branches taken by the traced simulation.
+
+The graph recorded on a small case can then drive the computation of a large one:
+
+    graph = record_dependency_graph(small_simulation, ['revdisp'])
+    evaluator = ReleasingEvaluator(large_simulation, graph)
+    revdisp, = evaluator.calculate(['revdisp'])
+    print evaluator.peak_resident_bytes
+"""
+
+
+import collections
+import json
+import logging
+import multiprocessing
+import Queue
+import threading
+import time
+
+from openfisca_core import periods
+
+from .profiling import SimulationProfiler
+
+
+log = logging.getLogger(__name__)
+
+
+__all__ = [
+    'DependencyGraph',
+    'ParallelEvaluator',
+    'record_dependency_graph',
+    'ReleasingEvaluator',
+    ]
+
+
+class DependencyGraph(object):
+    dependencies_by_key = None  # Dependencies of each (variable name, period) key, in order of first request
+
+    def __init__(self, dependencies_by_key = None):
+        self.dependencies_by_key = dependencies_by_key if dependencies_by_key is not None \
+            else collections.OrderedDict()
+
+    def add_dependency(self, key, dependency_key):
+        dependencies = self.dependencies_by_key.setdefault(key, [])
+        self.dependencies_by_key.setdefault(dependency_key, [])
+        if dependency_key != key and dependency_key not in dependencies:
+            dependencies.append(dependency_key)
+
+    def evaluation_plan(self, target_keys):
+        """Return the keys needed by the targets, each one after its dependencies."""
+        plan = []
+        state_by_key = {}  # 1 = being visited (cycles are ignored), 2 = visited
+        for target_key in target_keys:
+            if state_by_key.get(target_key):
+                continue
+            state_by_key[target_key] = 1
+            # Iterative depth-first search, to support deep graphs.
+            stack = [(target_key, iter(self.dependencies_by_key.get(target_key, [])))]
+            while stack:
+                key, dependencies_iterator = stack[-1]
+                for dependency_key in dependencies_iterator:
+                    if not state_by_key.get(dependency_key):
+                        state_by_key[dependency_key] = 1
+                        stack.append((dependency_key, iter(self.dependencies_by_key.get(dependency_key, []))))
+                        break
+                else:
+                    stack.pop()
+                    state_by_key[key] = 2
+                    plan.append(key)
+        return plan
+
+    def iter_levels(self, target_keys):
+        """Yield lists of keys which only depend on keys of previous lists, and can be computed in parallel."""
+        level_by_key = {}
+        plan = self.evaluation_plan(target_keys)
+        for key in plan:
+            level_by_key[key] = max([
+                level_by_key[dependency_key] + 1
+                for dependency_key in self.dependencies_by_key.get(key, [])
+                if dependency_key in level_by_key
+                ] or [0])
+        keys_by_level = collections.defaultdict(list)
+        for key in plan:
+            keys_by_level[level_by_key[key]].append(key)
+        for level in sorted(keys_by_level):
+            yield keys_by_level[level]
+
+    def last_consumer_index_by_key(self, plan):
+        """Return the index in plan of the last key depending on each key of plan."""
+        index_by_key = {}
+        for index, key in enumerate(plan):
+            for dependency_key in self.dependencies_by_key.get(key, []):
+                index_by_key[dependency_key] = index
+        return index_by_key
+
+    @classmethod
+    def from_profiler(cls, profiler):
+        self = cls()
+        for stack in profiler.exclusive_duration_by_stack:
+            if len(stack) == 1:
+                self.dependencies_by_key.setdefault(stack[0], [])
+            for key, dependency_key in zip(stack[:-1], stack[1:]):
+                self.add_dependency(key, dependency_key)
+        return self
+
+    @classmethod
+    def from_json(cls, graph_json):
+        return cls(collections.OrderedDict(
+            ((node['variable'], node['period']), [
+                (dependency['variable'], dependency['period'])
+                for dependency in node['dependencies']
+                ])
+            for node in graph_json['nodes']
+            ))
+
+    def to_json(self):
+        return collections.OrderedDict((
+            ('nodes', [
+                collections.OrderedDict((
+                    ('variable', variable_name),
+                    ('period', period),
+                    ('dependencies', [
+                        collections.OrderedDict((('variable', dependency_name), ('period', dependency_period)))
+                        for dependency_name, dependency_period in dependencies
+                        ]),
+                    ))
+                for (variable_name, period), dependencies in self.dependencies_by_key.iteritems()
+                ]),
+            ))
+
+    def write_dot(self, output_file):
+        output_file.write('digraph dependencies {\n')
+        for key, dependencies in self.dependencies_by_key.iteritems():
+            for dependency_key in dependencies:
+                output_file.write(u'  "{}@{}" -> "{}@{}";\n'.format(key[0], key[1], dependency_key[0],
+                    dependency_key[1]).encode('utf-8'))
+        output_file.write('}\n')
+
+    def write_json(self, output_file):
+        json.dump(self.to_json(), output_file, indent = 2)
+
+
+def unwrap_holders_compute(simulation):
+    simulation.__dict__.pop('get_or_new_holder', None)
+    for holder in simulation.holder_by_name.itervalues():
+        holder.__dict__.pop('compute', None)
+
+
+def wrap_holders_compute(simulation, wrap_compute, lock = None):
+    """Replace the compute method of the holders of simulation, including the holders created later.
+
+    wrap_compute(holder, compute) returns the new method. When given, lock protects the creation of the holders.
+    """
+    def wrap_holder(holder):
+        if 'compute' not in holder.__dict__:
+            holder.compute = wrap_compute(holder, holder.compute)
+        return holder
+
+    get_or_new_holder = simulation.get_or_new_holder
+    if lock is None:
+        def wrapping_get_or_new_holder(column_name):
+            return wrap_holder(get_or_new_holder(column_name))
+    else:
+        def wrapping_get_or_new_holder(column_name):
+            with lock:
+                return wrap_holder(get_or_new_holder(column_name))
+
+    for holder in simulation.holder_by_name.itervalues():
+        wrap_holder(holder)
+    simulation.get_or_new_holder = wrapping_get_or_new_holder
+
+
+def record_dependency_graph(simulation, variables_name, period = None, legislation_index = None):
+    """Compute the given variables on simulation and return the graph of the computations done.
+
+    When given, legislation_index records at the same time the parameters read by each variable.
+    """
+    profiler = SimulationProfiler()
+    profiler.attach(simulation)
+    if legislation_index is not None:
+        legislation_index.attach(simulation, profiler.stack)
+    try:
+        for variable_name in variables_name:
+            simulation.calculate(variable_name, period)
+    finally:
+        profiler.detach(simulation)
+        if legislation_index is not None:
+            legislation_index.detach(simulation)
+    return DependencyGraph.from_profiler(profiler)
+
+
+class LockTimeout(Exception):
+    pass
+
+
+class ParallelEvaluator(object):
+    """Compute variables on a pool of threads, evaluating concurrently the branches which are independent in the graph.
+
+    Each (variable, period) of the plan is scheduled as soon as its dependencies are computed. NumPy releases the GIL
+    in most operations on large arrays, so the branches (income tax, social contributions, benefits, etc) overlap on
+    large simulations. A lock per variable ensures that it is never computed twice, even when it is requested for
+    different periods leading to the same computation (for example a month and the year containing it). The arrays
+    already computed are read without this lock. Simulations in debug or trace mode are not supported.
+
+    When the graph misses a dependency, two threads may each hold the lock of a variable needed by the other one. A
+    thread waiting for a lock longer than lock_timeout seconds gives up, the remaining plan is abandoned and the
+    variables are computed sequentially.
+    """
+    graph = None
+    lock_timeout = None
+    sequential_fallback = False  # Whether the last calculation fell back to a sequential evaluation
+    simulation = None
+    threads = None
+
+    def __init__(self, simulation, graph, threads = None, lock_timeout = 10):
+        self.graph = graph
+        self.lock_timeout = lock_timeout
+        self.simulation = simulation
+        self.threads = threads or multiprocessing.cpu_count()
+
+    def calculate(self, variables_name, period = None):
+        """Compute the variables and return their arrays."""
+        simulation = self.simulation
+        self.sequential_fallback = False
+        if period is None:
+            period = simulation.period
+        target_keys = [(variable_name, unicode(period)) for variable_name in variables_name]
+        plan = self.graph.evaluation_plan(target_keys)
+        if not plan:
+            # No worker would ever be stopped.
+            return []
+        plan_keys = set(plan)
+        consumers_by_key = collections.defaultdict(list)
+        remaining_dependencies_by_key = {}
+        for key in plan:
+            remaining_dependencies_by_key[key] = dependencies = set(
+                dependency_key
+                for dependency_key in self.graph.dependencies_by_key.get(key, [])
+                if dependency_key in plan_keys and dependency_key != key
+                )
+            for dependency_key in dependencies:
+                consumers_by_key[dependency_key].append(key)
+
+        lock = threading.RLock()
+        lock_by_variable_name = collections.defaultdict(threading.RLock)
+
+        def wrap_compute(holder, compute):
+            def locking_compute(period = None, **parameters):
+                if holder.get_array(period if period is not None else simulation.period) is not None:
+                    return compute(period = period, **parameters)
+                with lock:
+                    variable_lock = lock_by_variable_name[holder.column.name]
+                # RLock.acquire has no timeout in Python 2.
+                deadline = time.time() + self.lock_timeout
+                while not variable_lock.acquire(False):
+                    if time.time() > deadline:
+                        raise LockTimeout(holder.column.name)
+                    time.sleep(0.001)
+                try:
+                    return compute(period = period, **parameters)
+                finally:
+                    variable_lock.release()
+
+            return locking_compute
+
+        ready_keys = Queue.Queue()
+        for key in plan:
+            if not remaining_dependencies_by_key[key]:
+                ready_keys.put(key)
+        computed_count = [0]
+
+        def work():
+            while True:
+                key = ready_keys.get()
+                if key is None:
+                    return
+                variable_name, key_period = key
+                if not self.sequential_fallback:
+                    try:
+                        simulation.get_or_new_holder(variable_name).compute(period = periods.period(key_period))
+                    except LockTimeout as exc:
+                        log.warning(u'Parallel computation of {}@{} timed out waiting for variable {}, probably '
+                            u'missing from the graph: falling back to sequential computation'.format(variable_name,
+                            key_period, exc.args[0]))
+                        self.sequential_fallback = True
+                    except Exception:
+                        # The final sequential calculation computes it again and raises the error, if any.
+                        log.debug(u'Parallel computation of {}@{} failed'.format(variable_name, key_period),
+                            exc_info = True)
+                with lock:
+                    for consumer_key in consumers_by_key.get(key, []):
+                        dependencies = remaining_dependencies_by_key[consumer_key]
+                        dependencies.discard(key)
+                        if not dependencies:
+                            ready_keys.put(consumer_key)
+                    computed_count[0] += 1
+                    if computed_count[0] == len(plan):
+                        for index in range(self.threads):
+                            ready_keys.put(None)
+
+        wrap_holders_compute(simulation, wrap_compute, lock = lock)
+        try:
+            workers = [
+                threading.Thread(target = work)
+                for index in range(self.threads)
+                ]
+            for worker in workers:
+                worker.daemon = True
+                worker.start()
+            for worker in workers:
+                worker.join()
+        finally:
+            unwrap_holders_compute(simulation)
+        return [
+            simulation.calculate(variable_name, period)
+            for variable_name in variables_name
+            ]
+
+
+class ReleasingEvaluator(object):
+    """Compute variables, dropping each intermediate array as soon as all its consumers in the graph are computed.
+
+    The arrays present before the evaluation (the input variables) and the arrays of the requested variables are kept.
+    An array dropped too early, because a consumer took a branch absent from the graph, is only computed again.
+    """
+    graph = None
+    kept_keys = None
+    peak_resident_bytes = 0  # Maximum of resident_bytes during the evaluations
+    released_arrays_count = 0
+    resident_bytes = 0  # Size of the arrays of the holders
+    simulation = None
+
+    def __init__(self, simulation, graph):
+        self.graph = graph
+        self.simulation = simulation
+
+    def calculate(self, variables_name, period = None):
+        """Compute the variables and return their arrays."""
+        simulation = self.simulation
+        if period is None:
+            period = simulation.period
+        target_keys = [(variable_name, unicode(period)) for variable_name in variables_name]
+        self.kept_keys = set(target_keys)
+        self.resident_bytes = 0
+        for holder in simulation.holder_by_name.itervalues():
+            if holder._array is not None:
+                self.resident_bytes += holder._array.nbytes
+            for array_period, array in (holder._array_by_period or {}).iteritems():
+                self.kept_keys.add((holder.column.name, unicode(array_period)))
+                self.resident_bytes += array.nbytes
+        self.peak_resident_bytes = self.resident_bytes
+
+        consumers_count_by_key = collections.defaultdict(int)
+        for key in self.graph.evaluation_plan(target_keys):
+            for dependency_key in self.graph.dependencies_by_key.get(key, []):
+                consumers_count_by_key[dependency_key] += 1
+        computed_keys = set()
+
+        def release(key):
+            holder = simulation.holder_by_name.get(key[0])
+            if holder is None or not holder._array_by_period:
+                return
+            for array_period in holder._array_by_period.keys():
+                if unicode(array_period) == key[1]:
+                    self.resident_bytes -= holder._array_by_period.pop(array_period).nbytes
+                    self.released_arrays_count += 1
+
+        def wrap_compute(holder, compute):
+            def releasing_compute(period = None, **parameters):
+                if period is None:
+                    period = simulation.period
+                key = (holder.column.name, unicode(period))
+                cached = holder.get_array(period) is not None
+                dated_holder = compute(period = period, **parameters)
+                if cached or key in computed_keys:
+                    return dated_holder
+                computed_keys.add(key)
+                array = holder.get_array(period)
+                if array is not None:
+                    self.resident_bytes += array.nbytes
+                    self.peak_resident_bytes = max(self.peak_resident_bytes, self.resident_bytes)
+                for dependency_key in self.graph.dependencies_by_key.get(key, []):
+                    consumers_count_by_key[dependency_key] -= 1
+                    if consumers_count_by_key[dependency_key] == 0 and dependency_key not in self.kept_keys:
+                        release(dependency_key)
+                return dated_holder
+
+            return releasing_compute
+
+        wrap_holders_compute(simulation, wrap_compute)
+        try:
+            return [
+                simulation.calculate(variable_name, period)
+                for variable_name in variables_name
+                ]
+        finally:
+            unwrap_holders_compute(simulation)
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+
+
+# OpenFisca -- A versatile microsimulation software
+# By: OpenFisca Team <contact@openfisca.fr>
+#
+# Copyright (C) 2011, 2012, 2013, 2014, 2015 OpenFisca Team
+# https://github.com/openfisca
+#
+# This file is part of OpenFisca.
+#
+# OpenFisca is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# OpenFisca is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Index of the legislation parameters read by each variable.
+
+The index is recorded while computing variables: the nodes returned by simulation.legislation_at are wrapped so that
+each leaf value read is attributed to the variable being computed. Paths are those of the legislation JSON, like
+('children', 'ir', 'children', 'bareme'), so they can be matched with the paths modified by reforms. A barème, or any
+other value which is not a node, is recorded as a whole.
+
+    legislation_index = LegislationIndex()
+    graph = record_dependency_graph(simulation, ['revdisp'], legislation_index = legislation_index)
+    variables_name = set(legislation_index.iter_variables_name(changed_path))
+"""
+
+
+import collections
+
+from openfisca_core.legislations import CompactNode
+
+
+__all__ = [
+    'LegislationIndex',
+    ]
+
+
+class TracingNode(object):
+    """Wrapper of a compact legislation node recording the paths of the leaf values read.
+
+    The wrappers are shared through tracing_node_by_id, so that a node is always wrapped by the same object and caches
+    keyed by node identity keep working.
+    """
+    __slots__ = ('_node', '_path', '_read', '_tracing_node_by_id')
+
+    def __init__(self, node, path, read, tracing_node_by_id):
+        self._node = node
+        self._path = path
+        self._read = read
+        self._tracing_node_by_id = tracing_node_by_id
+
+    def __contains__(self, name):
+        return name in self._node
+
+    def __getattr__(self, name):
+        return self._wrap(name, getattr(self._node, name))
+
+    def __getitem__(self, name):
+        return self._wrap(name, self._node[name])
+
+    def __iter__(self):
+        return iter(self._node)
+
+    def get(self, name, default = None):
+        return self[name] if name in self._node else default
+
+    def iteritems(self):
+        for name, value in self._node.iteritems():
+            yield name, self._wrap(name, value)
+
+    def itervalues(self):
+        for name, value in self._node.iteritems():
+            yield self._wrap(name, value)
+
+    def keys(self):
+        return self._node.keys()
+
+    def _wrap(self, name, value):
+        if callable(value):
+            return value  # A method of the node, not a parameter
+        path = self._path + ('children', name)
+        if isinstance(value, CompactNode):
+            return get_tracing_node(value, path, self._read, self._tracing_node_by_id)
+        self._read(path)
+        return value
+
+
+def get_tracing_node(node, path, read, tracing_node_by_id):
+    """Return the wrapper of node, creating it when node has not been wrapped yet."""
+    tracing_node_and_node = tracing_node_by_id.get(id(node))
+    if tracing_node_and_node is None or tracing_node_and_node[1] is not node:
+        tracing_node_and_node = tracing_node_by_id[id(node)] = (TracingNode(node, path, read, tracing_node_by_id),
+            node)
+    return tracing_node_and_node[0]
+
+
+class LegislationIndex(object):
+    variables_name_by_path = None
+
+    def __init__(self, variables_name_by_path = None):
+        self.variables_name_by_path = variables_name_by_path if variables_name_by_path is not None \
+            else collections.defaultdict(set)
+
+    def attach(self, simulation, stack):
+        """Record the legislation read by the computations of simulation.
+
+        stack is the list of the computations in progress, like the stack of a SimulationProfiler: each item starts with
+        the (variable name, period) key of a computation.
+        """
+        legislation_at = simulation.legislation_at
+
+        def read(path):
+            if stack:
+                self.variables_name_by_path[path].add(stack[-1][0][0])
+
+        tracing_node_by_id = {}
+
+        def tracing_legislation_at(*args, **kwargs):
+            return get_tracing_node(legislation_at(*args, **kwargs), (), read, tracing_node_by_id)
+
+        simulation.legislation_at = tracing_legislation_at
+
+    def detach(self, simulation):
+        simulation.__dict__.pop('legislation_at', None)
+
+    @classmethod
+    def from_json(cls, index_json):
+        self = cls()
+        for item in index_json:
+            self.variables_name_by_path[tuple(item['path'])].update(item['variables'])
+        return self
+
+    def iter_variables_name(self, changed_path):
+        """Yield the names of the variables reading the node at changed_path, one of its parents or children."""
+        changed_path = tuple(changed_path)
+        for path, variables_name in self.variables_name_by_path.iteritems():
+            length = min(len(path), len(changed_path))
+            if path[:length] == changed_path[:length]:
+                for variable_name in variables_name:
+                    yield variable_name
+
+    def to_json(self):
+        return [
+            collections.OrderedDict((
+                ('path', list(path)),
+                ('variables', sorted(variables_name)),
+                ))
+            for path, variables_name in sorted(self.variables_name_by_path.iteritems())
+            ]
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+
+
+# OpenFisca -- A versatile microsimulation software
+# By: OpenFisca Team <contact@openfisca.fr>
+#
+# Copyright (C) 2011, 2012, 2013, 2014, 2015 OpenFisca Team
+# https://github.com/openfisca
+#
+# This file is part of OpenFisca.
+#
+# OpenFisca is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# OpenFisca is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""Snapshots of the preprocessed legislation, to avoid parsing and preprocessing the XML parameters at each startup."""
+
+
+import cPickle
+import hashlib
+import logging
+import os
+import pkg_resources
+import sys
+import tempfile
+
+import numpy as np
+
+
+# Directory of the snapshots, in the cache directory of the user, since the installation directory may be read-only or
+# shared by several versions of Python.
+cache_dir = os.environ.get('OPENFISCA_FRANCE_LEGISLATION_CACHE_DIR') or os.path.join(
+    os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'),
+    'openfisca-france',
+    'legislation',
+    )
+log = logging.getLogger(__name__)
+# Increment when the content of the snapshots changes.
+snapshot_format_version = 2
+
+
+def get_snapshot_file_path(source_file_paths, cache_dir = None):
+    """Return the path of the snapshot built from the given files.
+
+    The name of the file contains a hash of these files and of the versions of Python, NumPy and OpenFisca-Core, so
+    that a change of one of them invalidates the snapshot. Return None when one of these files can't be read.
+    """
+    try:
+        core_version = pkg_resources.get_distribution('OpenFisca-Core').version
+    except pkg_resources.DistributionNotFound:
+        core_version = None
+    sources_hash = hashlib.sha1('{}-{}-{}-{}'.format(snapshot_format_version, sys.version, np.__version__,
+        core_version))
+    try:
+        for source_file_path in source_file_paths:
+            sources_hash.update(source_file_path)
+            with open(source_file_path, 'rb') as source_file:
+                sources_hash.update(source_file.read())
+    except IOError as exc:
+        # For example in a zipped installation
+        log.warning(u'Unable to read the sources of the legislation snapshot: {}'.format(exc))
+        return None
+    return os.path.join(cache_dir or globals()['cache_dir'], 'legislation-{}.pickle'.format(sources_hash.hexdigest()))
+
+
+def get_module_source_file_path(module):
+    """Return the path of the Python source of a module, or of its compiled file when the source is not installed."""
+    source_file_path = os.path.splitext(module.__file__)[0] + '.py'
+    return source_file_path if os.path.exists(source_file_path) else module.__file__
+
+
+def load_legislation_json(source_file_paths, cache_dir = None):
+    """Return the legislation saved by save_legislation_json, or None when it is missing, outdated or unreadable.
+
+    An unreadable snapshot (truncated, corrupted...) is removed, to be rebuilt by the next save_legislation_json.
+    """
+    snapshot_file_path = get_snapshot_file_path(source_file_paths, cache_dir = cache_dir)
+    if snapshot_file_path is None or not os.path.exists(snapshot_file_path):
+        return None
+    try:
+        with open(snapshot_file_path, 'rb') as snapshot_file:
+            return cPickle.load(snapshot_file)
+    except (AttributeError, EOFError, ImportError, IndexError, IOError, cPickle.UnpicklingError, ValueError) as exc:
+        log.error(u'Unable to load legislation snapshot {}: {!r}'.format(snapshot_file_path, exc))
+        try:
+            os.remove(snapshot_file_path)
+        except OSError:
+            pass
+        return None
+
+
+def save_legislation_json(source_file_paths, legislation_json, cache_dir = None):
+    """Save the preprocessed legislation built from the given files. Return the path of the snapshot, or None.
+
+    Failing to write the snapshot (for example in a read-only installation) is not an error.
+    """
+    snapshot_file_path = get_snapshot_file_path(source_file_paths, cache_dir = cache_dir)
+    if snapshot_file_path is None:
+        return None
+    snapshot_dir = os.path.dirname(snapshot_file_path)
+    try:
+        if not os.path.isdir(snapshot_dir):
+            os.makedirs(snapshot_dir)
+        # Write in a temporary file, then rename it, so that a process never loads an incomplete snapshot.
+        file_descriptor, temporary_file_path = tempfile.mkstemp(dir = snapshot_dir, suffix = '.tmp')
+        with os.fdopen(file_descriptor, 'wb') as snapshot_file:
+            cPickle.dump(legislation_json, snapshot_file, cPickle.HIGHEST_PROTOCOL)
+        os.rename(temporary_file_path, snapshot_file_path)
+        # Remove outdated snapshots.
+        for filename in os.listdir(snapshot_dir):
+            file_path = os.path.join(snapshot_dir, filename)
+            if filename.startswith('legislation-') and filename.endswith('.pickle') and file_path != snapshot_file_path:
+                os.remove(file_path)
+    except (IOError, OSError):
+        log.warning(u'Unable to save legislation snapshot into {}'.format(snapshot_dir))
+        return None
+    return snapshot_file_path
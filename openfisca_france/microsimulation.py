@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+
+
+# OpenFisca -- A versatile microsimulation software
+# By: OpenFisca Team <contact@openfisca.fr>
+#
+# Copyright (C) 2011, 2012, 2013, 2014, 2015 OpenFisca Team
+# https://github.com/openfisca
+#
+# This file is part of OpenFisca.
+#
+# OpenFisca is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# OpenFisca is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Chunked microsimulation of populations larger than the memory.
+
+The input dataset is a directory of NumPy files (.npy), one per input variable, each with one row per person. The
+variables of the other entities (familles, foyers fiscaux, ménages) are given on the row of the first person (role 0)
+of the entity, and the persons of an entity must be on contiguous rows (ie the rows are grouped by ménage).
+
+The dataset is read through memory maps, cut between households into chunks of about chunk_size persons, and each
+chunk is computed by a new simulation, possibly in a pool of processes. The requested variables are written
+incrementally into a directory of NumPy files with one row per person or per entity. For each entity other than the
+persons, the file of its index variable (idfam, idfoy, idmen) gives the input identifier of each row.
+
+    save_dataset(input_dir, array_by_name)  # For example the columns of a pandas DataFrame
+    run_microsimulation(input_dir, output_dir, ['revdisp', 'irpp'], 2014, chunk_size = 100000, processes = 4)
+    revdisp = load_dataset(output_dir)['revdisp']
+"""
+
+
+import logging
+import multiprocessing
+import os
+
+import numpy as np
+
+from . import entities
+
+
+__all__ = [
+    'load_dataset',
+    'run_microsimulation',
+    'save_dataset',
+    ]
+
+log = logging.getLogger(__name__)
+persons_class = entities.entity_class_by_key_plural['individus']
+tax_benefit_system_by_process = {}
+
+
+def cut_chunks(index_arrays, chunk_size):
+    """Return the (start, stop) rows of chunks of about chunk_size persons, which don't split any entity."""
+    persons_count = len(index_arrays[0])
+    # Count, for each row boundary, the entities spanning it.
+    spans_count = np.zeros(persons_count + 1, dtype = np.int64)
+    for index_array in index_arrays:
+        first_rows = np.unique(index_array, return_index = True)[1]
+        last_rows = persons_count - 1 - np.unique(index_array[::-1], return_index = True)[1]
+        spans_count += np.bincount(first_rows + 1, minlength = persons_count + 1)
+        spans_count -= np.bincount(last_rows + 1, minlength = persons_count + 1)
+    boundaries = np.flatnonzero(np.cumsum(spans_count) == 0)  # Includes 0 and persons_count
+    chunks = []
+    start = 0
+    while start < persons_count:
+        stop = boundaries[min(np.searchsorted(boundaries, start + chunk_size), len(boundaries) - 1)]
+        chunks.append((start, int(stop)))
+        start = int(stop)
+    return chunks
+
+
+def get_tax_benefit_system():
+    tax_benefit_system = tax_benefit_system_by_process.get(os.getpid())
+    if tax_benefit_system is None:
+        from . import init_country
+        tax_benefit_system = tax_benefit_system_by_process[os.getpid()] = init_country()()
+    return tax_benefit_system
+
+
+def iter_group_entity_classes():
+    for key_plural, entity_class in sorted(entities.entity_class_by_key_plural.iteritems()):
+        if not getattr(entity_class, 'is_persons_entity', False):
+            yield entity_class
+
+
+def load_dataset(dataset_dir, mmap_mode = 'r'):
+    """Return the arrays of a dataset directory, memory-mapped by default."""
+    return dict(
+        (os.path.splitext(file_name)[0], np.load(os.path.join(dataset_dir, file_name), mmap_mode = mmap_mode))
+        for file_name in os.listdir(dataset_dir)
+        if file_name.endswith('.npy')
+        )
+
+
+def new_chunk_simulation(tax_benefit_system, array_by_name, period):
+    """Return a simulation of the persons given by the (chunk) arrays, and the input ids of its entities."""
+    from openfisca_core import simulations
+
+    simulation = simulations.Simulation(period = period, tax_benefit_system = tax_benefit_system)
+    persons = simulation.entity_by_key_plural[persons_class.key_plural]
+    persons.count = persons.step_size = len(array_by_name.itervalues().next())
+    ids_by_entity_key_plural = {}
+    head_rows_by_entity_key_plural = {}
+    index_and_role_names = set()
+    for entity_class in iter_group_entity_classes():
+        entity = simulation.entity_by_key_plural[entity_class.key_plural]
+        ids, index_array = np.unique(array_by_name[entity_class.index_for_person_variable_name],
+            return_inverse = True)
+        role_array = np.asarray(array_by_name[entity_class.role_for_person_variable_name])
+        head_rows = np.flatnonzero(role_array == 0)
+        assert len(head_rows) == len(ids), u'Each {} must have exactly one person of role 0'.format(
+            entity_class.key_singular).encode('utf-8')
+        entity.count = entity.step_size = len(ids)
+        entity.roles_count = int(role_array.max()) + 1
+        simulation.get_or_new_holder(entity_class.index_for_person_variable_name).set_input(period, index_array)
+        simulation.get_or_new_holder(entity_class.role_for_person_variable_name).set_input(period, role_array)
+        index_and_role_names.update([entity_class.index_for_person_variable_name,
+            entity_class.role_for_person_variable_name])
+        ids_by_entity_key_plural[entity_class.key_plural] = ids
+        # Rows giving the variables of the entity, in the order of the entity
+        head_rows_by_entity_key_plural[entity_class.key_plural] = head_rows[np.argsort(index_array[head_rows])]
+
+    for name, array in array_by_name.iteritems():
+        if name in index_and_role_names:
+            continue
+        holder = simulation.get_or_new_holder(name)
+        head_rows = head_rows_by_entity_key_plural.get(holder.entity.key_plural)
+        if head_rows is not None:
+            array = array[head_rows]
+        # Like Scenario.fill_simulation, use set_input, which spreads the yearly inputs over the months when needed.
+        holder.set_input(period, np.array(array, dtype = holder.column.dtype))
+    return simulation, ids_by_entity_key_plural
+
+
+def run_chunk(arguments):
+    input_dir, output_dir, variables_name, period, start, stop, offset_by_entity_key_plural = arguments
+    tax_benefit_system = get_tax_benefit_system()
+    input_array_by_name = dict(
+        (name, array[start:stop])
+        for name, array in load_dataset(input_dir).iteritems()
+        if name in tax_benefit_system.column_by_name
+        )
+    simulation, ids_by_entity_key_plural = new_chunk_simulation(tax_benefit_system, input_array_by_name, period)
+    output_array_by_name = load_dataset(output_dir, mmap_mode = 'r+')
+    for entity_class in iter_group_entity_classes():
+        offset = offset_by_entity_key_plural[entity_class.key_plural]
+        ids = ids_by_entity_key_plural[entity_class.key_plural]
+        output_array_by_name[entity_class.index_for_person_variable_name][offset:offset + len(ids)] = ids
+    for variable_name in variables_name:
+        array = simulation.calculate(variable_name)
+        entity_key_plural = simulation.get_or_new_holder(variable_name).entity.key_plural
+        offset = offset_by_entity_key_plural[entity_key_plural]
+        output_array_by_name[variable_name][offset:offset + len(array)] = array
+    for output_array in output_array_by_name.itervalues():
+        output_array.flush()
+    log.info(u'Computed persons {} to {}'.format(start, stop))
+    return stop - start
+
+
+def run_microsimulation(input_dir, output_dir, variables_name, period, chunk_size = 100000, processes = 1):
+    """Compute the variables for the persons of the input dataset directory, and save them in output_dir."""
+    from openfisca_core import periods
+
+    period = periods.period(period)
+    tax_benefit_system = get_tax_benefit_system()
+    input_array_by_name = load_dataset(input_dir)
+    index_arrays = [
+        input_array_by_name[entity_class.index_for_person_variable_name]
+        for entity_class in iter_group_entity_classes()
+        ]
+    chunks = cut_chunks(index_arrays, chunk_size)
+
+    # Offsets of each chunk in the files of each entity
+    offset_by_entity_key_plural_by_chunk = []
+    count_by_entity_key_plural = dict(
+        (entity_class.key_plural, 0)
+        for entity_class in entities.entity_class_by_key_plural.itervalues()
+        )
+    for start, stop in chunks:
+        offset_by_entity_key_plural_by_chunk.append(count_by_entity_key_plural.copy())
+        count_by_entity_key_plural[persons_class.key_plural] += stop - start
+        for entity_class, index_array in zip(iter_group_entity_classes(), index_arrays):
+            count_by_entity_key_plural[entity_class.key_plural] += len(np.unique(index_array[start:stop]))
+
+    if not os.path.isdir(output_dir):
+        os.makedirs(output_dir)
+    for entity_class in iter_group_entity_classes():
+        index_name = entity_class.index_for_person_variable_name
+        np.lib.format.open_memmap(os.path.join(output_dir, '{}.npy'.format(index_name)),
+            dtype = input_array_by_name[index_name].dtype, mode = 'w+',
+            shape = (count_by_entity_key_plural[entity_class.key_plural],))
+    for variable_name in variables_name:
+        column = tax_benefit_system.column_by_name[variable_name]
+        entity_class = entities.entity_class_by_symbol[column.entity]
+        np.lib.format.open_memmap(os.path.join(output_dir, '{}.npy'.format(variable_name)), dtype = column.dtype,
+            mode = 'w+', shape = (count_by_entity_key_plural[entity_class.key_plural],))
+
+    arguments_list = [
+        (input_dir, output_dir, variables_name, period, start, stop, offset_by_entity_key_plural)
+        for (start, stop), offset_by_entity_key_plural in zip(chunks, offset_by_entity_key_plural_by_chunk)
+        ]
+    if processes > 1:
+        pool = multiprocessing.Pool(processes = processes)
+        try:
+            persons_count = sum(pool.imap_unordered(run_chunk, arguments_list))
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        persons_count = sum(run_chunk(arguments) for arguments in arguments_list)
+    return persons_count
+
+
+def save_dataset(dataset_dir, array_by_name):
+    """Save arrays (or pandas series) into a dataset directory, one NumPy file per array."""
+    if not os.path.isdir(dataset_dir):
+        os.makedirs(dataset_dir)
+    for name, array in array_by_name.iteritems():
+        np.save(os.path.join(dataset_dir, '{}.npy'.format(name)), np.asarray(array))
@@ -25,6 +25,9 @@
 
 from datetime import date
 import functools
+import weakref
+
+import numpy as np
 
 from openfisca_core.columns import (AgeCol, BoolCol, build_column, DateCol, EnumCol, FixedStrCol, FloatCol, IntCol,
     PeriodSizeIndependentIntCol, StrCol)
@@ -84,9 +87,12 @@ __all__ = [
     'set_input_dispatch_by_period',
     'set_input_divide_by_period',
     'SimpleFormulaColumn',
+    'split_by_roles_matrix',
     'StrCol',
     'TAUX_DE_PRIME',
     'VOUS',
+    'zero_preserving',
+    'zero_preserving_column_by_name',
     ]
 
 CAT = Enum([
@@ -129,3 +135,71 @@ build_column = functools.partial(
     )
 
 reference_formula = make_reference_formula_decorator(entity_class_by_symbol = entity_class_by_symbol)
+
+# Columns whose formula is null for every entity whose CERFA boxes and zero-preserving variables are all null
+zero_preserving_column_by_name = {}
+
+
+def zero_preserving(column):
+    """Declare that the formula of a column returns 0 when all the CERFA boxes and zero-preserving variables it reads
+    are 0.
+
+    To be put above @reference_formula. The declaration lets sparse_evaluation skip the whole computation when these
+    inputs are null for every entity, which is the usual case of the tax reductions and credits.
+    """
+    zero_preserving_column_by_name[column.name] = column
+    return column
+
+
+def split_by_roles_matrix(formula, array_or_dated_holder, default = None, roles = None):
+    """Dispatch a persons array to a matrix with one row per entity (of the formula) and one column per role.
+
+    It is the dense equivalent of formula.split_by_roles(): column i holds the array of role roles[i], and the cells of
+    missing roles are filled with default. Counting, minimum or maximum over the children of a famille are then single
+    reductions over axis 1. When array_or_dated_holder is a plain array, default defaults to 0 (False for booleans).
+    The matrices are cached on the simulation, as long as the persons array is alive, so they must not be modified.
+    A matrix is dropped from the cache as soon as its persons array is released.
+    """
+    entity = formula.holder.entity
+    simulation = entity.simulation
+    if isinstance(array_or_dated_holder, np.ndarray):
+        array = array_or_dated_holder
+        if default is None:
+            default = array.dtype.type(0)
+        cache_key = None
+    else:
+        array = array_or_dated_holder.array
+        if default is None:
+            default = array_or_dated_holder.column.default
+        cache_key = (array_or_dated_holder.column.name, array_or_dated_holder.period, entity.key_plural,
+            tuple(roles) if roles is not None else None, default)
+    if roles is None:
+        roles = range(entity.roles_count)
+
+    cache = getattr(simulation, 'roles_matrix_by_key', None)
+    if cache is None:
+        cache = simulation.roles_matrix_by_key = {}
+    if cache_key is not None:
+        cached = cache.get(cache_key)
+        if cached is not None and cached[0]() is array:
+            return cached[1]
+
+    persons = simulation.persons
+    index_array = persons.holder_by_name[entity.index_for_person_variable_name].array
+    role_array = persons.holder_by_name[entity.role_for_person_variable_name].array
+    column_by_role = np.empty(max(max(roles), role_array.max() if len(role_array) else 0) + 1, dtype = np.int32)
+    column_by_role.fill(-1)
+    column_by_role[roles] = np.arange(len(roles))
+    column_array = column_by_role[role_array]
+    selected = column_array >= 0
+    matrix = np.empty((entity.count, len(roles)), dtype = array.dtype)
+    matrix.fill(default)
+    matrix[index_array[selected], column_array[selected]] = array[selected]
+    if cache_key is not None:
+        def release(array_reference):
+            cached = cache.get(cache_key)
+            if cached is not None and cached[0] is array_reference:
+                del cache[cache_key]
+
+        cache[cache_key] = (weakref.ref(array, release), matrix)
+    return matrix
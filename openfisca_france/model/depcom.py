@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+
+
+# OpenFisca -- A versatile microsimulation software
+# By: OpenFisca Team <contact@openfisca.fr>
+#
+# Copyright (C) 2011, 2012, 2013, 2014, 2015 OpenFisca Team
+# https://github.com/openfisca
+#
+# This file is part of OpenFisca.
+#
+# OpenFisca is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# OpenFisca is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Vectorised lookup of values indexed by depcom (code INSEE of a commune)."""
+
+
+from __future__ import division
+
+import hashlib
+import logging
+import os
+import pkg_resources
+import shutil
+import tempfile
+
+from numpy import (arange, argsort, array, asarray, ascontiguousarray, dot, int64, load, save, searchsorted, uint8,
+    where, zeros)
+
+import openfisca_france
+
+
+__all__ = [
+    'DepcomIndex',
+    'load_depcom_indexes',
+    'pack_depcom',
+    'save_depcom_indexes',
+    ]
+
+# Increment when the layout of the cached files changes.
+cache_format_version = 1
+# Directory of the precompiled indexes, built by scripts/build_assets_cache.py
+cache_dir = os.environ.get('OPENFISCA_FRANCE_ASSETS_CACHE_DIR') or os.path.join(
+    os.path.dirname(os.path.abspath(openfisca_france.__file__)), 'assets', 'cache')
+log = logging.getLogger(__name__)
+
+# Base 36 digit of each byte, -1 for characters which can't appear in a depcom (Corsica depcoms contain "A" or "B").
+digit_by_byte = zeros(256, dtype = int64) - 1
+digit_by_byte[ord('0'):ord('9') + 1] = arange(10)
+digit_by_byte[ord('A'):ord('Z') + 1] = arange(10, 36)
+digit_by_byte[ord('a'):ord('z') + 1] = arange(10, 36)
+depcom_weights = 36 ** arange(4, -1, -1, dtype = int64)
+
+
+def pack_depcom(depcom):
+    """Convert an array of 5 chars depcoms into an array of integers (-1 for invalid depcoms)."""
+    depcom = asarray(depcom)
+    if depcom.dtype != 'S5':
+        depcom = depcom.astype('S5')
+    digits = digit_by_byte[ascontiguousarray(depcom).view(uint8).reshape(-1, 5)]
+    return where((digits >= 0).all(axis = 1), dot(digits, depcom_weights), -1)
+
+
+class DepcomIndex(object):
+    codes = None  # Sorted packed depcoms
+    values = None  # Values, in the same order as codes
+
+    def __init__(self, value_by_depcom = None, dtype = float):
+        if value_by_depcom is None:
+            # Empty index, filled by load_depcom_indexes.
+            self.codes = zeros(0, dtype = int64)
+            self.values = zeros(0, dtype = dtype)
+            return
+        depcoms = value_by_depcom.keys()
+        codes = pack_depcom(array(depcoms, dtype = 'S5'))
+        values = array([value_by_depcom[depcom] for depcom in depcoms], dtype = dtype)
+        valid = codes >= 0
+        codes = codes[valid]
+        values = values[valid]
+        order = argsort(codes, kind = 'mergesort')
+        self.codes = codes[order]
+        self.values = values[order]
+
+    def __len__(self):
+        return len(self.codes)
+
+    def lookup(self, depcom, default_value):
+        """Return the values of the given depcoms, using default_value for the unknown ones."""
+        codes = pack_depcom(depcom)
+        if len(self.codes) == 0:
+            return zeros(len(codes), dtype = self.values.dtype) + default_value
+        index = searchsorted(self.codes, codes)
+        index[index == len(self.codes)] = 0
+        found = (self.codes[index] == codes) & (codes >= 0)
+        return where(found, self.values[index], default_value).astype(self.values.dtype)
+
+
+def get_depcom_indexes_dir(name, asset_names, cache_dir = None):
+    """Return the cache directory of the indexes built from the given assets.
+
+    The name of the directory contains a hash of the assets, so that a change of one of them invalidates the cache.
+    """
+    assets_hash = hashlib.sha1(str(cache_format_version))
+    for asset_name in asset_names:
+        assets_hash.update(asset_name)
+        assets_hash.update(pkg_resources.resource_string(openfisca_france.__name__, asset_name))
+    return os.path.join(cache_dir or globals()['cache_dir'], '{}-{}'.format(name, assets_hash.hexdigest()))
+
+
+def load_depcom_indexes(name, asset_names, cache_dir = None):
+    """Load the indexes saved by save_depcom_indexes, or return None when they are missing or outdated.
+
+    Arrays are memory-mapped, so that processes loading the same indexes share their pages.
+    """
+    indexes_dir = get_depcom_indexes_dir(name, asset_names, cache_dir = cache_dir)
+    if not os.path.isdir(indexes_dir):
+        return None
+    index_by_key = {}
+    for filename in os.listdir(indexes_dir):
+        if not filename.endswith('-codes.npy'):
+            continue
+        key = filename[:-len('-codes.npy')]
+        index = DepcomIndex()
+        index.codes = load(os.path.join(indexes_dir, filename), mmap_mode = 'r')
+        index.values = load(os.path.join(indexes_dir, '{}-values.npy'.format(key)), mmap_mode = 'r')
+        index_by_key[key] = index
+    return index_by_key
+
+
+def save_depcom_indexes(name, asset_names, index_by_key, cache_dir = None):
+    """Save indexes built from the given assets, to be loaded by load_depcom_indexes. Return their directory."""
+    indexes_dir = get_depcom_indexes_dir(name, asset_names, cache_dir = cache_dir)
+    parent_dir = os.path.dirname(indexes_dir)
+    if not os.path.isdir(parent_dir):
+        os.makedirs(parent_dir)
+    # Write in a temporary directory, then rename it, so that a process never loads incomplete indexes.
+    temporary_dir = tempfile.mkdtemp(dir = parent_dir)
+    for key, index in index_by_key.iteritems():
+        save(os.path.join(temporary_dir, '{}-codes.npy'.format(key)), asarray(index.codes))
+        save(os.path.join(temporary_dir, '{}-values.npy'.format(key)), asarray(index.values))
+    if os.path.isdir(indexes_dir):
+        shutil.rmtree(temporary_dir)
+    else:
+        os.rename(temporary_dir, indexes_dir)
+    # Remove outdated indexes of the same name.
+    for filename in os.listdir(parent_dir):
+        path = os.path.join(parent_dir, filename)
+        if filename.startswith(name + '-') and path != indexes_dir:
+            log.info(u'Removing outdated indexes {}'.format(path))
+            shutil.rmtree(path, ignore_errors = True)
+    return indexes_dir
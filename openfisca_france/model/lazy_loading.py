@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+
+
+# OpenFisca -- A versatile microsimulation software
+# By: OpenFisca Team <contact@openfisca.fr>
+#
+# Copyright (C) 2011, 2012, 2013, 2014, 2015 OpenFisca Team
+# https://github.com/openfisca
+#
+# This file is part of OpenFisca.
+#
+# OpenFisca is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# OpenFisca is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Lazy loading of the formula modules.
+
+The manifest gives the name of the module defining each column, so that a tax-benefit system can import only the
+modules needed by the variables it computes, instead of importing them all through model/model.py.
+"""
+
+
+import ast
+import collections
+import importlib
+import json
+import logging
+import os
+
+
+__all__ = [
+    'build_manifest',
+    'LazyColumnByName',
+    'load_manifest',
+    ]
+
+log = logging.getLogger(__name__)
+manifest_file_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'module_name_by_column_name.json')
+model_dir = os.path.dirname(os.path.abspath(__file__))
+model_package_name = __name__.rsplit('.', 1)[0]
+# Modules always imported: they define the entities' variables, used at import time by other modules.
+eager_module_names = [
+    model_package_name + '.caracteristiques_socio_demographiques.demographie',
+    model_package_name + '.caracteristiques_socio_demographiques.logement',
+    ]
+
+
+class LazyColumnByName(collections.OrderedDict):
+    """Dictionary of columns, importing the module of a missing column when it is requested.
+
+    Iteration only yields the columns of the modules already imported. Use load_all() before iterating to get all the
+    columns.
+    """
+    entity_classes = None
+    module_name_by_column_name = None
+
+    def __contains__(self, column_name):
+        if not dict.__contains__(self, column_name):
+            self.require(column_name)
+        return dict.__contains__(self, column_name)
+
+    def __missing__(self, column_name):
+        self.require(column_name)
+        if not dict.__contains__(self, column_name):
+            raise KeyError(column_name)
+        return dict.__getitem__(self, column_name)
+
+    def copy(self):
+        # Copies (used by reforms) are not lazy: they contain every column.
+        self.load_all()
+        return collections.OrderedDict(self)
+
+    def get(self, column_name, default = None):
+        return self[column_name] if column_name in self else default
+
+    def load_all(self):
+        for module_name in sorted(set(self.module_name_by_column_name.itervalues())):
+            importlib.import_module(module_name)
+        self.update_from_entity_classes()
+        self.module_name_by_column_name = {}
+
+    def require(self, *column_names):
+        """Import the modules defining the given columns."""
+        module_names = set(
+            self.module_name_by_column_name.get(column_name)
+            for column_name in column_names
+            if not dict.__contains__(self, column_name)
+            )
+        if not module_names:
+            return
+        if None in module_names:
+            # Column missing from the manifest: it may be outdated, so fall back to importing everything.
+            if self.module_name_by_column_name:
+                log.info(u'Columns {} are not in the manifest; loading every module'.format(column_names))
+                self.load_all()
+            return
+        for module_name in sorted(module_names):
+            log.debug(u'Loading formulas module {}'.format(module_name))
+            importlib.import_module(module_name)
+        self.update_from_entity_classes()
+        if any(not dict.__contains__(self, column_name) for column_name in column_names):
+            log.info(u'Columns {} are not defined where the manifest says; loading every module'.format(
+                column_names))
+            self.load_all()
+
+    def update_from_entity_classes(self):
+        for entity_class in self.entity_classes:
+            for column_name, column in entity_class.column_by_name.iteritems():
+                if not dict.__contains__(self, column_name):
+                    self[column_name] = column
+
+
+def build_manifest():
+    """Return the name of the module defining each column, by parsing (without importing) the modules of model.py."""
+    module_name_by_column_name = {}
+    module_names = list(iter_imported_module_names(model_package_name + '.model'))
+    for module_name in module_names:
+        for column_name in iter_module_column_names(module_name):
+            other_module_name = module_name_by_column_name.get(column_name)
+            assert other_module_name is None, u'Column {} is defined in modules {} and {}'.format(column_name,
+                other_module_name, module_name)
+            module_name_by_column_name[column_name] = module_name
+    return module_name_by_column_name
+
+
+def get_module_file_path(module_name):
+    path = os.path.join(model_dir, *module_name[len(model_package_name) + 1:].split('.')) \
+        if module_name != model_package_name else model_dir
+    if os.path.isdir(path):
+        return os.path.join(path, '__init__.py')
+    return path + '.py'
+
+
+def is_model_module(module_name):
+    return (module_name == model_package_name or module_name.startswith(model_package_name + '.')) \
+        and os.path.exists(get_module_file_path(module_name))
+
+
+def iter_imported_module_names(module_name, visited_module_names = None):
+    """Yield the modules of model package imported (directly or not) by the given module, including itself."""
+    if visited_module_names is None:
+        visited_module_names = set()
+    if module_name in visited_module_names:
+        return
+    visited_module_names.add(module_name)
+    yield module_name
+    file_path = get_module_file_path(module_name)
+    with open(file_path) as module_file:
+        tree = ast.parse(module_file.read(), file_path)
+    package_name = module_name if file_path.endswith('__init__.py') else module_name.rsplit('.', 1)[0]
+    for node in tree.body:
+        if not isinstance(node, ast.ImportFrom):
+            continue
+        if node.level == 0:
+            # Implicit relative import (Python 2 only), or absolute import.
+            base_name = '.'.join(([package_name] if is_model_module(package_name + '.' + node.module.split('.')[0])
+                else []) + [node.module])
+        else:
+            base_name = package_name.rsplit('.', node.level - 1)[0] if node.level > 1 else package_name
+            if node.module:
+                base_name = '.'.join([base_name, node.module])
+        if not is_model_module(base_name):
+            continue
+        for alias in node.names:
+            imported_name = '.'.join([base_name, alias.name])
+            for imported_module_name in iter_imported_module_names(
+                    imported_name if is_model_module(imported_name) else base_name, visited_module_names):
+                yield imported_module_name
+
+
+def iter_module_column_names(module_name):
+    """Yield the names of the columns defined at the top level of the given module."""
+    file_path = get_module_file_path(module_name)
+    with open(file_path) as module_file:
+        tree = ast.parse(module_file.read(), file_path)
+    for node in tree.body:
+        if isinstance(node, ast.ClassDef) and any(
+                isinstance(decorator, ast.Name) and decorator.id == 'reference_formula'
+                for decorator in node.decorator_list
+                ):
+            column_name = node.name
+            for statement in node.body:
+                if isinstance(statement, ast.Assign) and isinstance(statement.value, ast.Str) and [
+                        getattr(target, 'id', None) for target in statement.targets] == ['name']:
+                    column_name = statement.value.s
+            yield column_name
+        elif isinstance(node, ast.Expr) and isinstance(node.value, ast.Call) and isinstance(node.value.func, ast.Name) \
+                and node.value.func.id in ('build_column', 'reference_input_variable'):
+            call = node.value
+            column_name = None
+            for keyword in call.keywords:
+                if keyword.arg == 'name' and isinstance(keyword.value, ast.Str):
+                    column_name = keyword.value.s
+            if column_name is None and call.args and isinstance(call.args[0], ast.Str):
+                column_name = call.args[0].s
+            assert column_name is not None, u'Unable to find the name of a column in {}, line {}'.format(
+                module_name, call.lineno)
+            yield column_name
+
+
+def load_manifest():
+    """Return the manifest saved by scripts/generate_formulas_manifest.py, or build it when missing."""
+    if os.path.exists(manifest_file_path):
+        with open(manifest_file_path) as manifest_file:
+            return json.load(manifest_file)
+    log.info(u'Missing manifest {}; building it'.format(manifest_file_path))
+    return build_manifest()
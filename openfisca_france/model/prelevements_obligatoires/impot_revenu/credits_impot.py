@@ -271,6 +271,7 @@ class nb_pac2(SimpleFormulaColumn):
         return period, nbF + nbJ + nbR - nbH / 2
 
 
+@zero_preserving
 @reference_formula
 class accult(SimpleFormulaColumn):
     column = FloatCol(default = 0)
@@ -291,6 +292,7 @@ class accult(SimpleFormulaColumn):
         return period, P.taux * f7uo
 
 
+@zero_preserving
 @reference_formula
 class acqgpl(SimpleFormulaColumn):
     column = FloatCol(default = 0)
@@ -312,6 +314,7 @@ class acqgpl(SimpleFormulaColumn):
         return period, f7up * acqgpl.mont_up + f7uq * acqgpl.mont_uq
 
 
+@zero_preserving
 @reference_formula
 class aidmob(SimpleFormulaColumn):
     column = FloatCol(default = 0)
@@ -336,6 +339,7 @@ class aidmob(SimpleFormulaColumn):
         return period, (f1ar + f1br + f1cr + f1dr + f1er) * _P.ir.credits_impot.aidmob.montant
 
 
+@zero_preserving
 @reference_formula
 class aidper(DatedFormulaColumn):
     column = FloatCol(default = 0)
@@ -493,6 +497,7 @@ class aidper(DatedFormulaColumn):
                 min_(f7wj, max1))
 
 
+@zero_preserving
 @reference_formula
 class assloy(SimpleFormulaColumn):
     column = FloatCol(default = 0)
@@ -512,6 +517,7 @@ class assloy(SimpleFormulaColumn):
         return period, _P.ir.credits_impot.assloy.taux * f4bf
 
 
+@zero_preserving
 @reference_formula
 class autent(SimpleFormulaColumn):
     column = FloatCol(default = 0)
@@ -530,6 +536,7 @@ class autent(SimpleFormulaColumn):
         return period, f8uy
 
 
+@zero_preserving
 @reference_formula
 class ci_garext(SimpleFormulaColumn):
     column = FloatCol(default = 0)
@@ -585,6 +592,7 @@ class creimp_exc_2008(SimpleFormulaColumn):
                 (rpp > 11673) * max_(0, 8317 * (12475 - rpp) / 802)))
 
 
+@zero_preserving
 @reference_formula
 class creimp(DatedFormulaColumn):
     column = FloatCol(default = 0)
@@ -879,6 +887,7 @@ class creimp(DatedFormulaColumn):
                 f8uz + f8wa + f8wb + f8wc + f8wd + f8we + f8wr + f8wt + f8wu)
 
 
+@zero_preserving
 @reference_formula
 class direpa(SimpleFormulaColumn):
     column = FloatCol(default = 0)
@@ -896,6 +905,7 @@ class direpa(SimpleFormulaColumn):
         return period, f2bg
 
 
+@zero_preserving
 @reference_formula
 class divide(SimpleFormulaColumn):
     column = FloatCol(default = 0)
@@ -921,6 +931,7 @@ class divide(SimpleFormulaColumn):
         return period, min_(P.taux * (f2dc + f2gr), max1)
 
 
+@zero_preserving
 @reference_formula
 class drbail(SimpleFormulaColumn):
     column = FloatCol(default = 0)
@@ -1193,6 +1204,7 @@ class jeunes_ind(SimpleFormulaColumn):
                                 # somme calculée sur formulaire 2041
 
 
+@zero_preserving
 @reference_formula
 class mecena(SimpleFormulaColumn):
     column = FloatCol(default = 0)
@@ -1211,6 +1223,7 @@ class mecena(SimpleFormulaColumn):
         return period, f7us
 
 
+@zero_preserving
 @reference_formula
 class percvm(SimpleFormulaColumn):
     column = FloatCol(default = 0)
@@ -1231,6 +1244,7 @@ class percvm(SimpleFormulaColumn):
         return period, _P.ir.credits_impot.percvm.taux * f3vv_end_2010
 
 
+@zero_preserving
 @reference_formula
 class preetu(DatedFormulaColumn):
     column = FloatCol(default = 0)
@@ -1285,6 +1299,7 @@ class preetu(DatedFormulaColumn):
         return period, P.taux * min_(f7uk, P.max) + P.taux * min_(f7td, max1)
 
 
+@zero_preserving
 @reference_formula
 class prlire(SimpleFormulaColumn):
     column = FloatCol(default = 0)
@@ -1308,6 +1323,7 @@ class prlire(SimpleFormulaColumn):
         return period, _P.ir.credits_impot.prlire.taux * min_(f2dh, plaf_resid)
 
 
+@zero_preserving
 @reference_formula
 class quaenv(DatedFormulaColumn):
     column = FloatCol(default = 0)
@@ -1610,6 +1626,7 @@ class quaenv(DatedFormulaColumn):
         return period, or_(not_(or_(f7we, f7wg)), (rfr < 30000)) * montant + f7sz
 
 
+@zero_preserving
 @reference_formula
 class quaenv_bouquet(SimpleFormulaColumn):
     column = BoolCol(default = False)
@@ -1654,6 +1671,7 @@ class quaenv_bouquet(SimpleFormulaColumn):
         return period, or_(bouquet, f7wh)
 
 
+@zero_preserving
 @reference_formula
 class saldom2(DatedFormulaColumn):
     column = FloatCol(default = 0)
@@ -435,6 +435,7 @@ class reductions(DatedFormulaColumn):
     # TODO: plafonnement pour parti politiques depuis 2012 P.ir.reductions_impots.dfppce.max_niv
 
 
+@zero_preserving
 @reference_formula
 class adhcga(SimpleFormulaColumn):
     column = FloatCol(default = 0)
@@ -454,6 +455,7 @@ class adhcga(SimpleFormulaColumn):
         return period, min_(f7ff, P.max * f7fg)
 
 
+@zero_preserving
 @reference_formula
 class assvie(SimpleFormulaColumn):
     column = FloatCol(default = 0)
@@ -478,6 +480,7 @@ class assvie(SimpleFormulaColumn):
         return period, P.taux * min_(f7gw + f7gx + f7gy, max1)
 
 
+@zero_preserving
 @reference_formula
 class cappme(DatedFormulaColumn):
     column = FloatCol(default = 0)
@@ -651,6 +654,7 @@ class cappme(DatedFormulaColumn):
 #TODO: vérifier l'existence du "max_"
 
 
+@zero_preserving
 @reference_formula
 class cotsyn(SimpleFormulaColumn):
     column = FloatCol(default = 0)
@@ -688,6 +692,7 @@ class cotsyn(SimpleFormulaColumn):
         return period, P.taux * (min_(f7ac, maxv) + min_(f7ae, maxc) + min_(f7ag, maxp))
 
 
+@zero_preserving
 @reference_formula
 class creaen(DatedFormulaColumn):
     column = FloatCol(default = 0)
@@ -764,6 +769,7 @@ class creaen(DatedFormulaColumn):
                     P.hand * (f7my / 2))
 
 
+@zero_preserving
 @reference_formula
 class deffor(SimpleFormulaColumn):
     column = FloatCol(default = 0)
@@ -783,6 +789,7 @@ class deffor(SimpleFormulaColumn):
         return period, P.taux * min_(f7uc, P.max)
 
 
+@zero_preserving
 @reference_formula
 class daepad(SimpleFormulaColumn):
     column = FloatCol(default = 0)
@@ -802,6 +809,7 @@ class daepad(SimpleFormulaColumn):
         return period, P.taux * (min_(f7cd, P.max) + min_(f7ce, P.max))
 
 
+@zero_preserving
 @reference_formula
 class dfppce(DatedFormulaColumn):
     column = FloatCol(default = 0)
@@ -990,6 +998,7 @@ class dfppce(DatedFormulaColumn):
 
 
 # Outre-mer : TODO: plafonnement, cf. 2041-GE 2042-IOM
+@zero_preserving
 @reference_formula
 class doment(DatedFormulaColumn):
     column = FloatCol(default = 0)
@@ -1297,6 +1306,7 @@ class doment(DatedFormulaColumn):
 
 #TODO: vérifier les dates des variables de doment et domsoc (y sont-elles encore en 2013 par ex ?)
 
+@zero_preserving
 @reference_formula
 class domlog(DatedFormulaColumn):
     column = FloatCol(default = 0)
@@ -1505,6 +1515,7 @@ class domlog(DatedFormulaColumn):
 #En accord avec la DGFiP mais pas de 7ub et 7uj dans la notice
 
 
+@zero_preserving
 @reference_formula
 class domsoc(DatedFormulaColumn):
     column = FloatCol(default = 0)
@@ -1558,6 +1569,7 @@ class domsoc(DatedFormulaColumn):
         return period,  fhra + fhrb + fhrc + fhrd + f7qn + f7qk + f7qu + f7kg + f7kh + f7ki + f7qj + f7qs + f7qw + f7qx
 
 
+@zero_preserving
 @reference_formula
 class donapd(DatedFormulaColumn):
     column = FloatCol(default = 0)
@@ -1588,6 +1600,7 @@ class donapd(DatedFormulaColumn):
         return period, P.taux * min_(f7ud + f7va, P.max)
 
 
+@zero_preserving
 @reference_formula
 class duflot(SimpleFormulaColumn):
     column = FloatCol(default = 0)
@@ -1610,6 +1623,7 @@ class duflot(SimpleFormulaColumn):
 
 #TODO: / 5 dans trois TOM
 
+@zero_preserving
 @reference_formula
 class ecodev(SimpleFormulaColumn):
     column = FloatCol(default = 0)
@@ -1631,6 +1645,7 @@ class ecodev(SimpleFormulaColumn):
         return period, min_(f7uh * P.taux, min_(P.base * rbg_int, P.max))  # page3 ligne 18
 
 
+@zero_preserving
 @reference_formula
 class ecpess(SimpleFormulaColumn):
     column = FloatCol(default = 0)
@@ -1655,6 +1670,7 @@ class ecpess(SimpleFormulaColumn):
                 P.sup * (f7ef + f7eg / 2))
 
 
+@zero_preserving
 @reference_formula
 class garext(DatedFormulaColumn):
     column = FloatCol(default = 0)
@@ -1705,6 +1721,7 @@ class garext(DatedFormulaColumn):
                            min_(f7gg, max2))
 
 
+@zero_preserving
 @reference_formula
 class intagr(SimpleFormulaColumn):
     column = FloatCol(default = 0)
@@ -1726,6 +1743,7 @@ class intagr(SimpleFormulaColumn):
         return period, P.taux * min_(f7um, max1)
 
 
+@zero_preserving
 @reference_formula
 class intcon(SimpleFormulaColumn):
     column = FloatCol(default = 0)
@@ -1747,6 +1765,7 @@ class intcon(SimpleFormulaColumn):
         return period, P.taux * min_(f7uh, max1)
 
 
+@zero_preserving
 @reference_formula
 class intemp(SimpleFormulaColumn):
     column = FloatCol(default = 0)
@@ -1769,6 +1788,7 @@ class intemp(SimpleFormulaColumn):
         return period, P.taux * min_(f7wg, max1)
 
 
+@zero_preserving
 @reference_formula
 class invfor(DatedFormulaColumn):
     column = FloatCol(default = 0)
@@ -1931,6 +1951,7 @@ class invfor(DatedFormulaColumn):
             P.taux_ass * min_(f7ul, P.ifortra_seuil * (marpac + 1)))
 
 
+@zero_preserving
 @reference_formula
 class invlst(DatedFormulaColumn):
     column = FloatCol(default = 0)
@@ -2151,6 +2172,7 @@ class invlst(DatedFormulaColumn):
         return period, around(xi + xj + xo)
 
 
+@zero_preserving
 @reference_formula
 class invrev(SimpleFormulaColumn):
     column = FloatCol(default = 0)
@@ -2181,6 +2203,7 @@ class invrev(SimpleFormulaColumn):
                  P.taux_gt * f7gt + P.taux_gt * f7gv)
 
 
+@zero_preserving
 @reference_formula
 class locmeu(DatedFormulaColumn):
     column = FloatCol(default = 0)
@@ -2339,6 +2362,7 @@ class locmeu(DatedFormulaColumn):
                 f7ji + f7js)
 
 
+@zero_preserving
 @reference_formula
 class mohist(SimpleFormulaColumn):
     column = FloatCol(default = 0)
@@ -2358,6 +2382,7 @@ class mohist(SimpleFormulaColumn):
         return period, P.taux * min_(f7nz, P.max)
 
 
+@zero_preserving
 @reference_formula
 class patnat(DatedFormulaColumn):
     column = FloatCol(default = 0)
@@ -2423,6 +2448,7 @@ class patnat(DatedFormulaColumn):
         return period, P.taux * min_(f7ka, max1) + f7kb + f7kc + f7kd
 
 
+@zero_preserving
 @reference_formula
 class prcomp(SimpleFormulaColumn):
     column = FloatCol(default = 0)
@@ -2453,6 +2479,7 @@ class prcomp(SimpleFormulaColumn):
                  P.taux * f7wp)
 
 
+@zero_preserving
 @reference_formula
 class repsoc(SimpleFormulaColumn):
     column = FloatCol(default = 0)
@@ -2474,6 +2501,7 @@ class repsoc(SimpleFormulaColumn):
         return period, P.taux * min_(f7fh, seuil)
 
 
+@zero_preserving
 @reference_formula
 class resimm(DatedFormulaColumn):
     column = FloatCol(default = 0)
@@ -2564,6 +2592,7 @@ class resimm(DatedFormulaColumn):
                 P.taux_ra * min_(f7ra, max4) + P.taux_re * min_(f7re + f7sx, max5))
 
 
+@zero_preserving
 @reference_formula
 class rsceha(SimpleFormulaColumn):
     column = FloatCol(default = 0)
@@ -2585,6 +2614,7 @@ class rsceha(SimpleFormulaColumn):
         return period, P.taux * min_(f7gz, max1)
 
 
+@zero_preserving
 @reference_formula
 class saldom(DatedFormulaColumn):
     column = FloatCol(default = 0)
@@ -2680,6 +2710,7 @@ class saldom(DatedFormulaColumn):
         return period, P.taux * min_(f7df, max1)
 
 
+@zero_preserving
 @reference_formula
 class scelli(DatedFormulaColumn):
     column = FloatCol(default = 0)
@@ -3003,6 +3034,7 @@ class scelli(DatedFormulaColumn):
                 )
 
 
+@zero_preserving
 @reference_formula
 class sofica(SimpleFormulaColumn):
     column = FloatCol(default = 0)
@@ -3026,6 +3058,7 @@ class sofica(SimpleFormulaColumn):
         return period, P.taux2 * min_(f7gn, max0) + P.taux3 * min_(f7fn, max1)
 
 
+@zero_preserving
 @reference_formula
 class sofipe(SimpleFormulaColumn):
     column = FloatCol(default = 0)
@@ -3050,6 +3083,7 @@ class sofipe(SimpleFormulaColumn):
         return period, P.taux * min_(f7gs, max1)
 
 
+@zero_preserving
 @reference_formula
 class spfcpi(DatedFormulaColumn):
     column = FloatCol(default = 0)
@@ -36,6 +36,7 @@ import logging
 
 from ....base import *  # noqa analysis:ignore
 from .....assets.holidays import holidays
+from .base import calculate_add_cumul_annuel, compute_cumul_annuel
 
 log = logging.getLogger(__name__)
 
@@ -57,6 +58,17 @@ class assiette_allegement(SimpleFormulaColumn):
             )
 
 
+@reference_formula
+class assiette_allegement_cumul_annuel(SimpleFormulaColumn):
+    column = FloatCol
+    entity_class = Individus
+    label = u"Assiette des allègements de cotisations sociales employeur cumulée depuis le début de l'année"
+
+    def function(self, simulation, period):
+        period = period.start.offset('first-of', 'month').period('month')
+        return period, compute_cumul_annuel(simulation, period, 'assiette_allegement')
+
+
 @reference_formula
 class allegement_fillon(DatedFormulaColumn):
     column = FloatCol
@@ -85,6 +97,17 @@ class allegement_fillon(DatedFormulaColumn):
         return period, allegement * not_(stagiaire) * not_(apprenti)
 
 
+@reference_formula
+class allegement_fillon_cumul_annuel(SimpleFormulaColumn):
+    column = FloatCol
+    entity_class = Individus
+    label = u"Allègement Fillon cumulé depuis le début de l'année"
+
+    def function(self, simulation, period):
+        period = period.start.offset('first-of', 'month').period('month')
+        return period, compute_cumul_annuel(simulation, period, 'allegement_fillon')
+
+
 @reference_formula
 class coefficient_proratisation(SimpleFormulaColumn):
     column = FloatCol
@@ -190,6 +213,17 @@ class smic_proratise(SimpleFormulaColumn):
         return period, smic_proratise
 
 
+@reference_formula
+class smic_proratise_cumul_annuel(SimpleFormulaColumn):
+    column = FloatCol
+    entity_class = Individus
+    label = u"SMIC proratisé cumulé depuis le début de l'année"
+
+    def function(self, simulation, period):
+        period = period.start.offset('first-of', 'month').period('month')
+        return period, compute_cumul_annuel(simulation, period, 'smic_proratise')
+
+
 # Helper functions
 
 
@@ -204,9 +238,9 @@ def compute_allegement_fillon_anticipe(simulation, period):
     if period.start.month < 12:
         return compute_allegement_fillon(simulation, period.start.offset('first-of', 'month').period('month'))
     if period.start.month == 12:
-        cumul = simulation.calculate_add(
-            'allegement_fillon',
-            period.start.offset('first-of', 'year').period('month', 11))
+        cumul = simulation.calculate(
+            'allegement_fillon_cumul_annuel',
+            period.start.offset('first-of', 'month').offset(-1, 'month').period('month'))
         return compute_allegement_fillon(
             simulation, period.start.offset('first-of', 'year').period('year')
             ) - cumul
@@ -217,9 +251,10 @@ def compute_allegement_fillon_progressif(simulation, period):
         return compute_allegement_fillon(simulation, period.start.offset('first-of', 'month').period('month'))
 
     if period.start.month > 1:
-        up_to_this_month = period.start.offset('first-of', 'year').period('month', period.start.month)
-        up_to_previous_month = period.start.offset('first-of', 'year').period('month', period.start.month - 1)
-        cumul = simulation.calculate_add('allegement_fillon', up_to_previous_month)
+        # Les cumuls depuis le début de l'année sont tenus mois par mois, ce qui évite de refaire la somme de tous
+        # les mois précédents pour chaque mois de l'année.
+        previous_month = period.start.offset('first-of', 'month').offset(-1, 'month').period('month')
+        cumul = simulation.calculate('allegement_fillon_cumul_annuel', previous_month)
         up_to_this_month = period.start.offset('first-of', 'year').period('month', period.start.month)
         return compute_allegement_fillon(simulation, up_to_this_month) - cumul
 
@@ -229,8 +264,8 @@ def compute_allegement_fillon(simulation, period):
     Exonération Fillon
     http://www.securite-sociale.fr/comprendre/dossiers/exocotisations/exoenvigueur/fillon.htm
     '''
-    assiette_allegement = simulation.calculate_add('assiette_allegement', period)
-    smic_proratise = simulation.calculate_add('smic_proratise', period)
+    assiette_allegement = calculate_add_cumul_annuel(simulation, 'assiette_allegement', period)
+    smic_proratise = calculate_add_cumul_annuel(simulation, 'smic_proratise', period)
     taille_entreprise = simulation.calculate('taille_entreprise', period)
     majoration = (taille_entreprise <= 2)  # majoration éventuelle pour les petites entreprises
     # Calcul du taux
@@ -23,11 +23,41 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 
-from numpy import zeros
+from numpy import empty, inf, maximum as max_, minimum as min_, ndarray, newaxis, round as round_, searchsorted, zeros
+from openfisca_core.taxscales import MarginalRateTaxScale
 
 from ....base import CAT
 
 
+def partition_by_type_sal(type_sal):
+    """Split individuals by employee category.
+
+    Return a list of (type_sal_name, indices) couples, one for each non empty category of CAT.
+    """
+    order = type_sal.argsort(kind = 'mergesort')
+    sorted_type_sal = type_sal[order]
+    partition = []
+    for type_sal_name, type_sal_index in CAT:
+        start, stop = searchsorted(sorted_type_sal, [type_sal_index, type_sal_index + 1])
+        if stop > start:
+            partition.append((type_sal_name, order[start:stop]))
+    return partition
+
+
+def get_type_sal_partition(simulation, period):
+    """Return the partition of individuals by `type_sal` for the given period, cached on the simulation."""
+    type_sal = simulation.calculate('type_sal', period)
+    cache = getattr(simulation, 'type_sal_partition_by_period', None)
+    if cache is None:
+        cache = simulation.type_sal_partition_by_period = {}
+    cached_type_sal, partition = cache.get(period, (None, None))
+    if cached_type_sal is not type_sal:
+        # type_sal has been (re)computed since the partition was built.
+        partition = partition_by_type_sal(type_sal)
+        cache[period] = (type_sal, partition)
+    return partition
+
+
 def apply_bareme_for_relevant_type_sal(
         bareme_by_type_sal_name = None,
         bareme_name = None,
@@ -35,26 +65,189 @@ def apply_bareme_for_relevant_type_sal(
         base = None,
         plafond_securite_sociale = None,
         round_base_decimals = 2,
+        type_sal_partition = None,
         ):
     assert bareme_by_type_sal_name is not None
     assert bareme_name is not None
     assert base is not None
     assert plafond_securite_sociale is not None
-    assert type_sal is not None
+    assert type_sal is not None or type_sal_partition is not None
+    if type_sal_partition is None:
+        type_sal_partition = partition_by_type_sal(type_sal)
     cotisation = zeros(len(base))
-    for type_sal_name, type_sal_index in CAT:
+    # Each barème is evaluated only on the individuals of its own category.
+    for type_sal_name, indices in type_sal_partition:
         if type_sal_name not in bareme_by_type_sal_name:  # to deal with public_titulaire_militaire
             continue
         bareme = bareme_by_type_sal_name[type_sal_name].get(bareme_name)  # TODO; should have better warnings
         if bareme is not None:
-            cotisation += bareme.calc(
-                base * (type_sal == type_sal_index),
-                factor = plafond_securite_sociale,
+            factor = (
+                plafond_securite_sociale[indices]
+                if isinstance(plafond_securite_sociale, ndarray)
+                else plafond_securite_sociale
+                )
+            cotisation[indices] = bareme.calc(
+                base[indices],
+                factor = factor,
                 round_base_decimals = round_base_decimals,
                 )
     return - cotisation
 
 
+def compile_baremes(bareme_by_name):
+    """Stack the marginal rate barèmes of a category into padded thresholds and rates matrices.
+
+    Return a (names, thresholds, rates) triple: row i of thresholds (resp. rates) holds the thresholds (resp. rates)
+    of barème names[i]. Missing brackets are padded with an infinite threshold and a null rate.
+    """
+    names = sorted(
+        name
+        for name, bareme in bareme_by_name.iteritems()
+        if isinstance(bareme, MarginalRateTaxScale) and bareme.thresholds
+        )
+    brackets_count = max([len(bareme_by_name[name].thresholds) for name in names] or [0])
+    thresholds = empty((len(names), brackets_count + 1))
+    thresholds.fill(inf)
+    rates = zeros((len(names), brackets_count))
+    for index, name in enumerate(names):
+        bareme = bareme_by_name[name]
+        thresholds[index, :len(bareme.thresholds)] = bareme.thresholds
+        rates[index, :len(bareme.rates)] = bareme.rates
+    return names, thresholds, rates
+
+
+def calc_stacked_baremes(thresholds, rates, base, factor = 1, round_base_decimals = None):
+    """Apply the barèmes compiled by compile_baremes to base.
+
+    Return a matrix with one row per individual and one column per barème, whose values are the same as
+    `bareme.calc(base, factor = factor, round_base_decimals = round_base_decimals)`.
+    """
+    base = base[:, newaxis]
+    if isinstance(factor, ndarray):
+        factor = factor[:, newaxis]
+    result = zeros((len(base), len(rates)))
+    upper_thresholds = factor * thresholds[:, 0]
+    if round_base_decimals is not None:
+        upper_thresholds = round_(upper_thresholds, round_base_decimals)
+    for bracket_index in range(rates.shape[1]):
+        lower_thresholds = upper_thresholds
+        upper_thresholds = factor * thresholds[:, bracket_index + 1]
+        if round_base_decimals is None:
+            result += rates[:, bracket_index] * max_(min_(base, upper_thresholds) - lower_thresholds, 0)
+        else:
+            upper_thresholds = round_(upper_thresholds, round_base_decimals)
+            bracket_base = round_(max_(min_(base, upper_thresholds) - lower_thresholds, 0), round_base_decimals)
+            result += round_(rates[:, bracket_index] * bracket_base, round_base_decimals)
+    return result
+
+
+def compute_cotisations_bundle(
+        bareme_by_type_sal_name = None,
+        base = None,
+        plafond_securite_sociale = None,
+        round_base_decimals = 2,
+        type_sal_partition = None,
+        ):
+    """Compute every cotisation of bareme_by_type_sal_name in one pass over each type_sal category.
+
+    Return a (column_index_by_name, cotisations) couple, where cotisations is a matrix with one row per individual
+    and one column per barème name. Like apply_bareme_for_relevant_type_sal, cotisations are negative.
+    """
+    assert bareme_by_type_sal_name is not None
+    assert base is not None
+    assert plafond_securite_sociale is not None
+    assert type_sal_partition is not None
+    bareme_names = sorted(set(
+        bareme_name
+        for type_sal_name, indices in type_sal_partition
+        if type_sal_name in bareme_by_type_sal_name  # to deal with public_titulaire_militaire
+        for bareme_name, bareme in bareme_by_type_sal_name[type_sal_name].iteritems()
+        if hasattr(bareme, 'calc')
+        ))
+    column_index_by_name = dict(
+        (bareme_name, column_index)
+        for column_index, bareme_name in enumerate(bareme_names)
+        )
+    cotisations = zeros((len(base), len(bareme_names)))
+    for type_sal_name, indices in type_sal_partition:
+        if type_sal_name not in bareme_by_type_sal_name:
+            continue
+        bareme_by_name = bareme_by_type_sal_name[type_sal_name]
+        factor = (
+            plafond_securite_sociale[indices]
+            if isinstance(plafond_securite_sociale, ndarray)
+            else plafond_securite_sociale
+            )
+        names, thresholds, rates = compile_baremes(bareme_by_name)
+        if names:
+            columns = [column_index_by_name[name] for name in names]
+            cotisations[indices[:, newaxis], columns] = - calc_stacked_baremes(
+                thresholds,
+                rates,
+                base[indices],
+                factor = factor,
+                round_base_decimals = round_base_decimals,
+                )
+        # Barèmes which are not marginal rate ones are applied one by one.
+        for name, bareme in bareme_by_name.iteritems():
+            if name in names or not hasattr(bareme, 'calc'):
+                continue
+            cotisations[indices, column_index_by_name[name]] = - bareme.calc(
+                base[indices],
+                factor = factor,
+                round_base_decimals = round_base_decimals,
+                )
+    return column_index_by_name, cotisations
+
+
+def get_bareme_by_type_sal_name(simulation, period, cotisation_type = None):
+    assert cotisation_type in ('employeur', 'salarie')
+    law = simulation.legislation_at(period.start)
+    if cotisation_type == "employeur":
+        return law.cotsoc.cotisations_employeur
+    return law.cotsoc.cotisations_salarie
+
+
+def get_cotisations_bundle(simulation, period, cotisation_type = None):
+    """Return the (column_index_by_name, cotisations) bundle of all the cotisations of the given type.
+
+    The bundle is cached on the simulation and is computed again only when the legislation, the assiette, the
+    plafond or the type_sal of the individuals have changed.
+    """
+    bareme_by_type_sal_name = get_bareme_by_type_sal_name(simulation, period, cotisation_type = cotisation_type)
+    assiette_cotisations_sociales = calculate_add_cumul_annuel(simulation, 'assiette_cotisations_sociales', period)
+    plafond_securite_sociale = calculate_add_cumul_annuel(simulation, 'plafond_securite_sociale', period)
+    type_sal_partition = get_type_sal_partition(simulation, period)
+
+    cache = getattr(simulation, 'cotisations_bundle_by_type_and_period', None)
+    if cache is None:
+        cache = simulation.cotisations_bundle_by_type_and_period = {}
+    cached = cache.get((cotisation_type, period))
+    if cached is not None:
+        (cached_bareme_by_type_sal_name, cached_type_sal_partition, cached_assiette, cached_plafond,
+            bundle) = cached
+        if cached_bareme_by_type_sal_name is bareme_by_type_sal_name \
+                and cached_type_sal_partition is type_sal_partition \
+                and (cached_assiette == assiette_cotisations_sociales).all() \
+                and (cached_plafond == plafond_securite_sociale).all():
+            return bundle
+
+    bundle = compute_cotisations_bundle(
+        bareme_by_type_sal_name = bareme_by_type_sal_name,
+        base = assiette_cotisations_sociales,
+        plafond_securite_sociale = plafond_securite_sociale,
+        type_sal_partition = type_sal_partition,
+        )
+    cache[(cotisation_type, period)] = (
+        bareme_by_type_sal_name,
+        type_sal_partition,
+        assiette_cotisations_sociales.copy(),
+        plafond_securite_sociale.copy(),
+        bundle,
+        )
+    return bundle
+
+
 def apply_bareme(simulation, period, cotisation_type = None, bareme_name = None, variable_name = None):
     # period = period.start.offset('first-of', 'month').period('month')
     cotisation_mode_recouvrement = simulation.calculate('cotisation_sociale_mode_recouvrement', period)
@@ -81,28 +274,42 @@ def apply_bareme(simulation, period, cotisation_type = None, bareme_name = None,
     return cotisation
 
 
-def compute_cotisation(simulation, period, cotisation_type = None, bareme_name = None):
+def calculate_add_cumul_annuel(simulation, variable_name, period):
+    """Sum variable_name over period.
 
-    assert cotisation_type is not None
-    law = simulation.legislation_at(period.start)
-    if cotisation_type == "employeur":
-        bareme_by_type_sal_name = law.cotsoc.cotisations_employeur
-    elif cotisation_type == "salarie":
-        bareme_by_type_sal_name = law.cotsoc.cotisations_salarie
-    assert bareme_name is not None
+    When period starts on the 1st of January, the sum is read from the `<variable_name>_cumul_annuel` variable, which
+    maintains a running sum month after month, instead of adding up all the months of the period again.
+    """
+    if period.start.month == 1 and period.start.day == 1 and period.stop.year == period.start.year:
+        last_month = period.stop.offset('first-of', 'month').period('month')
+        return simulation.calculate('{}_cumul_annuel'.format(variable_name), last_month)
+    return simulation.calculate_add(variable_name, period)
 
-    assiette_cotisations_sociales = simulation.calculate_add('assiette_cotisations_sociales', period)
-    plafond_securite_sociale = simulation.calculate_add('plafond_securite_sociale', period)
-    type_sal = simulation.calculate('type_sal', period)
 
-    cotisation = apply_bareme_for_relevant_type_sal(
-        bareme_by_type_sal_name = bareme_by_type_sal_name,
-        bareme_name = bareme_name,
-        base = assiette_cotisations_sociales,
-        plafond_securite_sociale = plafond_securite_sociale,
-        type_sal = type_sal,
-        )
-    return cotisation
+def compute_cumul_annuel(simulation, period, variable_name):
+    """Add the value of variable_name for the month period to its sum since the beginning of the year."""
+    valeur = simulation.calculate(variable_name, period)
+    if period.start.month == 1:
+        return valeur
+    cumul_mois_precedent = simulation.calculate('{}_cumul_annuel'.format(variable_name), period.offset(-1))
+    return cumul_mois_precedent + valeur
+
+
+def compute_cotisation(simulation, period, cotisation_type = None, bareme_name = None):
+    assert cotisation_type is not None
+    assert bareme_name is not None
+    column_index_by_name, cotisations = get_cotisations_bundle(simulation, period, cotisation_type = cotisation_type)
+    # The bundle is computed by the first cotisation requesting it and reused by the next ones: read the barèmes of this
+    # cotisation, so that they are credited to it when the legislation read by each variable is recorded (see
+    # legislation_index.py).
+    bareme_by_type_sal_name = get_bareme_by_type_sal_name(simulation, period, cotisation_type = cotisation_type)
+    for type_sal_name, indices in get_type_sal_partition(simulation, period):
+        if type_sal_name in bareme_by_type_sal_name:
+            bareme_by_type_sal_name[type_sal_name].get(bareme_name)
+    column_index = column_index_by_name.get(bareme_name)
+    if column_index is None:
+        return zeros(len(cotisations))
+    return cotisations[:, column_index].copy()
 
 
 def compute_cotisation_annuelle(simulation, period, cotisation_type = None, bareme_name = None):
@@ -27,7 +27,7 @@ from __future__ import division
 from numpy import datetime64, maximum as max_, minimum as min_, round as round_, timedelta64
 
 from ....base import *  # noqa analysis:ignore
-from .base import apply_bareme_for_relevant_type_sal
+from .base import apply_bareme_for_relevant_type_sal, get_type_sal_partition
 
 
 reference_input_variable(
@@ -73,7 +73,7 @@ class exoneration_cotisations_employeur_jei(SimpleFormulaColumn):
         jeune_entreprise_innovante = simulation.calculate('jeune_entreprise_innovante', period)
         plafond_securite_sociale = simulation.calculate('plafond_securite_sociale', period)
         smic_proratise = simulation.calculate('smic_proratise', period)
-        type_sal = simulation.calculate('type_sal', period)
+        type_sal_partition = get_type_sal_partition(simulation, period)
 
         bareme_by_type_sal_name = simulation.legislation_at(period.start).cotsoc.cotisations_employeur
         bareme_names = ['vieillesse_deplafonnee', 'vieillesse_plafonnee', 'maladie', 'famille']
@@ -83,7 +83,7 @@ class exoneration_cotisations_employeur_jei(SimpleFormulaColumn):
             exoneration += apply_bareme_for_relevant_type_sal(
                 bareme_by_type_sal_name = bareme_by_type_sal_name,
                 bareme_name = bareme_name,
-                type_sal = type_sal,
+                type_sal_partition = type_sal_partition,
                 base = min_(assiette_allegement, 4.5 * smic_proratise),
                 plafond_securite_sociale = plafond_securite_sociale,
                 round_base_decimals = 2,
@@ -26,7 +26,6 @@
 from __future__ import division
 
 import collections
-import copy
 import logging
 
 
@@ -39,10 +38,31 @@ log = logging.getLogger(__name__)
 # TODO: contribution patronale de prévoyance complémentaire
 
 
+def copy_json(value_json):
+    """Copie profonde de value_json, plus rapide que copy.deepcopy car limitée aux types JSON.
+
+    Les listes et dictionnaires (noeuds, valeurs des paramètres, tranches des barèmes) sont copiés, afin que les barèmes
+    construits ne partagent rien avec cotsoc.pat et cotsoc.sal. Les autres valeurs (nombres, chaînes, dates) sont
+    immuables et sont donc partagées.
+
+    Les feuilles ne sont pas partagées car les réformes modifient sur place une copie de la législation faite par
+    copy.deepcopy, qui conserve ce partage : modifier un barème de cotisations_salarie modifierait aussi cotsoc.sal.
+    Partager les feuilles demanderait une copie sur écriture dans Reform.modify_legislation_json (OpenFisca-Core).
+    """
+    if isinstance(value_json, dict):
+        return value_json.__class__(
+            (key, copy_json(item_json))
+            for key, item_json in value_json.iteritems()
+            )
+    if isinstance(value_json, list):
+        return [copy_json(item_json) for item_json in value_json]
+    return value_json
+
+
 def build_pat(node_json):
     """Construit le dictionnaire de barèmes des cotisations employeur à partir de node_json['children']['cotsoc'][
         'children']['pat']"""
-    pat = copy.deepcopy(node_json['children']['cotsoc']['children']['pat'])
+    pat = copy_json(node_json['children']['cotsoc']['children']['pat'])
     commun = pat['children'].pop('commun')
 
     for bareme in ['apprentissage', 'apprentissage_add']:
@@ -90,7 +110,7 @@ def build_pat(node_json):
 
     pat['children']['public_titulaire_territoriale'] = pat['children'].pop('colloc_t')
 
-    pat['children']['public_titulaire_hospitaliere'] = copy.deepcopy(pat['children']['public_titulaire_territoriale'])
+    pat['children']['public_titulaire_hospitaliere'] = copy_json(pat['children']['public_titulaire_territoriale'])
     for category in ['territoriale', 'hospitaliere']:
         for name, bareme in pat['children']['public_titulaire_' + category]['children'][category]['children'].iteritems(
                 ):
@@ -110,7 +130,7 @@ def build_sal(node_json):
     à partir des informations contenues dans node_json['children']['cotsoc']['children']['sal']
     Construit le dictionnaire de barèmes des cotisations salariales
     '''
-    sal = copy.deepcopy(node_json['children']['cotsoc']['children']['sal'])
+    sal = copy_json(node_json['children']['cotsoc']['children']['sal'])
     sal['children']['noncadre']['children'].update(sal['children']['commun']['children'])
     sal['children']['cadre']['children'].update(sal['children']['commun']['children'])
 
@@ -30,7 +30,7 @@ from numpy import maximum as max_
 
 
 from ....base import *  # noqa analysis:ignore
-from .base import apply_bareme_for_relevant_type_sal
+from .base import apply_bareme_for_relevant_type_sal, get_type_sal_partition
 
 
 reference_input_variable(
@@ -115,7 +115,7 @@ class exoneration_cotisations_employeur_stagiaire(SimpleFormulaColumn):
         plafond_securite_sociale = simulation.calculate('plafond_securite_sociale', period)
         stage_gratification_reintegration = simulation.calculate('stage_gratification_reintegration', period)
         stagiaire = simulation.calculate('stagiaire', period)
-        type_sal = simulation.calculate('type_sal', period)
+        type_sal_partition = get_type_sal_partition(simulation, period)
 
         bareme_by_type_sal_name = simulation.legislation_at(period.start).cotsoc.cotisations_employeur
         bareme_names = ['agffnc', 'agffc', 'chomfg', 'assedic']
@@ -125,7 +125,7 @@ class exoneration_cotisations_employeur_stagiaire(SimpleFormulaColumn):
             exoneration += apply_bareme_for_relevant_type_sal(
                 bareme_by_type_sal_name = bareme_by_type_sal_name,
                 bareme_name = bareme_name,
-                type_sal = type_sal,
+                type_sal_partition = type_sal_partition,
                 base = stage_gratification_reintegration,
                 plafond_securite_sociale = plafond_securite_sociale,
                 round_base_decimals = 2,
@@ -149,7 +149,7 @@ class exoneration_cotisations_salarie_stagiaire(SimpleFormulaColumn):
         plafond_securite_sociale = simulation.calculate('plafond_securite_sociale', period)
         stage_gratification_reintegration = simulation.calculate('stage_gratification_reintegration', period)
         stagiaire = simulation.calculate('stagiaire', period)
-        type_sal = simulation.calculate('type_sal', period)
+        type_sal_partition = get_type_sal_partition(simulation, period)
 
         bareme_by_type_sal_name = simulation.legislation_at(period.start).cotsoc.cotisations_salarie
         bareme_names = ['agff', 'assedic']
@@ -159,7 +159,7 @@ class exoneration_cotisations_salarie_stagiaire(SimpleFormulaColumn):
             exoneration += apply_bareme_for_relevant_type_sal(
                 bareme_by_type_sal_name = bareme_by_type_sal_name,
                 bareme_name = bareme_name,
-                type_sal = type_sal,
+                type_sal_partition = type_sal_partition,
                 base = stage_gratification_reintegration,
                 plafond_securite_sociale = plafond_securite_sociale,
                 round_base_decimals = 2,
@@ -30,7 +30,7 @@ import math
 from numpy import minimum as min_
 
 from ....base import *  # noqa analysis:ignore
-from .base import apply_bareme_for_relevant_type_sal
+from .base import apply_bareme_for_relevant_type_sal, get_type_sal_partition
 
 
 @reference_formula
@@ -45,7 +45,7 @@ class allocations_temporaires_invalidite(SimpleFormulaColumn):
 
         assiette_cotisations_sociales_public = simulation.calculate('assiette_cotisations_sociales_public', period)
         plafond_securite_sociale = simulation.calculate('plafond_securite_sociale', period)
-        type_sal = simulation.calculate('type_sal', period)
+        type_sal_partition = get_type_sal_partition(simulation, period)
         _P = simulation.legislation_at(period.start)
 
         base = assiette_cotisations_sociales_public
@@ -54,14 +54,14 @@ class allocations_temporaires_invalidite(SimpleFormulaColumn):
             bareme_name = "ati",
             base = base,
             plafond_securite_sociale = plafond_securite_sociale,
-            type_sal = type_sal,
+            type_sal_partition = type_sal_partition,
             )
         cotisation_collectivites_locales = apply_bareme_for_relevant_type_sal(
             bareme_by_type_sal_name = _P.cotsoc.cotisations_employeur,
             bareme_name = "atiacl",
             base = base,
             plafond_securite_sociale = plafond_securite_sociale,
-            type_sal = type_sal,
+            type_sal_partition = type_sal_partition,
             )
         return period, cotisation_etat + cotisation_collectivites_locales
 
@@ -154,14 +154,14 @@ class fonds_emploi_hospitalier(SimpleFormulaColumn):
 
         assiette_cotisations_sociales_public = simulation.calculate('assiette_cotisations_sociales_public', period)
         plafond_securite_sociale = simulation.calculate('plafond_securite_sociale', period)
-        type_sal = simulation.calculate('type_sal', period)
+        type_sal_partition = get_type_sal_partition(simulation, period)
         _P = simulation.legislation_at(period.start)
         cotisation = apply_bareme_for_relevant_type_sal(
             bareme_by_type_sal_name = _P.cotsoc.cotisations_employeur,
             bareme_name = "feh",
             base = assiette_cotisations_sociales_public,  # TODO: check base
             plafond_securite_sociale = plafond_securite_sociale,
-            type_sal = type_sal,
+            type_sal_partition = type_sal_partition,
             )
         return period, cotisation
 
@@ -176,7 +176,7 @@ class ircantec_salarie(SimpleFormulaColumn):
         period = period.start.offset('first-of', 'month').period('month')
         assiette_cotisations_sociales = simulation.calculate('assiette_cotisations_sociales', period)
         plafond_securite_sociale = simulation.calculate('plafond_securite_sociale', period)
-        type_sal = simulation.calculate('type_sal', period)
+        type_sal_partition = get_type_sal_partition(simulation, period)
         _P = simulation.legislation_at(period.start)
 
         ircantec = apply_bareme_for_relevant_type_sal(
@@ -184,7 +184,7 @@ class ircantec_salarie(SimpleFormulaColumn):
             bareme_name = "ircantec",
             base = assiette_cotisations_sociales,
             plafond_securite_sociale = plafond_securite_sociale,
-            type_sal = type_sal,
+            type_sal_partition = type_sal_partition,
             )
         return period, ircantec
 
@@ -199,7 +199,7 @@ class ircantec_employeur(SimpleFormulaColumn):
         period = period.start.offset('first-of', 'month').period('month')
         assiette_cotisations_sociales = simulation.calculate('assiette_cotisations_sociales', period)
         plafond_securite_sociale = simulation.calculate('plafond_securite_sociale', period)
-        type_sal = simulation.calculate('type_sal', period)
+        type_sal_partition = get_type_sal_partition(simulation, period)
         _P = simulation.legislation_at(period.start)
 
         ircantec = apply_bareme_for_relevant_type_sal(
@@ -207,7 +207,7 @@ class ircantec_employeur(SimpleFormulaColumn):
             bareme_name = "ircantec",
             base = assiette_cotisations_sociales,
             plafond_securite_sociale = plafond_securite_sociale,
-            type_sal = type_sal,
+            type_sal_partition = type_sal_partition,
             )
         return period, ircantec
 
@@ -32,7 +32,7 @@ from numpy import int16, maximum as max_, minimum as min_, logical_not as not_
 
 
 from ....base import *  # noqa analysis:ignore
-from .base import apply_bareme, apply_bareme_for_relevant_type_sal
+from .base import apply_bareme, apply_bareme_for_relevant_type_sal, compute_cumul_annuel, get_type_sal_partition
 
 
 log = logging.getLogger(__name__)
@@ -62,6 +62,17 @@ class assiette_cotisations_sociales(SimpleFormulaColumn):
             )
 
 
+@reference_formula
+class assiette_cotisations_sociales_cumul_annuel(SimpleFormulaColumn):
+    column = FloatCol
+    entity_class = Individus
+    label = u"Assiette des cotisations sociales des salaries cumulée depuis le début de l'année"
+
+    def function(self, simulation, period):
+        period = period.start.offset('first-of', 'month').period(u'month')
+        return period, compute_cumul_annuel(simulation, period, 'assiette_cotisations_sociales')
+
+
 @reference_formula
 class assiette_cotisations_sociales_prive(SimpleFormulaColumn):
     column = FloatCol
@@ -174,7 +185,7 @@ class agff_employeur(SimpleFormulaColumn):
         period = period.start.period(u'month').offset('first-of')
         assiette_cotisations_sociales = simulation.calculate(
             'assiette_cotisations_sociales', period)
-        type_sal = simulation.calculate('type_sal', period)
+        type_sal_partition = get_type_sal_partition(simulation, period)
         plafond_securite_sociale = simulation.calculate('plafond_securite_sociale', period)
 
         law = simulation.legislation_at(period.start)
@@ -184,7 +195,7 @@ class agff_employeur(SimpleFormulaColumn):
             bareme_name = "agffnc",
             base = assiette_cotisations_sociales,
             plafond_securite_sociale = plafond_securite_sociale,
-            type_sal = type_sal,
+            type_sal_partition = type_sal_partition,
             )
 
         cotisation_cadre = apply_bareme_for_relevant_type_sal(
@@ -192,7 +203,7 @@ class agff_employeur(SimpleFormulaColumn):
             bareme_name = "agffc",
             base = assiette_cotisations_sociales,
             plafond_securite_sociale = plafond_securite_sociale,
-            type_sal = type_sal,
+            type_sal_partition = type_sal_partition,
             )
         return period, cotisation_cadre + cotisation_non_cadre
 
@@ -604,6 +615,17 @@ class plafond_securite_sociale(SimpleFormulaColumn):
         return period, plafond_securite_sociale
 
 
+@reference_formula
+class plafond_securite_sociale_cumul_annuel(SimpleFormulaColumn):
+    column = FloatCol
+    entity_class = Individus
+    label = u"Plafond de la securite sociale cumulé depuis le début de l'année"
+
+    def function(self, simulation, period):
+        period = period.start.offset('first-of', 'month').period(u'month')
+        return period, compute_cumul_annuel(simulation, period, 'plafond_securite_sociale')
+
+
 @reference_formula
 class prevoyance_obligatoire_cadre(SimpleFormulaColumn):
     column = FloatCol
@@ -29,17 +29,18 @@ import csv
 import logging
 import pkg_resources
 
-from numpy import fromiter, logical_or as or_, round as round_
+from numpy import logical_or as or_, round as round_
 
 
 import openfisca_france
 from ...base import *  # noqa analysis:ignore
+from ...depcom import DepcomIndex, load_depcom_indexes
 
 
 log = logging.getLogger(__name__)
 
-taux_aot_by_depcom = None
-taux_smt_by_depcom = None
+taux_aot_index = None
+taux_smt_index = None
 
 
 # TODO:
@@ -333,20 +334,8 @@ class taux_versement_transport(SimpleFormulaColumn):
         preload_taux_versement_transport()
         public = (type_sal >= 2)
         default_value = 0.0
-        taux_aot = fromiter(
-            (
-                taux_aot_by_depcom.get(depcom_cell, default_value)
-                for depcom_cell in depcom_entreprise
-                ),
-            dtype = 'float',
-            )
-        taux_smt = fromiter(
-            (
-                taux_smt_by_depcom.get(depcom_cell, default_value)
-                for depcom_cell in depcom_entreprise
-                ),
-            dtype = 'float',
-            )
+        taux_aot = taux_aot_index.lookup(depcom_entreprise, default_value)
+        taux_smt = taux_smt_index.lookup(depcom_entreprise, default_value)
         # "L'entreprise emploie-t-elle plus de 9 salariés  dans le périmètre de l'Autorité organisatrice de transport
         # (AOT) suivante ou syndicat mixte de transport (SMT)"
         return period, (taux_aot + taux_smt) * or_(effectif_entreprise > 9, public) / 100
@@ -366,26 +355,36 @@ class versement_transport(SimpleFormulaColumn):
         return period, cotisation
 
 
+taux_versement_transport_asset_names = [
+    'assets/versement_transport/taux.csv',
+    ]
+
+
+def build_taux_versement_transport_index_by_key():
+    with pkg_resources.resource_stream(
+            openfisca_france.__name__,
+            'assets/versement_transport/taux.csv',
+            ) as csv_file:
+        csv_reader = csv.DictReader(csv_file)
+        taux_aot_by_depcom = {}
+        taux_smt_by_depcom = {}
+        for row in csv_reader:
+            # Autorité organisatrice des transports
+            taux_aot_by_depcom[row['code INSEE']] = float(row['taux'] or 0)
+            # Syndicat mixte de transport
+            taux_smt_by_depcom[row['code INSEE']] = float(row['taux additionnel'] or 0)
+    return dict(
+        taux_aot = DepcomIndex(taux_aot_by_depcom),
+        taux_smt = DepcomIndex(taux_smt_by_depcom),
+        )
+
+
 def preload_taux_versement_transport():
-    global taux_aot_by_depcom
-    global taux_smt_by_depcom
-    if taux_aot_by_depcom is None:
-        with pkg_resources.resource_stream(
-                openfisca_france.__name__,
-                'assets/versement_transport/taux.csv',
-                ) as csv_file:
-            csv_reader = csv.DictReader(csv_file)
-            taux_aot_by_depcom = {
-                row['code INSEE']: float(row['taux'] or 0)  # autorité organisatrice des transports
-                for row in csv_reader
-                }
-    if taux_smt_by_depcom is None:
-        with pkg_resources.resource_stream(
-                openfisca_france.__name__,
-                'assets/versement_transport/taux.csv',
-                ) as csv_file:
-            csv_reader = csv.DictReader(csv_file)
-            taux_smt_by_depcom = {
-                row['code INSEE']: float(row['taux additionnel'] or 0)  # syndicat mixte de transport
-                for row in csv_reader
-                }
+    global taux_aot_index
+    global taux_smt_index
+    if taux_aot_index is None or taux_smt_index is None:
+        # Use the precompiled indexes when available (see scripts/build_assets_cache.py).
+        index_by_key = load_depcom_indexes('taux_versement_transport', taux_versement_transport_asset_names) \
+            or build_taux_versement_transport_index_by_key()
+        taux_aot_index = index_by_key['taux_aot']
+        taux_smt_index = index_by_key['taux_smt']
@@ -30,17 +30,18 @@ import json
 import logging
 import pkg_resources
 
-from numpy import (ceil, fromiter, int16, logical_not as not_, logical_or as or_, logical_and as and_, maximum as max_,
+from numpy import (ceil, int16, logical_not as not_, logical_or as or_, logical_and as and_, maximum as max_,
     minimum as min_, round)
 
 import openfisca_france
 
 from ..base import *  # noqa  analysis:ignore
+from ..depcom import DepcomIndex, load_depcom_indexes
 from .prestations_familiales.base_ressource import nb_enf
 
 log = logging.getLogger(__name__)
 
-zone_apl_by_depcom = None
+zone_apl_index = None
 
 
 @reference_formula
@@ -77,8 +78,8 @@ class al_pac(SimpleFormulaColumn):
         af = simulation.legislation_at(period.start).fam.af
         cf = simulation.legislation_at(period.start).fam.cf
 
-        age = self.split_by_roles(age_holder, roles = ENFS)
-        smic55 = self.split_by_roles(smic55_holder, roles = ENFS)
+        age = split_by_roles_matrix(self, age_holder, roles = ENFS)
+        smic55 = split_by_roles_matrix(self, smic55_holder, roles = ENFS)
 
         # P_AL.D_enfch est une dummy qui vaut 1 si les enfants sont comptés à
         # charge (cas actuel) et zéro sinon.
@@ -622,36 +623,43 @@ class zone_apl(SimpleFormulaColumn):
 
         preload_zone_apl()
         default_value = 2
-        return period, fromiter(
-            (
-                zone_apl_by_depcom.get(depcom_cell, default_value)
-                for depcom_cell in depcom
-                ),
-            dtype = int16,
-            )
+        return period, zone_apl_index.lookup(depcom, default_value)
+
+
+zone_apl_asset_names = [
+    'assets/apl/20110914_zonage.csv',
+    'assets/apl/commune_depcom_by_subcommune_depcom.json',
+    ]
+
+
+def build_zone_apl_index_by_key():
+    with pkg_resources.resource_stream(
+            openfisca_france.__name__,
+            'assets/apl/20110914_zonage.csv',
+            ) as csv_file:
+        csv_reader = csv.DictReader(csv_file)
+        zone_apl_by_depcom = {
+            # Keep only first char of Zonage column because of 1bis value considered equivalent to 1.
+            row['CODGEO']: int(row['Zonage'][0])
+            for row in csv_reader
+            }
+    # Add subcommunes (arrondissements and communes associées), use the same value as their parent commune.
+    with pkg_resources.resource_stream(
+            openfisca_france.__name__,
+            'assets/apl/commune_depcom_by_subcommune_depcom.json',
+            ) as json_file:
+        commune_depcom_by_subcommune_depcom = json.load(json_file)
+        for subcommune_depcom, commune_depcom in commune_depcom_by_subcommune_depcom.iteritems():
+            zone_apl_by_depcom[subcommune_depcom] = zone_apl_by_depcom[commune_depcom]
+    return dict(zone_apl = DepcomIndex(zone_apl_by_depcom, dtype = int16))
 
 
 def preload_zone_apl():
-    global zone_apl_by_depcom
-    if zone_apl_by_depcom is None:
-        with pkg_resources.resource_stream(
-                openfisca_france.__name__,
-                'assets/apl/20110914_zonage.csv',
-                ) as csv_file:
-            csv_reader = csv.DictReader(csv_file)
-            zone_apl_by_depcom = {
-                # Keep only first char of Zonage column because of 1bis value considered equivalent to 1.
-                row['CODGEO']: int(row['Zonage'][0])
-                for row in csv_reader
-                }
-        # Add subcommunes (arrondissements and communes associées), use the same value as their parent commune.
-        with pkg_resources.resource_stream(
-                openfisca_france.__name__,
-                'assets/apl/commune_depcom_by_subcommune_depcom.json',
-                ) as json_file:
-            commune_depcom_by_subcommune_depcom = json.load(json_file)
-            for subcommune_depcom, commune_depcom in commune_depcom_by_subcommune_depcom.iteritems():
-                zone_apl_by_depcom[subcommune_depcom] = zone_apl_by_depcom[commune_depcom]
+    global zone_apl_index
+    if zone_apl_index is None:
+        # Use the precompiled index when available (see scripts/build_assets_cache.py).
+        index_by_key = load_depcom_indexes('zone_apl', zone_apl_asset_names) or build_zone_apl_index_by_key()
+        zone_apl_index = index_by_key['zone_apl']
 
 
 @reference_formula
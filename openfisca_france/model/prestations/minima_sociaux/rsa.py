@@ -67,9 +67,9 @@ class aefa(DatedFormulaColumn):
         P = simulation.legislation_at(period.start).minim.aefa
         af = simulation.legislation_at(period.start).fam.af
 
-        age = self.split_by_roles(age_holder, roles = ENFS)
+        age = split_by_roles_matrix(self, age_holder, roles = ENFS)
         aer = self.sum_by_entity(aer_holder)
-        smic55 = self.split_by_roles(smic55_holder, roles = ENFS)
+        smic55 = split_by_roles_matrix(self, smic55_holder, roles = ENFS)
         dummy_ass = ass > 0
         dummy_aer = aer > 0
         dummy_api = api > 0
@@ -104,9 +104,9 @@ class aefa(DatedFormulaColumn):
         P = simulation.legislation_at(period.start).minim.aefa
         af = simulation.legislation_at(period.start).fam.af
 
-        age = self.split_by_roles(age_holder, roles = ENFS)
+        age = split_by_roles_matrix(self, age_holder, roles = ENFS)
         aer = self.sum_by_entity(aer_holder)
-        smic55 = self.split_by_roles(smic55_holder, roles = ENFS)
+        smic55 = split_by_roles_matrix(self, smic55_holder, roles = ENFS)
         dummy_ass = ass > 0
         dummy_aer = aer > 0
         dummy_api = api > 0
@@ -142,9 +142,9 @@ class aefa(DatedFormulaColumn):
         P = simulation.legislation_at(period.start).minim.aefa
         af = simulation.legislation_at(period.start).fam.af
 
-        age = self.split_by_roles(age_holder, roles = ENFS)
+        age = split_by_roles_matrix(self, age_holder, roles = ENFS)
         aer = self.sum_by_entity(aer_holder)
-        smic55 = self.split_by_roles(smic55_holder, roles = ENFS)
+        smic55 = split_by_roles_matrix(self, smic55_holder, roles = ENFS)
         dummy_ass = ass > 0
         dummy_aer = aer > 0
         dummy_api = api > 0
@@ -190,9 +190,9 @@ class api(DatedFormulaColumn):
         af = simulation.legislation_at(period.start).fam.af
         api = simulation.legislation_at(period.start).minim.api
 
-        age = self.split_by_roles(age_holder, roles = ENFS)
-        age_en_mois = self.split_by_roles(age_en_mois_holder, roles = ENFS)
-        smic55 = self.split_by_roles(smic55_holder, roles = ENFS)
+        age = split_by_roles_matrix(self, age_holder, roles = ENFS)
+        age_en_mois = split_by_roles_matrix(self, age_en_mois_holder, roles = ENFS)
+        smic55 = split_by_roles_matrix(self, smic55_holder, roles = ENFS)
         # TODO:
         #    Majoration pour isolement
         #    Si vous êtes parent isolé, c’est-à-dire célibataire, divorcé(e), séparé(e) ou veuf(ve) avec des enfants
@@ -456,7 +456,7 @@ class enceinte_fam(SimpleFormulaColumn):
         age_en_mois_holder = simulation.compute('age_en_mois', period)
         enceinte_holder = simulation.compute('enceinte', period)
 
-        age_en_mois_enf = self.split_by_roles(age_en_mois_holder, roles = ENFS)
+        age_en_mois_enf = split_by_roles_matrix(self, age_en_mois_holder, roles = ENFS)
         enceinte = self.split_by_roles(enceinte_holder, roles = [CHEF, PART])
 
         benjamin = age_en_mois_benjamin(age_en_mois_enf)
@@ -475,8 +475,8 @@ class nb_enfant_rsa(SimpleFormulaColumn):
         rmi = simulation.legislation_at(period.start).minim.rmi
         age_holder = simulation.compute('age', period)
         smic55_holder = simulation.compute('smic55', period)
-        age_enf = self.split_by_roles(age_holder, roles = ENFS)
-        smic55_enf = self.split_by_roles(smic55_holder, roles = ENFS)
+        age_enf = split_by_roles_matrix(self, age_holder, roles = ENFS)
+        smic55_enf = split_by_roles_matrix(self, smic55_holder, roles = ENFS)
         nbenf = nb_enf(age_enf, smic55_enf, 0, rmi.age_pac)
 
         return period, nbenf
@@ -622,8 +622,8 @@ class rmi_nbp(SimpleFormulaColumn):
         nb_par = simulation.calculate('nb_par', period)
         P = simulation.legislation_at(period.start).minim.rmi
 
-        age = self.split_by_roles(age_holder, roles = ENFS)
-        smic55 = self.split_by_roles(smic55_holder, roles = ENFS)
+        age = split_by_roles_matrix(self, age_holder, roles = ENFS)
+        smic55 = split_by_roles_matrix(self, smic55_holder, roles = ENFS)
 
         return period, nb_par + nb_enf(age, smic55, 0, P.age_pac - 1)  # TODO: check limite d'âge in legislation
 
@@ -25,6 +25,8 @@
 
 from __future__ import division
 
+from numpy import newaxis
+
 from ...base import *  # noqa
 
 
@@ -51,18 +53,13 @@ class aeeh(DatedFormulaColumn):
         period = period.start.offset('first-of', 'month').period('year')
         age_holder = simulation.compute('age', period)
         invalide_holder = simulation.compute('invalide', period)
-        categ_invalide_holder = simulation.compute('categ_inv', period)
         P = simulation.legislation_at(period.start).fam
 
-        age = self.split_by_roles(age_holder, roles = ENFS)
-        categ_inv = self.split_by_roles(categ_invalide_holder, roles = ENFS)
-        invalide = self.split_by_roles(invalide_holder, roles = ENFS)
+        age = split_by_roles_matrix(self, age_holder, roles = ENFS)
+        invalide = split_by_roles_matrix(self, invalide_holder, roles = ENFS)
 
-        aeeh = 0
-        for enfant in age.iterkeys():
-            enfhand = invalide[enfant] * (age[enfant] < P.aeeh.age) / 12
-            categ = categ_inv[enfant]
-            aeeh += 0 * enfhand  # TODO:
+        enfhand = invalide * (age < P.aeeh.age) / 12
+        aeeh = (0 * enfhand).sum(axis = 1)  # TODO: utiliser categ_inv
 
     # L'attribution de l'AEEH de base et de ses compléments éventuels ne fait pas obstacle au
     # versement des prestations familiales.
@@ -96,22 +93,22 @@ class aeeh(DatedFormulaColumn):
         categ_invalide_holder = simulation.compute('categ_inv', period)
         P = simulation.legislation_at(period.start).fam
 
-        age = self.split_by_roles(age_holder, roles = ENFS)
-        categ_inv = self.split_by_roles(categ_invalide_holder, roles = ENFS)
-        invalide = self.split_by_roles(invalide_holder, roles = ENFS)
+        age = split_by_roles_matrix(self, age_holder, roles = ENFS)
+        categ_inv = split_by_roles_matrix(self, categ_invalide_holder, roles = ENFS)
+        invalide = split_by_roles_matrix(self, invalide_holder, roles = ENFS)
 
-        aeeh = 0
-        for enfant in age.iterkeys():
-            enfhand = invalide[enfant] * (age[enfant] < P.aeeh.age) / 12
-            categ = categ_inv[enfant]
-            aeeh += enfhand * (P.af.bmaf * (P.aeeh.base +
+        # Matrices famille x enfant
+        enfhand = invalide * (age < P.aeeh.age) / 12
+        categ = categ_inv
+        isol = isol[:, newaxis]
+        aeeh = (enfhand * (P.af.bmaf * (P.aeeh.base +
                                   P.aeeh.cpl1 * (categ == 1) +
                                   (categ == 2) * (P.aeeh.cpl2 + P.aeeh.maj2 * isol) +
                                   (categ == 3) * (P.aeeh.cpl3 + P.aeeh.maj3 * isol) +
                                   (categ == 4) * (P.aeeh.cpl4 + P.aeeh.maj4 * isol) +
                                   (categ == 5) * (P.aeeh.cpl5 + P.aeeh.maj5 * isol) +
                                   (categ == 6) * (P.aeeh.maj6 * isol)) +
-                                  (categ == 6) * P.aeeh.cpl6)
+                                  (categ == 6) * P.aeeh.cpl6)).sum(axis = 1)
 
     # L'attribution de l'AEEH de base et de ses compléments éventuels ne fait pas obstacle au
     # versement des prestations familiales.
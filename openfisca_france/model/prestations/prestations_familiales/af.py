@@ -25,7 +25,7 @@
 
 from __future__ import division
 
-from numpy import round, maximum as max_, logical_not as not_, logical_or as or_
+from numpy import round, maximum as max_, logical_not as not_, logical_or as or_, where
 
 
 from ...base import *  # noqa analysis:ignore
@@ -79,9 +79,9 @@ class af_forf_nbenf(SimpleFormulaColumn):
     def function(self, simulation, period):
         period = period.start.offset('first-of', 'month').period('month')
         age_holder = simulation.compute('age', period)
-        age = self.split_by_roles(age_holder, roles = ENFS)
+        age = split_by_roles_matrix(self, age_holder, roles = ENFS)
         smic55_holder = simulation.compute('smic55', period)
-        smic55 = self.split_by_roles(smic55_holder, roles = ENFS)
+        smic55 = split_by_roles_matrix(self, smic55_holder, roles = ENFS)
         pfam = simulation.legislation_at(period.start).fam.af
         af_forf_nbenf = nb_enf(age, smic55, pfam.age3, pfam.age3)
 
@@ -223,19 +223,16 @@ class af_age_aine(SimpleFormulaColumn):
         period = period.start.offset('first-of', 'month').period('month')
 
         age_holder = simulation.compute('age', period)
-        age_enfants = self.split_by_roles(age_holder, roles = ENFS)
+        age_enfants = split_by_roles_matrix(self, age_holder, roles = ENFS)
 
         af_enfant_a_charge_holder = simulation.compute('af_enfant_a_charge', period)
-        af_enfants_a_charge = self.split_by_roles(af_enfant_a_charge_holder, roles = ENFS)
+        af_enfants_a_charge = split_by_roles_matrix(self, af_enfant_a_charge_holder, roles = ENFS)
 
         pfam = simulation.legislation_at(period.start).fam
 
         # Calcul de l'âge de l'aîné
-        age_aine = -9999
-        for key, age in age_enfants.iteritems():
-            a_charge = af_enfants_a_charge[key] * (age <= pfam.af.age2)
-            aine_potentiel = a_charge * (age > age_aine)
-            age_aine = aine_potentiel * age + not_(aine_potentiel) * age_aine
+        a_charge = af_enfants_a_charge & (age_enfants <= pfam.af.age2)
+        age_aine = where(a_charge, age_enfants, -9999).max(axis = 1)
 
         return period, age_aine
 
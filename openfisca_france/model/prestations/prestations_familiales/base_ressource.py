@@ -25,7 +25,7 @@
 
 from __future__ import division
 
-from numpy import int32, logical_not as not_, logical_or as or_, zeros
+from numpy import int32, logical_not as not_, logical_or as or_, where
 
 
 from ...base import *  # noqa analysis:ignore
@@ -226,26 +226,21 @@ class br_pf(SimpleFormulaColumn):
 def nb_enf(ages, smic55, ag1, ag2):
     """
     Renvoie le nombre d'enfant au sens des allocations familiales dont l'âge est compris entre ag1 et ag2
+
+    ages et smic55 sont des matrices famille x enfant (cf split_by_roles_matrix).
     """
 #        Les allocations sont dues à compter du mois civil qui suit la naissance
 #        ag1==0 ou suivant les anniversaires ag1>0.
 #        Un enfant est reconnu à charge pour le versement des prestations
 #        jusqu'au mois précédant son age limite supérieur (ag2 + 1) mais
 #        le versement à lieu en début de mois suivant
-    res = None
-    for key, age in ages.iteritems():
-        if res is None:
-            res = zeros(len(age), dtype = int32)
-        res += (ag1 <= age) & (age <= ag2) & not_(smic55[key])
-    return res
+    return ((ag1 <= ages) & (ages <= ag2) & not_(smic55)).sum(axis = 1).astype(int32)
 
 
 def age_en_mois_benjamin(ages_en_mois):
     '''
     Renvoie un vecteur (une entree pour chaque famille) avec l'age du benjamin.  # TODO check age_en_mois > 0
+
+    ages_en_mois est une matrice famille x enfant (cf split_by_roles_matrix).
     '''
-    age_en_mois_benjamin = 12 * 9999
-    for age_en_mois in ages_en_mois.itervalues():
-        isbenjamin = (age_en_mois < age_en_mois_benjamin) & (age_en_mois != -9999)
-        age_en_mois_benjamin = isbenjamin * age_en_mois + not_(isbenjamin) * age_en_mois_benjamin
-    return age_en_mois_benjamin
+    return where(ages_en_mois != -9999, ages_en_mois, 12 * 9999).min(axis = 1)
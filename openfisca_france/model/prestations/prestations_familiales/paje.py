@@ -102,8 +102,8 @@ class paje_base_temp(SimpleFormulaColumn):
 
         # TODO cumul des paje si et seulement si naissance multiples
 
-        age = self.split_by_roles(age_holder, roles = ENFS)
-        smic55 = self.split_by_roles(smic55_holder, roles = ENFS)
+        age = split_by_roles_matrix(self, age_holder, roles = ENFS)
+        smic55 = split_by_roles_matrix(self, smic55_holder, roles = ENFS)
 
         bmaf = pfam.af.bmaf
         bmaf2 = pfam_n_2.af.bmaf
@@ -151,16 +151,14 @@ class paje_nais(SimpleFormulaColumn):
         P = simulation.legislation_at(period.start).fam
 
         # age = self.split_by_roles(age_holder, roles = ENFS)
-        age_en_mois = self.split_by_roles(age_en_mois_holder, roles = ENFS)
+        age_en_mois = split_by_roles_matrix(self, age_en_mois_holder, roles = ENFS)
 
         bmaf = P.af.bmaf
         nais_prime = round(100 * P.paje.nais.prime_tx * bmaf) / 100
         # Versée au 7e mois de grossesse dans l'année
         # donc les enfants concernés sont les enfants qui ont -2 mois
-        nbnais = 0
-        for age_m in age_en_mois.itervalues():
-            nbnais += (age_m == -2)  # cas mensuel
-            # nbnais += (age_m >= -2) * (age_m < 10) # cas annuel
+        nbnais = (age_en_mois == -2).sum(axis = 1)  # cas mensuel
+        # nbnais = ((age_en_mois >= -2) * (age_en_mois < 10)).sum(axis = 1) # cas annuel
 
         nbenf = af_nbenf + nbnais  # On ajoute l'enfant à  naître;
 
@@ -213,7 +211,7 @@ class paje_clca(SimpleFormulaColumn):
 
         P = simulation.legislation_at(period.start).fam
 
-        age_en_mois = self.split_by_roles(age_en_mois_holder, roles = ENFS)
+        age_en_mois = split_by_roles_matrix(self, age_en_mois_holder, roles = ENFS)
 
         paje = paje_base >= 0
         # durée de versement :
@@ -337,11 +335,11 @@ class paje_clmg(SimpleFormulaColumn):
         P = simulation.legislation_at(period.start).fam
         P_n_2 = simulation.legislation_at(period.start.offset(-2, 'year')).fam
 
-        age = self.split_by_roles(age_holder, roles = ENFS)
+        age = split_by_roles_matrix(self, age_holder, roles = ENFS)
         etu = self.split_by_roles(etu_holder, roles = [CHEF, PART])
         hsup = self.split_by_roles(hsup_holder, roles = [CHEF, PART])
         salaire_imposable = self.split_by_roles(salaire_imposable_holder, roles = [CHEF, PART])
-        smic55 = self.split_by_roles(smic55_holder, roles = ENFS)
+        smic55 = split_by_roles_matrix(self, smic55_holder, roles = ENFS)
         aah = self.sum_by_entity(aah_holder)
 
         # condition de revenu minimal
@@ -417,7 +415,7 @@ class paje_colca(SimpleFormulaColumn):
 
         P = simulation.legislation_at(period.start).fam
 
-        age_en_mois = self.split_by_roles(age_en_mois_holder, roles = ENFS)
+        age_en_mois = split_by_roles_matrix(self, age_en_mois_holder, roles = ENFS)
         age_m_benjamin = age_en_mois_benjamin(age_en_mois)
         condition = (age_m_benjamin < 12 * P.paje.colca.age) * (age_m_benjamin >= 0)
         nbenf = af_nbenf
@@ -584,8 +582,8 @@ class ape_temp(SimpleFormulaColumn):
         partiel2 = simulation.calculate('partiel2', period)
         P = simulation.legislation_at(period.start).fam
 
-        age = self.split_by_roles(age_holder, roles = ENFS)
-        smic55 = self.split_by_roles(smic55_holder, roles = ENFS)
+        age = split_by_roles_matrix(self, age_holder, roles = ENFS)
+        smic55 = split_by_roles_matrix(self, smic55_holder, roles = ENFS)
 
         elig = (nb_enf(age, smic55, 0, P.ape.age - 1) >= 1) & (nb_enf(age, smic55, 0, P.af.age2) >= 2)
         # Inactif
@@ -628,8 +626,8 @@ class apje_temp(SimpleFormulaColumn):
         P = simulation.legislation_at(period.start).fam
         P_n_2 = simulation.legislation_at(period.start.offset(-2, 'year')).fam
 
-        age = self.split_by_roles(age_holder, roles = ENFS)
-        smic55 = self.split_by_roles(smic55_holder, roles = ENFS)
+        age = split_by_roles_matrix(self, age_holder, roles = ENFS)
+        smic55 = split_by_roles_matrix(self, smic55_holder, roles = ENFS)
 
         # TODO: APJE courte voir doc ERF 2006
         nbenf = nb_enf(age, smic55, 0, P.apje.age - 1)
@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+
+
+# OpenFisca -- A versatile microsimulation software
+# By: OpenFisca Team <contact@openfisca.fr>
+#
+# Copyright (C) 2011, 2012, 2013, 2014, 2015 OpenFisca Team
+# https://github.com/openfisca
+#
+# This file is part of OpenFisca.
+#
+# OpenFisca is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# OpenFisca is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""Per-variable profiling of simulations.
+
+A profiler attached to a simulation records, for each variable and period, the number of calls, cache hits and misses,
+the size of the computed arrays and the wall time spent, inclusive and exclusive of the dependencies. Simulations
+without a profiler are not affected at all.
+
+    profiler = SimulationProfiler()
+    simulation = scenario.new_simulation(profiler = profiler)
+    simulation.calculate('revdisp')
+    print profiler.format_table()
+    profiler.write_collapsed_stacks(file)  # Input of flamegraph.pl
+"""
+
+
+import collections
+import time
+
+
+__all__ = [
+    'SimulationProfiler',
+    ]
+
+
+class VariableStatistics(object):
+    array_size = 0
+    calls = 0
+    cache_hits = 0
+    cache_misses = 0
+    exclusive_duration = 0
+    inclusive_duration = 0
+
+
+class SimulationProfiler(object):
+    exclusive_duration_by_stack = None
+    stack = None  # List of [key, start time, duration of children] of the computations in progress
+    statistics_by_key = None
+
+    def __init__(self):
+        self.exclusive_duration_by_stack = collections.defaultdict(float)
+        self.stack = []
+        self.statistics_by_key = collections.OrderedDict()
+
+    def attach(self, simulation):
+        """Profile the computations of the holders of simulation, including the holders created later."""
+        for holder in getattr(simulation, 'holder_by_name', {}).itervalues():
+            self.profile_holder(holder)
+        if 'get_or_new_holder' in simulation.__dict__:
+            return simulation
+        get_or_new_holder = simulation.get_or_new_holder
+
+        def profiled_get_or_new_holder(column_name):
+            holder = get_or_new_holder(column_name)
+            self.profile_holder(holder)
+            return holder
+
+        simulation.get_or_new_holder = profiled_get_or_new_holder
+        return simulation
+
+    def detach(self, simulation):
+        simulation.__dict__.pop('get_or_new_holder', None)
+        for holder in getattr(simulation, 'holder_by_name', {}).itervalues():
+            holder.__dict__.pop('compute', None)
+
+    def format_table(self, limit = None, sort_key = 'exclusive_duration'):
+        """Return a text table of the statistics, sorted by decreasing sort_key."""
+        rows = sorted(
+            self.statistics_by_key.iteritems(),
+            key = lambda (key, statistics): getattr(statistics, sort_key),
+            reverse = True,
+            )[:limit]
+        lines = [u'{:<40} {:<12} {:>8} {:>8} {:>8} {:>12} {:>12} {:>10}'.format(u'variable', u'period', u'calls',
+            u'hits', u'misses', u'inclusive s', u'exclusive s', u'size')]
+        for (variable_name, period), statistics in rows:
+            lines.append(u'{:<40} {:<12} {:>8} {:>8} {:>8} {:>12.6f} {:>12.6f} {:>10}'.format(variable_name, period,
+                statistics.calls, statistics.cache_hits, statistics.cache_misses, statistics.inclusive_duration,
+                statistics.exclusive_duration, statistics.array_size))
+        return u'\n'.join(lines)
+
+    def profile_holder(self, holder):
+        if 'compute' in holder.__dict__:
+            return
+        compute = holder.compute
+        variable_name = holder.column.name
+        simulation = holder.entity.simulation
+
+        def profiled_compute(period = None, **parameters):
+            key = (variable_name, unicode(period if period is not None else simulation.period))
+            statistics = self.statistics_by_key.get(key)
+            if statistics is None:
+                statistics = self.statistics_by_key[key] = VariableStatistics()
+            statistics.calls += 1
+            try:
+                cached = holder.get_array(period if period is not None else simulation.period) is not None
+            except Exception:
+                cached = False
+            if cached:
+                statistics.cache_hits += 1
+            else:
+                statistics.cache_misses += 1
+            frame = [key, time.time(), 0]
+            self.stack.append(frame)
+            try:
+                dated_holder = compute(period = period, **parameters)
+            finally:
+                self.stack.pop()
+                duration = time.time() - frame[1]
+                exclusive_duration = duration - frame[2]
+                if self.stack:
+                    self.stack[-1][2] += duration
+                statistics.exclusive_duration += exclusive_duration
+                # Don't count twice the recursive computations of a variable (for example on sub-periods).
+                if all(stacked_key[0] != variable_name for stacked_key, _, _ in self.stack):
+                    statistics.inclusive_duration += duration
+                self.exclusive_duration_by_stack[tuple(
+                    stacked_key
+                    for stacked_key, _, _ in self.stack
+                    ) + (key,)] += exclusive_duration
+            array = getattr(dated_holder, 'array', None)
+            if array is not None:
+                statistics.array_size = max(statistics.array_size, len(array))
+            return dated_holder
+
+        holder.compute = profiled_compute
+
+    def write_collapsed_stacks(self, output_file):
+        """Write the exclusive durations (in microseconds) of the stacks, in the format of flamegraph.pl."""
+        for stack, duration in sorted(self.exclusive_duration_by_stack.iteritems()):
+            output_file.write(u'{} {}\n'.format(
+                u';'.join(u'{}@{}'.format(variable_name, period) for variable_name, period in stack),
+                int(round(duration * 1e6)),
+                ).encode('utf-8'))
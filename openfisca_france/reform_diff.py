@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+
+
+# OpenFisca -- A versatile microsimulation software
+# By: OpenFisca Team <contact@openfisca.fr>
+#
+# Copyright (C) 2011, 2012, 2013, 2014, 2015 OpenFisca Team
+# https://github.com/openfisca
+#
+# This file is part of OpenFisca.
+#
+# OpenFisca is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# OpenFisca is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Evaluation of a reform by difference with the reference.
+
+The reference simulation is computed once, while recording its dependency graph and the legislation parameters read
+by each variable (see openfisca_france.legislation_index). For each reform simulation, only the
+variables affected by the reform are computed: the variables whose formula is replaced by the reform, the variables
+reading a legislation parameter changed by the reform, and all the variables depending on them. The arrays of the
+other variables are shared with the reference simulation.
+
+    reform_diff = ReformDiff(scenario.new_simulation(reference = True), ['revdisp'])
+    for reform in reforms:
+        reform_revdisp, = reform_diff.calculate(reform_scenario.new_simulation())
+
+The shared arrays must not be modified in place.
+"""
+
+
+import collections
+import logging
+
+from openfisca_core import periods
+
+from .dependency_graph import record_dependency_graph
+from .legislation_index import LegislationIndex
+
+
+__all__ = [
+    'iter_changed_legislation_paths',
+    'iter_changed_variables_name',
+    'ReformDiff',
+    ]
+
+log = logging.getLogger(__name__)
+# Legislation nodes whose readers are not reliably recorded by the legislation index (the cotisations sociales are
+# computed together by a bundle cached on the simulation). A reform changing them disables the sharing of arrays.
+unindexed_legislation_paths = set([
+    ('children', 'cotsoc'),
+    ])
+
+
+def iter_changed_legislation_paths(reference_json, reform_json, path = ()):
+    """Yield the paths of the nodes which differ between two legislations."""
+    if isinstance(reference_json, dict) and isinstance(reform_json, dict):
+        for key in sorted(set(reference_json) | set(reform_json)):
+            if key not in reference_json or key not in reform_json:
+                yield path + (key,)
+            else:
+                for changed_path in iter_changed_legislation_paths(reference_json[key], reform_json[key],
+                        path + (key,)):
+                    yield changed_path
+    elif isinstance(reference_json, list) and isinstance(reform_json, list) \
+            and len(reference_json) == len(reform_json):
+        for index, (reference_item, reform_item) in enumerate(zip(reference_json, reform_json)):
+            for changed_path in iter_changed_legislation_paths(reference_item, reform_item, path + (index,)):
+                yield changed_path
+    elif reference_json != reform_json:
+        yield path
+
+
+def iter_changed_variables_name(reference_tax_benefit_system, reform_tax_benefit_system):
+    """Yield the names of the variables whose column is added or replaced by the reform."""
+    reference_column_by_name = reference_tax_benefit_system.column_by_name
+    for name, column in reform_tax_benefit_system.column_by_name.iteritems():
+        if reference_column_by_name.get(name) is not column:
+            yield name
+
+
+class ReformDiff(object):
+    graph = None
+    legislation_index = None  # Parameters read by each variable of the reference simulation
+    period = None
+    reference_arrays = None  # Arrays of the variables in the reference simulation
+    reference_simulation = None
+    variables_name = None
+
+    def __init__(self, reference_simulation, variables_name, period = None):
+        self.period = period if period is not None else reference_simulation.period
+        self.reference_simulation = reference_simulation
+        self.variables_name = variables_name
+        self.legislation_index = LegislationIndex()
+        self.graph = record_dependency_graph(reference_simulation, variables_name, self.period,
+            legislation_index = self.legislation_index)
+        self.reference_arrays = [
+            reference_simulation.calculate(variable_name, self.period)
+            for variable_name in variables_name
+            ]
+
+    def calculate(self, reform_simulation):
+        """Compute the variables in the reform simulation, sharing the unaffected arrays of the reference."""
+        reference_simulation = self.reference_simulation
+        affected_keys = self.get_affected_keys(reform_simulation.tax_benefit_system)
+        for key in self.graph.dependencies_by_key:
+            if key in affected_keys:
+                continue
+            name, period = key
+            period = periods.period(period)
+            reference_holder = reference_simulation.holder_by_name.get(name)
+            if reference_holder is None or reference_holder.column.is_permanent:
+                continue
+            array = reference_holder.get_array(period)
+            reform_holder = reform_simulation.get_or_new_holder(name)
+            if array is not None and reform_holder.get_array(period) is None:
+                reform_holder.set_array(period, array)
+        return [
+            reform_simulation.calculate(variable_name, self.period)
+            for variable_name in self.variables_name
+            ]
+
+    def get_affected_keys(self, reform_tax_benefit_system):
+        """Return the (variable name, period) keys of the graph whose value may differ in the reform."""
+        reference_tax_benefit_system = self.reference_simulation.tax_benefit_system
+        affected_variables_name = set(iter_changed_variables_name(reference_tax_benefit_system,
+            reform_tax_benefit_system))
+        changed_legislation_paths = list(iter_changed_legislation_paths(
+            reference_tax_benefit_system.legislation_json, reform_tax_benefit_system.legislation_json))
+        for path in changed_legislation_paths:
+            if path[:2] in unindexed_legislation_paths:
+                # The index may miss some variables reading these parameters: compute everything again.
+                log.info(u'Legislation changed at {}: no array is shared with the reference simulation'.format(
+                    u'.'.join(unicode(item) for item in path)))
+                return set(self.graph.dependencies_by_key)
+            affected_variables_name.update(self.legislation_index.iter_variables_name(path))
+        affected_keys = set(
+            key
+            for key in self.graph.dependencies_by_key
+            if key[0] in affected_variables_name
+            )
+
+        consumers_by_key = collections.defaultdict(list)
+        for key, dependencies in self.graph.dependencies_by_key.iteritems():
+            for dependency_key in dependencies:
+                consumers_by_key[dependency_key].append(key)
+        pending_keys = list(affected_keys)
+        while pending_keys:
+            for consumer_key in consumers_by_key.get(pending_keys.pop(), []):
+                if consumer_key not in affected_keys:
+                    affected_keys.add(consumer_key)
+                    pending_keys.append(consumer_key)
+        return affected_keys
@@ -25,28 +25,184 @@
 
 from __future__ import division
 
-# import logging
+import collections
+import logging
 
+from numpy import (abs as abs_, argsort, clip, concatenate, isfinite, linspace, maximum as max_, minimum as min_,
+    nonzero, ones, searchsorted, where, zeros)
 from openfisca_core import columns, formulas, reforms
 # from openfisca_core.taxscales import MarginalRateTaxScale
 
 from .. import entities
+from ..model.prelevements_obligatoires.prelevements_sociaux.cotisations_sociales.base import partition_by_type_sal
 
 
-# log = logging.getLogger(__name__)
+log = logging.getLogger(__name__)
+piecewise_linear_cache_size = 32
 
 
-def brut_to_target(target_name = None, period = None, simulation = None, **input_array_by_name):
+def make_brut_to_target(input_variable_name = None, target_name = None, period = None, simulation = None,
+        **input_array_by_name):
+    """Return a function computing the array of target_name from an array of input_variable_name.
+
+    Every call reuses the same scratch copy of the simulation: the arrays computed by a call are dropped before the next
+    one, instead of cloning the whole simulation again.
+    """
     simulation = simulation.clone(debug = simulation.debug, debug_all = simulation.debug_all, trace = simulation.trace)
     simulation.get_or_new_holder(target_name).delete_arrays()
     for variable_name, array in input_array_by_name.iteritems():
         simulation.get_or_new_holder(variable_name).set_array(period, array)
-    return simulation.calculate_add(target_name)
+    initial_arrays_by_holder = dict(
+        (holder, (holder._array, holder._array_by_period and holder._array_by_period.copy()))
+        for entity in simulation.entity_by_key_plural.itervalues()
+        for holder in entity.holder_by_name.itervalues()
+        )
 
+    def brut_to_target(brut):
+        for entity in simulation.entity_by_key_plural.itervalues():
+            for holder in entity.holder_by_name.itervalues():
+                initial_arrays = initial_arrays_by_holder.get(holder)
+                if initial_arrays is None:
+                    holder.delete_arrays()
+                else:
+                    array, array_by_period = initial_arrays
+                    holder._array = array
+                    holder._array_by_period = array_by_period and array_by_period.copy()
+        simulation.get_or_new_holder(input_variable_name).set_array(period, brut)
+        return simulation.calculate_add(target_name)
+
+    return brut_to_target
+
+
+def solve_elementwise(function, target, initial_value = None, max_iterations = 100, tolerance = 1e-4):
+    """Find x such that function(x) == target, for each element of target independently.
+
+    function must be element-wise and non-decreasing, like the gross to net chains. Each element follows secant steps
+    (ie Newton steps with a diagonal jacobian estimated from the previous iteration) and falls back on bisection once
+    its root is bracketed and the secant steps stop converging fast enough. All the elements are solved in parallel:
+    each iteration evaluates function once on the whole array.
+
+    An element converges only when its residual is below tolerance. When function jumps over the target, the bracket of
+    the element shrinks around the jump while its residual stays large: the element is then left at the jump and
+    reported in a warning.
+    """
+    x = (target if initial_value is None else initial_value) * ones(len(target))
+    residual = function(x) - target
+    lower = - ones(len(target)) * float('inf')
+    upper = ones(len(target)) * float('inf')
+    converged = abs_(residual) <= tolerance
+    collapsed = zeros(len(target), dtype = bool)  # Not converged, but bracket narrower than tolerance
+    previous_x = previous_residual = None
+    for iteration in range(max_iterations):
+        if (converged | collapsed).all():
+            break
+        lower = where(residual < 0, max_(lower, x), lower)
+        upper = where(residual > 0, min_(upper, x), upper)
+        if previous_x is None:
+            # No slope estimate yet: assume that function(x) moves like x.
+            step = residual
+        else:
+            delta_residual = residual - previous_residual
+            flat = delta_residual == 0
+            step = where(flat, residual, residual * (x - previous_x) / where(flat, 1, delta_residual))
+        candidate = x - step
+        bracketed = isfinite(lower) & isfinite(upper)
+        outside = (candidate <= lower) | (candidate >= upper)
+        slow = False if previous_residual is None else abs_(residual) > abs_(previous_residual) / 2
+        middle = (where(bracketed, lower, 0) + where(bracketed, upper, 0)) / 2
+        candidate = where(bracketed & (outside | slow), middle, candidate)
+        candidate = where(~bracketed & outside, x - residual, candidate)
+        previous_x, previous_residual = x, residual
+        x = where(converged | collapsed, x, candidate)
+        residual = function(x) - target
+        converged |= abs_(residual) <= tolerance
+        collapsed = ~converged & (upper - lower <= tolerance)
+    if collapsed.any():
+        collapsed_residual = abs_(residual[collapsed])
+        log.warning(u'Inversion stopped at a discontinuity of the function for {} of {} elements (max residual: {})'
+            .format(len(collapsed_residual), len(target), collapsed_residual.max()))
+    unsolved = ~(converged | collapsed)
+    if unsolved.any():
+        unsolved_residual = abs_(residual[unsolved])
+        log.warning(u'Inversion did not converge after {} iterations for {} of {} elements (max residual: {})'.format(
+            max_iterations, len(unsolved_residual), len(target), unsolved_residual.max()))
+    return x
+
+
+def compile_piecewise_linear(function, upper_bound, initial_count = 65, min_width = 1, tolerance = 0.05):
+    """Find the breakpoints of the piecewise-linear function on [0, upper_bound].
+
+    Segments are split in two until the value of function in their middle matches the linear interpolation of their
+    ends. Segments which are still not linear when narrower than min_width are flagged as such.
+
+    Return a (breakpoints, values, linear) triple, where linear[i] tells whether function is linear between
+    breakpoints[i] and breakpoints[i + 1]. function is evaluated once per refinement round, on all the middles at once.
+    """
+    breakpoints = linspace(0, upper_bound, initial_count)
+    values = function(breakpoints)
+    # State of the segment starting at each breakpoint: 0 = to check, 1 = linear, 2 = not linear.
+    states = zeros(len(breakpoints), dtype = int)
+    states[-1] = 1
+    while (states == 0).any():
+        starts = nonzero(states == 0)[0]
+        middles = (breakpoints[starts] + breakpoints[starts + 1]) / 2
+        middle_values = function(middles)
+        linear = abs_(middle_values - (values[starts] + values[starts + 1]) / 2) <= tolerance
+        states[starts[linear]] = 1
+        too_narrow = ~linear & (middles - breakpoints[starts] < min_width)
+        states[starts[too_narrow]] = 2
+        split = ~linear & ~too_narrow
+        order = argsort(concatenate((breakpoints, middles[split])), kind = 'mergesort')
+        breakpoints = concatenate((breakpoints, middles[split]))[order]
+        values = concatenate((values, middle_values[split]))[order]
+        states = concatenate((states, zeros(split.sum(), dtype = int)))[order]
+    return breakpoints, values, states[:-1] == 1
+
+
+def invert_piecewise_linear(breakpoints, values, linear, target):
+    """Invert exactly the piecewise-linear function described by compile_piecewise_linear.
+
+    Return a (x, exact) couple, where exact tells which elements of target fall into an increasing linear segment.
+    Other elements of x are set to target.
+    """
+    index = clip(searchsorted(max_.accumulate(values), target, side = 'right') - 1, 0, len(breakpoints) - 2)
+    lower_breakpoint = breakpoints[index]
+    upper_breakpoint = breakpoints[index + 1]
+    lower_value = values[index]
+    upper_value = values[index + 1]
+    increasing = upper_value > lower_value
+    exact = linear[index] & increasing & (lower_value <= target) & (target <= upper_value)
+    x = lower_breakpoint + (target - lower_value) * (upper_breakpoint - lower_breakpoint) / where(increasing,
+        upper_value - lower_value, 1)
+    return where(exact, x, target), exact
+
+
+def make_reference_brut_to_target(input_variable_name = None, target_name = None, period = None,
+        tax_benefit_system = None, **individu):
+    """Return a function computing target_name from input_variable_name for an individual with default inputs.
+
+    individu gives the few input variables (like type_sal) which differ from their default value.
+    """
+    def brut_to_target(brut):
+        simulation = tax_benefit_system.new_scenario().init_single_entity(
+            axes = [
+                dict(
+                    count = len(brut),
+                    name = input_variable_name,
+                    max = float(brut.max()),
+                    min = float(brut.min()),
+                    ),
+                ],
+            period = period,
+            parent1 = individu,
+            ).new_simulation()
+        simulation.get_or_new_holder(input_variable_name).set_array(period, brut)
+        return simulation.calculate_add(target_name, period)
+
+    return brut_to_target
 
-def build_reform(tax_benefit_system):
-    from scipy.optimize import fsolve
 
+def build_reform(tax_benefit_system):
     Reform = reforms.make_reform(
         key = 'inversion_revenus',
         name = u'Inversion des revenus',
@@ -60,6 +216,45 @@ def build_reform(tax_benefit_system):
         name = 'salaire_imposable_pour_inversion',
         )
 
+    # Cache of the compiled chains, bounded since the periods of the inversions are not known in advance.
+    piecewise_linear_by_key = collections.OrderedDict()
+
+    def inverse_salaire_de_base(simulation, period, target_name, target):
+        """Calcule le salaire de base à partir de target_name.
+
+        Pour chaque catégorie de salarié, la chaîne qui va du salaire de base à target_name est linéaire par morceaux
+        pour un salarié sans autre revenu : elle est inversée exactement, ce qui donne une valeur initiale à l'inversion
+        numérique. Celle-ci s'arrête dès la première itération pour les salariés dont la chaîne est bien celle-là.
+        """
+        type_sal = simulation.calculate('type_sal', period)
+        initial_value = target.copy()
+        for type_sal_name, indices in partition_by_type_sal(type_sal):
+            upper_bound = 2 * target[indices].max() + 100
+            key = (target_name, type_sal_name, period)
+            piecewise_linear = piecewise_linear_by_key.pop(key, None)
+            if piecewise_linear is None or piecewise_linear[0][-1] < upper_bound:
+                piecewise_linear = compile_piecewise_linear(
+                    make_reference_brut_to_target(
+                        input_variable_name = 'salaire_de_base',
+                        target_name = target_name,
+                        period = period,
+                        tax_benefit_system = simulation.tax_benefit_system,
+                        type_sal = int(type_sal[indices[0]]),
+                        ),
+                    upper_bound,
+                    )
+            piecewise_linear_by_key[key] = piecewise_linear  # Most recently used last
+            while len(piecewise_linear_by_key) > piecewise_linear_cache_size:
+                piecewise_linear_by_key.popitem(last = False)
+            initial_value[indices] = invert_piecewise_linear(*piecewise_linear, target = target[indices])[0]
+        brut_to_target = make_brut_to_target(
+            input_variable_name = 'salaire_de_base',
+            target_name = target_name,
+            period = period,
+            simulation = simulation,
+            )
+        return solve_elementwise(brut_to_target, target, initial_value = initial_value)
+
     @Reform.formula
     class salaire_de_base(formulas.SimpleFormulaColumn):
         column = columns.FloatCol
@@ -82,39 +277,22 @@ def build_reform(tax_benefit_system):
             if salaire_imposable_pour_inversion is None:
                 salaire_net = simulation.get_array('salaire_net', period)
                 if salaire_net is not None:
-                    # Calcule le salaire brut à partir du salaire net par inversion numérique.
+                    # Calcule le salaire brut à partir du salaire net par inversion.
                     if (salaire_net == 0).all():
-                        # Quick path to avoid fsolve when using default value of input variables.
+                        # Quick path to avoid solving when using default value of input variables.
                         return period, salaire_net
-                    simulation = self.holder.entity.simulation
-
-                    def solve_function(salaire_de_base):
-                        return brut_to_target(
-                            target_name = 'salaire_net',
-                            period = period,
-                            salaire_de_base = salaire_de_base,
-                            simulation = simulation,
-                            ) - salaire_net
-                    return period, fsolve(solve_function, salaire_net)
+                    return period, inverse_salaire_de_base(self.holder.entity.simulation, period, 'salaire_net',
+                        salaire_net)
 
                 salaire_imposable_pour_inversion = simulation.calculate_add_divide('salaire_imposable_pour_inversion',
                     period)
 
-            # Calcule le salaire brut à partir du salaire imposable par inversion numérique.
+            # Calcule le salaire brut à partir du salaire imposable par inversion.
             if (salaire_imposable_pour_inversion == 0).all():
-                # Quick path to avoid fsolve when using default value of input variables.
+                # Quick path to avoid solving when using default value of input variables.
                 return period, salaire_imposable_pour_inversion
-            simulation = self.holder.entity.simulation
-
-            def solve_function(salaire_de_base):
-                return brut_to_target(
-                    target_name = 'salaire_imposable',
-                    period = period,
-                    salaire_de_base = salaire_de_base,
-                    simulation = simulation,
-                    ) - salaire_imposable_pour_inversion
-
-            return period, fsolve(solve_function, salaire_imposable_pour_inversion)
+            return period, inverse_salaire_de_base(self.holder.entity.simulation, period, 'salaire_imposable',
+                salaire_imposable_pour_inversion)
 
     #       TODO: inclure un taux de prime et calculer les primes en même temps que salaire_de_base
 
@@ -210,37 +388,31 @@ def build_reform(tax_benefit_system):
                 if chonet is not None:
                     # Calcule les allocations chomage brutes à partir des allocations nettes par inversion numérique.
                     if (chonet == 0).all():
-                        # Quick path to avoid fsolve when using default value of input variables.
+                        # Quick path to avoid solving when using default value of input variables.
                         return period, chonet
-                    simulation = self.holder.entity.simulation
-
-                    def solve_function(chobrut):
-                        return brut_to_target(
-                            chobrut = chobrut,
-                            target_name = 'chonet',
-                            period = period,
-                            simulation = simulation,
-                            ) - chonet
-                    return period, fsolve(solve_function, chonet)
+                    brut_to_target = make_brut_to_target(
+                        input_variable_name = 'chobrut',
+                        target_name = 'chonet',
+                        period = period,
+                        simulation = self.holder.entity.simulation,
+                        )
+                    return period, solve_elementwise(brut_to_target, chonet)
 
                 choi = simulation.calculate_add_divide('choi', period)
 
             # Calcule les allocations chômage brutes à partir des allocations imposables.
             # taux_csg_remplacement = simulation.calculate('taux_csg_remplacement', period)
             if (choi == 0).all():
-                # Quick path to avoid fsolve when using default value of input variables.
+                # Quick path to avoid solving when using default value of input variables.
                 return period, choi
-            simulation = self.holder.entity.simulation
-
-            def solve_function(chobrut):
-                return brut_to_target(
-                    chobrut = chobrut,
-                    # taux_csg_remplacement = taux_csg_remplacement,
-                    target_name = 'cho',
-                    period = period,
-                    simulation = simulation,
-                    ) - choi
-            return period, fsolve(solve_function, choi)
+            brut_to_target = make_brut_to_target(
+                input_variable_name = 'chobrut',
+                # taux_csg_remplacement = taux_csg_remplacement,
+                target_name = 'cho',
+                period = period,
+                simulation = self.holder.entity.simulation,
+                )
+            return period, solve_elementwise(brut_to_target, choi)
 
     @Reform.formula
     class rstbrut(formulas.SimpleFormulaColumn):
@@ -261,36 +433,30 @@ def build_reform(tax_benefit_system):
                 if rstnet is not None:
                     # Calcule les pensions de retraite brutes à partir des pensions nettes par inversion numérique.
                     if (rstnet == 0).all():
-                        # Quick path to avoid fsolve when using default value of input variables.
+                        # Quick path to avoid solving when using default value of input variables.
                         return period, rstnet
-                    simulation = self.holder.entity.simulation
-
-                    def solve_function(rstbrut):
-                        return brut_to_target(
-                            target_name = 'rstnet',
-                            period = period,
-                            rstbrut = rstbrut,
-                            simulation = simulation,
-                            ) - rstnet
-                    return period, fsolve(solve_function, rstnet)
+                    brut_to_target = make_brut_to_target(
+                        input_variable_name = 'rstbrut',
+                        target_name = 'rstnet',
+                        period = period,
+                        simulation = self.holder.entity.simulation,
+                        )
+                    return period, solve_elementwise(brut_to_target, rstnet)
 
                 rsti = simulation.calculate_add_divide('rsti', period)
 
             # Calcule les pensions de retraite brutes à partir des pensions imposables.
             taux_csg_remplacement = simulation.calculate('taux_csg_remplacement', period)
             if (rsti == 0).all():
-                # Quick path to avoid fsolve when using default value of input variables.
+                # Quick path to avoid solving when using default value of input variables.
                 return period, rsti
-            simulation = self.holder.entity.simulation
-
-            def solve_function(rstbrut):
-                return brut_to_target(
-                    rstbrut = rstbrut,
-                    taux_csg_remplacement = taux_csg_remplacement,
-                    target_name = 'rst',
-                    period = period,
-                    simulation = simulation,
-                    ) - rsti
-            return period, fsolve(solve_function, rsti)
+            brut_to_target = make_brut_to_target(
+                input_variable_name = 'rstbrut',
+                target_name = 'rst',
+                period = period,
+                simulation = self.holder.entity.simulation,
+                taux_csg_remplacement = taux_csg_remplacement,
+                )
+            return period, solve_elementwise(brut_to_target, rsti)
 
     return Reform()
@@ -30,7 +30,10 @@ import logging
 import re
 import uuid
 
-from openfisca_core import conv, scenarios
+import numpy as np
+from openfisca_core import conv, periods, scenarios
+
+from .model.lazy_loading import LazyColumnByName
 
 
 def N_(message):
@@ -38,12 +41,85 @@ def N_(message):
 
 
 log = logging.getLogger(__name__)
+# Keys of the entities which are not variables
+structural_keys = set(['autres', 'conjoint', 'declarants', 'enfants', 'id', 'parents', 'personne_de_reference',
+    'personnes_a_charge'])
 year_or_month_or_day_re = re.compile(ur'(18|19|20)\d{2}(-(0[1-9]|1[0-2])(-([0-2]\d|3[0-1]))?)?$')
 
 
 class Scenario(scenarios.AbstractScenario):
+    trusted_test_case = None  # Test case set by init_trusted_test_case(), without validation
+
+    def fill_simulation(self, simulation, variables_name_to_skip = None):
+        if self.test_case is None or self.test_case is not self.trusted_test_case or self.axes is not None:
+            return super(Scenario, self).fill_simulation(simulation, variables_name_to_skip = variables_name_to_skip)
+
+        # Fast path for trusted test cases: the holders arrays are built directly from the values of the test case.
+        if variables_name_to_skip is None:
+            variables_name_to_skip = set()
+        test_case = self.test_case
+        simulation.steps_count = 1
+        entities = simulation.entity_by_key_plural.values()
+        for entity in entities:
+            entity.count = entity.step_size = len(test_case[entity.key_plural])
+        persons_count = len(test_case['individus'])
+        person_index_by_id = dict(
+            (individu['id'], person_index)
+            for person_index, individu in enumerate(test_case['individus'])
+            )
+        index_and_role_names = set()
+        for entity in entities:
+            if getattr(entity, 'is_persons_entity', False):
+                continue
+            index_holder = simulation.get_or_new_holder(entity.index_for_person_variable_name)
+            role_holder = simulation.get_or_new_holder(entity.role_for_person_variable_name)
+            index_array = np.empty(persons_count, dtype = index_holder.column.dtype)
+            index_array.fill(-1)
+            role_array = np.empty(persons_count, dtype = role_holder.column.dtype)
+            role_array.fill(-1)
+            for member_index, member in enumerate(test_case[entity.key_plural]):
+                for person_role, person_id in entity.iter_member_persons_role_and_id(member):
+                    person_index = person_index_by_id[person_id]
+                    index_array[person_index] = member_index
+                    role_array[person_index] = person_role
+            entity.roles_count = int(role_array.max()) + 1 if persons_count else 1
+            index_holder.array = index_array
+            role_holder.array = role_array
+            index_and_role_names.update([entity.index_for_person_variable_name, entity.role_for_person_variable_name])
+
+        for entity in entities:
+            members = test_case[entity.key_plural]
+            variables_name = set(
+                variable_name
+                for member in members
+                for variable_name in member
+                ) - structural_keys - index_and_role_names - variables_name_to_skip
+            for variable_name in sorted(variables_name):
+                holder = simulation.get_or_new_holder(variable_name)
+                column = holder.column
+                array_by_period = {}
+                for member_index, member in enumerate(members):
+                    cell = member.get(variable_name)
+                    if cell is None:
+                        continue
+                    for cell_period, value in (cell.iteritems() if isinstance(cell, dict) else [(self.period, cell)]):
+                        if value is None:
+                            continue
+                        cell_period = periods.period(cell_period)
+                        array = array_by_period.get(cell_period)
+                        if array is None:
+                            array = array_by_period[cell_period] = np.empty(entity.count, dtype = column.dtype)
+                            array.fill(column.default)
+                        array[member_index] = value
+                for array_period, array in array_by_period.iteritems():
+                    holder.set_input(array_period, array)
+
     def init_single_entity(self, axes = None, enfants = None, famille = None, foyer_fiscal = None, menage = None,
-            parent1 = None, parent2 = None, period = None):
+            parent1 = None, parent2 = None, period = None, trusted = False):
+        """Set a test case made of a single famille, foyer fiscal and ménage.
+
+        When trusted is True and there are no axes, the arguments are not validated (see init_trusted_test_case()).
+        """
         if enfants is None:
             enfants = []
         assert parent1 is not None
@@ -70,18 +146,59 @@ class Scenario(scenarios.AbstractScenario):
                 famille.setdefault('enfants', []).append(id)
                 foyer_fiscal.setdefault('personnes_a_charge', []).append(id)
                 menage.setdefault('enfants', []).append(id)
+        test_case = dict(
+            familles = [famille],
+            foyers_fiscaux = [foyer_fiscal],
+            individus = individus,
+            menages = [menage],
+            )
+        if trusted and axes is None:
+            return self.init_trusted_test_case(period, test_case)
         conv.check(self.make_json_or_python_to_attributes())(dict(
             axes = axes,
             period = period,
-            test_case = dict(
-                familles = [famille],
-                foyers_fiscaux = [foyer_fiscal],
-                individus = individus,
-                menages = [menage],
-                ),
+            test_case = test_case,
             ))
         return self
 
+    def init_trusted_test_case(self, period, test_case):
+        """Set a test case built by trusted Python code, skipping the Biryani validation and conversion.
+
+        The values of the variables must already be Python values of their columns (dates, indexes of enumerations,
+        etc.) and the roles of the entities must reference existing individus. The simulations are then filled
+        directly from the test case (see fill_simulation()). Untrusted and JSON test cases must go through
+        make_json_or_python_to_attributes().
+        """
+        column_by_name = self.tax_benefit_system.column_by_name
+        if isinstance(column_by_name, LazyColumnByName):
+            column_by_name.require(*iter_test_case_column_names(test_case))
+        self.axes = None
+        self.period = periods.period(unicode(period))
+        self.test_case = self.trusted_test_case = dict(
+            familles = [
+                dict(famille, enfants = famille.get('enfants') or [], id = famille.get('id', index),
+                    parents = famille.get('parents') or [])
+                for index, famille in enumerate(test_case.get('familles') or [])
+                ],
+            foyers_fiscaux = [
+                dict(foyer_fiscal, declarants = foyer_fiscal.get('declarants') or [],
+                    id = foyer_fiscal.get('id', index),
+                    personnes_a_charge = foyer_fiscal.get('personnes_a_charge') or [])
+                for index, foyer_fiscal in enumerate(test_case.get('foyers_fiscaux') or [])
+                ],
+            individus = [
+                dict(individu, id = individu.get('id', index))
+                for index, individu in enumerate(test_case['individus'])
+                ],
+            menages = [
+                dict(menage, autres = menage.get('autres') or [], conjoint = menage.get('conjoint'),
+                    enfants = menage.get('enfants') or [], id = menage.get('id', index),
+                    personne_de_reference = menage.get('personne_de_reference'))
+                for index, menage in enumerate(test_case.get('menages') or [])
+                ],
+            )
+        return self
+
     def make_json_or_python_to_test_case(self, period = None, repair = False):
         assert period is not None
 
@@ -92,6 +209,9 @@ class Scenario(scenarios.AbstractScenario):
                 state = conv.default_state
 
             column_by_name = self.tax_benefit_system.column_by_name
+            if isinstance(column_by_name, LazyColumnByName) and isinstance(value, dict):
+                # Import the formulas modules of the variables given by the test case before validating it.
+                column_by_name.require(*iter_test_case_column_names(value))
 
             # First validation and conversion step
             test_case, error = conv.pipe(
@@ -779,6 +899,13 @@ class Scenario(scenarios.AbstractScenario):
 
         return suggestions or None
 
+    def new_simulation(self, profiler = None, **kwargs):
+        """Create a simulation, profiled by profiler when given (see profiling.py)."""
+        simulation = super(Scenario, self).new_simulation(**kwargs)
+        if profiler is not None:
+            profiler.attach(simulation)
+        return simulation
+
     def to_json(self):
         self_json = collections.OrderedDict()
         if self.axes is not None:
@@ -878,6 +1005,18 @@ class Scenario(scenarios.AbstractScenario):
 # Finders
 
 
+def iter_test_case_column_names(test_case):
+    for entities_key_plural in ('familles', 'foyers_fiscaux', 'individus', 'menages'):
+        entities_json = test_case.get(entities_key_plural)
+        if isinstance(entities_json, dict):
+            entities_json = [entities_json]
+        for entity_json in (entities_json or []):
+            if isinstance(entity_json, dict):
+                for key in entity_json:
+                    if key not in structural_keys:
+                        yield key
+
+
 def find_age(individu, date, default = None):
     birth = individu.get('birth')
     if isinstance(birth, dict):
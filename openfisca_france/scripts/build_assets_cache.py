@@ -0,0 +1,68 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+
+# OpenFisca -- A versatile microsimulation software
+# By: OpenFisca Team <contact@openfisca.fr>
+#
+# Copyright (C) 2011, 2012, 2013, 2014, 2015 OpenFisca Team
+# https://github.com/openfisca
+#
+# This file is part of OpenFisca.
+#
+# OpenFisca is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# OpenFisca is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+
+
+"""Precompile the assets indexed by depcom into memory-mappable binary files.
+
+Run this script after each update of the assets (or of OpenFisca-France) so that the processes don't need to parse
+them at startup. Outdated files are removed.
+"""
+
+
+import argparse
+import logging
+import os
+import sys
+
+from openfisca_france.model import depcom
+from openfisca_france.model.prelevements_obligatoires.prelevements_sociaux import taxes_salaires_main_oeuvre
+from openfisca_france.model.prestations import aides_logement
+
+
+app_name = os.path.splitext(os.path.basename(__file__))[0]
+log = logging.getLogger(app_name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__)
+    parser.add_argument('-d', '--cache-dir', default = depcom.cache_dir,
+        help = "directory of the binary files (default: %(default)s)")
+    parser.add_argument('-v', '--verbose', action = 'store_true', default = False, help = "increase output verbosity")
+    args = parser.parse_args()
+    logging.basicConfig(level = logging.DEBUG if args.verbose else logging.WARNING, stream = sys.stdout)
+
+    for name, asset_names, build_index_by_key in (
+            ('taux_versement_transport', taxes_salaires_main_oeuvre.taux_versement_transport_asset_names,
+                taxes_salaires_main_oeuvre.build_taux_versement_transport_index_by_key),
+            ('zone_apl', aides_logement.zone_apl_asset_names, aides_logement.build_zone_apl_index_by_key),
+            ):
+        indexes_dir = depcom.save_depcom_indexes(name, asset_names, build_index_by_key(),
+            cache_dir = args.cache_dir)
+        log.info(u'Saved {} indexes into {}'.format(name, indexes_dir))
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
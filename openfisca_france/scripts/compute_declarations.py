@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+
+
+# OpenFisca -- A versatile microsimulation software
+# By: OpenFisca Team <contact@openfisca.fr>
+#
+# Copyright (C) 2011, 2012, 2013, 2014, 2015 OpenFisca Team
+# https://github.com/openfisca
+#
+# This file is part of OpenFisca.
+#
+# OpenFisca is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# OpenFisca is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Compute variables of the foyers fiscaux of a CSV file of income tax declarations, whose columns are CERFA codes.
+
+See openfisca_france.cerfa_ingestion for the layout of the input file.
+"""
+
+
+import argparse
+import csv
+import logging
+import os
+import sys
+
+import openfisca_france
+from openfisca_france.cerfa_ingestion import new_simulation_from_declarations, read_declarations
+
+
+app_name = os.path.splitext(os.path.basename(__file__))[0]
+log = logging.getLogger(app_name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__)
+    parser.add_argument('input_file', help = "CSV file of the declarations, with one row per foyer fiscal")
+    parser.add_argument('variables', metavar = 'VARIABLE', nargs = '*', default = ['irpp'],
+        help = "names of the variables of the foyers fiscaux to compute (default: irpp)")
+    parser.add_argument('-d', '--delimiter', default = ',', help = "delimiter of the CSV files (default: %(default)s)")
+    parser.add_argument('-o', '--output', help = "CSV file of the computed variables (default: standard output)")
+    parser.add_argument('-p', '--period', default = '2014', help = "period of the declarations (default: %(default)s)")
+    parser.add_argument('-s', '--sparse', action = 'store_true', default = False,
+        help = "store the CERFA boxes sparsely")
+    parser.add_argument('-v', '--verbose', action = 'store_true', default = False, help = "increase output verbosity")
+    args = parser.parse_args()
+    logging.basicConfig(level = logging.DEBUG if args.verbose else logging.WARNING, stream = sys.stderr)
+
+    TaxBenefitSystem = openfisca_france.init_country()
+    tax_benefit_system = TaxBenefitSystem()
+    array_by_code = read_declarations(args.input_file, delimiter = args.delimiter)
+    simulation = new_simulation_from_declarations(tax_benefit_system, array_by_code, args.period,
+        sparse = args.sparse)
+    for variable_name in args.variables:
+        entity_key_plural = simulation.get_or_new_holder(variable_name).entity.key_plural
+        if entity_key_plural != 'foyers_fiscaux':
+            parser.error(u'Variable {} is not a variable of the foyers fiscaux'.format(variable_name))
+    arrays = [
+        simulation.calculate(variable_name)
+        for variable_name in args.variables
+        ]
+    log.info(u'Computed {} foyers fiscaux'.format(len(arrays[0]) if arrays else 0))
+
+    output_file = open(args.output, 'wb') if args.output is not None else sys.stdout
+    try:
+        writer = csv.writer(output_file, delimiter = args.delimiter)
+        writer.writerow(args.variables)
+        for row in zip(*arrays):
+            writer.writerow(row)
+    finally:
+        if output_file is not sys.stdout:
+            output_file.close()
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+
+
+# OpenFisca -- A versatile microsimulation software
+# By: OpenFisca Team <contact@openfisca.fr>
+#
+# Copyright (C) 2011, 2012, 2013, 2014, 2015 OpenFisca Team
+# https://github.com/openfisca
+#
+# This file is part of OpenFisca.
+#
+# OpenFisca is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# OpenFisca is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Record the dependency graph of some variables and print the size of their evaluation plan.
+
+The graph is recorded by computing the variables for a single person earning the given salary, so it only contains
+the branches of the formulas taken for this person.
+"""
+
+
+import argparse
+import logging
+import os
+import sys
+
+import openfisca_france
+from openfisca_france.dependency_graph import record_dependency_graph
+
+
+app_name = os.path.splitext(os.path.basename(__file__))[0]
+log = logging.getLogger(app_name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__)
+    parser.add_argument('variables', metavar = 'VARIABLE', nargs = '+', help = "names of the variables to compute")
+    parser.add_argument('-f', '--format', choices = ['dot', 'json'], default = 'json',
+        help = "format of the graph (default: %(default)s)")
+    parser.add_argument('-o', '--output', default = None, help = "path of the graph file (default: no output)")
+    parser.add_argument('-p', '--period', default = '2014', help = "period of the simulation (default: %(default)s)")
+    parser.add_argument('-s', '--salaire-de-base', default = 30000, type = float,
+        help = "salaire de base of the person (default: %(default)s)")
+    parser.add_argument('-v', '--verbose', action = 'store_true', default = False, help = "increase output verbosity")
+    args = parser.parse_args()
+    logging.basicConfig(level = logging.DEBUG if args.verbose else logging.WARNING, stream = sys.stdout)
+
+    TaxBenefitSystem = openfisca_france.init_country()
+    tax_benefit_system = TaxBenefitSystem()
+    simulation = tax_benefit_system.new_scenario().init_single_entity(
+        period = args.period,
+        parent1 = dict(
+            salaire_de_base = args.salaire_de_base,
+            ),
+        ).new_simulation()
+    graph = record_dependency_graph(simulation, args.variables)
+
+    target_keys = [(variable_name, unicode(simulation.period)) for variable_name in args.variables]
+    plan = graph.evaluation_plan(target_keys)
+    levels = list(graph.iter_levels(target_keys))
+    print u'Evaluation plan: {} computations of {} variables, {} dependencies, {} levels (widest: {})'.format(
+        len(plan),
+        len(set(variable_name for variable_name, _ in plan)),
+        sum(len(graph.dependencies_by_key[key]) for key in plan),
+        len(levels),
+        max(len(keys) for keys in levels),
+        )
+
+    if args.output is not None:
+        with open(args.output, 'w') as output_file:
+            if args.format == 'dot':
+                graph.write_dot(output_file)
+            else:
+                graph.write_json(output_file)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,62 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+
+# OpenFisca -- A versatile microsimulation software
+# By: OpenFisca Team <contact@openfisca.fr>
+#
+# Copyright (C) 2011, 2012, 2013, 2014, 2015 OpenFisca Team
+# https://github.com/openfisca
+#
+# This file is part of OpenFisca.
+#
+# OpenFisca is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# OpenFisca is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+
+
+"""Generate the manifest giving the module defining each column, used to load the formulas lazily.
+
+Run this script after adding, renaming or moving a variable. An outdated manifest doesn't give wrong results but makes
+the lazy tax-benefit system import every module.
+"""
+
+
+import argparse
+import json
+import logging
+import os
+import sys
+
+from openfisca_france.model import lazy_loading
+
+
+app_name = os.path.splitext(os.path.basename(__file__))[0]
+log = logging.getLogger(app_name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__)
+    parser.add_argument('-v', '--verbose', action = 'store_true', default = False, help = "increase output verbosity")
+    args = parser.parse_args()
+    logging.basicConfig(level = logging.DEBUG if args.verbose else logging.WARNING, stream = sys.stdout)
+
+    module_name_by_column_name = lazy_loading.build_manifest()
+    with open(lazy_loading.manifest_file_path, 'w') as manifest_file:
+        json.dump(module_name_by_column_name, manifest_file, indent = 2, separators = (',', ': '), sort_keys = True)
+        manifest_file.write('\n')
+    log.info(u'Saved {} columns into {}'.format(len(module_name_by_column_name), lazy_loading.manifest_file_path))
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -21,276 +21,437 @@
 # GNU Affero General Public License for more details.
 #
 # You should have received a copy of the GNU Affero General Public License
-# along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 
-"""Measure performances of formulas calculations to compare to other OpenFisca implementations."""
+"""Benchmark the formulas calculations, to track performance regressions across releases.
+
+Benchmarks:
+* cold_start: time to import OpenFisca-France and create its tax-benefit system, in a new process
+* single_case: latency of irpp for a single person
+* throughput: vectorised workloads (household income, payroll, family benefits) over N households
+* parallel: same workloads, computed sequentially and by a pool of threads evaluating the independent branches
+* scenario: latency of building the simulation of a family case, with and without validation of the test case
+
+Each measure is repeated after some warm-up runs. Results are written as JSON, with percentiles.
+"""
 
 
 import argparse
+import collections
+import datetime
+import json
 import logging
+import multiprocessing
+import platform
+import subprocess
 import sys
 import time
 
 import numpy as np
-from openfisca_core import periods, simulations
+import pkg_resources
 from openfisca_core.tools import assert_near
-from openfisca_france import init_country
-
-
-args = None
-log = logging.getLogger(__name__)
-
-
-def add_member(entity, **variables_value_by_name):
-    entity.count += 1
-    entity.step_size += 1
-    member_index = entity.count - 1
-    simulation = entity.simulation
-
-    # Add a cell to all arrays of all variables of entity.
-    for variable_name, variable_holder in entity.holder_by_name.iteritems():
-        column = variable_holder.column
-        if column.is_permanent:
-            variable_holder._array = np.hstack((variable_holder._array, [column.default]))
-        else:
-            array_by_period = variable_holder._array_by_period
-            if array_by_period is None:
-                variable_holder._array_by_period = array_by_period = {}
-            for period, array in array_by_period.iteritems():
-                array_by_period[period] = np.hstack((array, [column.default]))
-
-    # When entity is a person, ensure that the index & role of the person in the other entities are set.
-    value_by_name = variables_value_by_name.copy()
-    if entity.is_persons_entity:
-        for other_entity in simulation.entity_by_key_singular.itervalues():
-            if not other_entity.is_persons_entity:
-                assert other_entity.count > 0
-                value_by_name.setdefault(other_entity.index_for_person_variable_name, other_entity.count - 1)
-                role = value_by_name.get(other_entity.role_for_person_variable_name)
-                assert role is not None, "Missing role {} in person arguments: {}".format(
-                    other_entity.role_for_person_variable_name, value_by_name)
-                if role >= other_entity.roles_count:
-                    other_entity.roles_count = role + 1
-
-    # Set arguments in variables.
-    for variable_name, value in value_by_name.iteritems():
-        variable_holder = entity.get_or_new_holder(variable_name)
-        column = variable_holder.column
-        if isinstance(value, dict):
-            for period, period_value in value.iteritems():
-                array = variable_holder.get_array(period)
-                if array is None:
-                    array = np.empty(entity.count, dtype = column.dtype)
-                    array.fill(column.default)
-                    variable_holder.set_array(period, array)
-                array[member_index] = period_value
-        else:
-            period = simulation.period
-            array = variable_holder.get_array(period)
-            if array is None:
-                array = np.empty(entity.count, dtype = column.dtype)
-                array.fill(column.default)
-                variable_holder.set_array(period, array)
-            array[member_index] = value
-
-    return member_index
-
-
-def timeit(method):
-    def timed(*args, **kwargs):
-        start_time = time.time()
-        result = method(*args, **kwargs)
-        # print '%r (%r, %r) %2.9f s' % (method.__name__, args, kw, time.time() - start_time)
-        print '{:2.6f} s'.format(time.time() - start_time)
-        return result
-
-    return timed
-
 
-TaxBenefitSystem = init_country()
-tax_benefit_system = TaxBenefitSystem()
 
-
-@timeit
-def test_irpp(year, irpp, **variables_value_by_name):
-    simulation = simulations.Simulation(period = periods.period(year), tax_benefit_system = tax_benefit_system,
-        debug = args.verbose)
-    famille = simulation.entity_by_key_singular['famille']
-    foyer_fiscal = simulation.entity_by_key_singular['foyer_fiscal']
-    individu = simulation.entity_by_key_singular['individu']
-    menage = simulation.entity_by_key_singular['menage']
-
-    # Dispatch arguments to their respective entities.
-    variables_value_by_name_by_entity = {}
-    for variable_name, value in variables_value_by_name.iteritems():
-        variable_holder = simulation.get_or_new_holder(variable_name)
-        entity_variables_value_by_name = variables_value_by_name_by_entity.setdefault(variable_holder.entity, {})
-        entity_variables_value_by_name[variable_name] = value
-
-    add_member(famille, **variables_value_by_name_by_entity.get(famille, {}))
-    add_member(foyer_fiscal, **variables_value_by_name_by_entity.get(foyer_fiscal, {}))
-    add_member(menage, **variables_value_by_name_by_entity.get(menage, {}))
-    add_member(individu, quifam = 1, quifoy = 1, quimen = 1, **variables_value_by_name_by_entity.get(individu, {}))
-    assert_near(simulation.calculate('irpp'), irpp, absolute_error_margin = 0.51)
+app_name = 'measure_performances'
+log = logging.getLogger(app_name)
+
+# Single person cases: (variable name, variable value, year, expected irpp)
+irpp_cases = [
+    ('salaire_imposable', 20000, 2010, -1181),
+    ('salaire_imposable', 50000, 2010, -7934),
+    ('salaire_imposable', 150000, 2010, -42338),
+    ('salaire_imposable', 20000, 2011, -1181),
+    ('salaire_imposable', 50000, 2011, -7934),
+    ('salaire_imposable', 150000, 2011, -42338),
+    ('salaire_imposable', 20000, 2012, -1181),
+    ('salaire_imposable', 50000, 2012, -7934),
+    ('salaire_imposable', 150000, 2012, -43222),
+    ('salaire_imposable', 20000, 2013, -1170),
+    ('salaire_imposable', 50000, 2013, -7889),
+    ('salaire_imposable', 150000, 2013, -43076),
+
+    ('rst', 20000, 2010, -1181),
+    ('rst', 50000, 2010, -8336),
+    ('rst', 150000, 2010, -46642),
+    ('rst', 20000, 2011, -1181),
+    ('rst', 50000, 2011, -8336),
+    ('rst', 150000, 2011, -46642),
+    ('rst', 20000, 2012, -1181),
+    ('rst', 50000, 2012, -8336),
+    ('rst', 150000, 2012, -46642),
+    ('rst', 20000, 2013, -1170),
+    ('rst', 50000, 2013, -8283),
+    ('rst', 150000, 2013, -46523),
+
+    ('f2da', 20000, 2010, 0),
+    ('f2da', 50000, 2010, 0),
+    ('f2da', 150000, 2010, 0),
+    ('f2da', 20000, 2011, 0),
+    ('f2da', 50000, 2011, 0),
+    ('f2da', 150000, 2011, 0),
+    ('f2da', 20000, 2012, 0),
+    ('f2da', 50000, 2012, 0),
+    ('f2da', 150000, 2012, 0),
+
+    ('f2dc', 20000, 2010, 0),
+    ('f2dc', 50000, 2010, -2976),
+    ('f2dc', 150000, 2010, -22917),
+    ('f2dc', 20000, 2011, 0),
+    ('f2dc', 50000, 2011, -2976),
+    ('f2dc', 150000, 2011, -22917),
+    ('f2dc', 20000, 2012, 0),
+    ('f2dc', 50000, 2012, -3434),
+    ('f2dc', 150000, 2012, -23542),
+
+    ('f2dh', 20000, 2010, 345),
+    ('f2dh', 50000, 2010, 345),
+    ('f2dh', 150000, 2010, 345),
+    ('f2dh', 20000, 2011, 345),
+    ('f2dh', 50000, 2011, 345),
+    ('f2dh', 150000, 2011, 345),
+    ('f2dh', 20000, 2012, 345),
+    ('f2dh', 50000, 2012, 345),
+    ('f2dh', 150000, 2012, 345),
+    ('f2dh', 20000, 2013, 345),
+    ('f2dh', 50000, 2013, 345),
+    ('f2dh', 150000, 2013, 345),
+
+    ('f2tr', 20000, 2010, -1461),
+    ('f2tr', 50000, 2010, -9434),
+    ('f2tr', 150000, 2010, -48142),
+    ('f2tr', 20000, 2011, -1461),
+    ('f2tr', 50000, 2011, -9434),
+    ('f2tr', 150000, 2011, -48142),
+    ('f2tr', 20000, 2012, -1461),
+    ('f2tr', 50000, 2012, -9434),
+    ('f2tr', 150000, 2012, -48142),
+    ('f2tr', 20000, 2013, -1450),
+    ('f2tr', 50000, 2013, -9389),
+    ('f2tr', 150000, 2013, -48036),
+
+    ('f2ts', 20000, 2010, -1461),
+    ('f2ts', 50000, 2010, -9434),
+    ('f2ts', 150000, 2010, -48142),
+    ('f2ts', 20000, 2011, -1461),
+    ('f2ts', 50000, 2011, -9434),
+    ('f2ts', 150000, 2011, -48142),
+    ('f2ts', 20000, 2012, -1461),
+    ('f2ts', 50000, 2012, -9434),
+    ('f2ts', 150000, 2012, -48142),
+    ('f2ts', 20000, 2013, -1450),
+    ('f2ts', 50000, 2013, -9389),
+    ('f2ts', 150000, 2013, -48036),
+
+    ('f3vg', 20000, 2010, -3600),
+    ('f3vg', 50000, 2010, -9000),
+    ('f3vg', 150000, 2010, -27000),
+    ('f3vg', 20000, 2011, -3800),
+    ('f3vg', 50000, 2011, -9500),
+    ('f3vg', 150000, 2011, -28500),
+    ('f3vg', 20000, 2012, -4800),
+    ('f3vg', 50000, 2012, -12000),
+    ('f3vg', 150000, 2012, -36000),
+    ('f3vg', 20000, 2013, -1450),
+    ('f3vg', 50000, 2013, -9389),
+    ('f3vg', 150000, 2013, -48036),
+
+    ('f3vz', 20000, 2011, 0),
+    ('f3vz', 50000, 2011, 0),
+    ('f3vz', 150000, 2011, 0),
+    ('f3vz', 20000, 2012, 0),
+    ('f3vz', 50000, 2012, 0),
+    ('f3vz', 150000, 2012, 0),
+    ('f3vz', 20000, 2013, 0),
+    ('f3vz', 50000, 2013, 0),
+    ('f3vz', 150000, 2013, 0),
+
+    ('f4ba', 20000, 2010, -1461),
+    ('f4ba', 50000, 2010, -9434),
+    ('f4ba', 150000, 2010, -48142),
+    ('f4ba', 20000, 2011, -1461),
+    ('f4ba', 50000, 2011, -9434),
+    ('f4ba', 150000, 2011, -48142),
+    ('f4ba', 20000, 2012, -1461),
+    ('f4ba', 50000, 2012, -9434),
+    ('f4ba', 150000, 2012, -48142),
+    ('f4ba', 20000, 2013, -1450),
+    ('f4ba', 50000, 2013, -9389),
+    ('f4ba', 150000, 2013, -48036),
+    ]
+
+throughput_workloads = [
+    dict(
+        axis = dict(max = 150000, min = 0, name = 'salaire_de_base'),
+        name = 'household_income',
+        parent1 = dict(birth = datetime.date(1970, 1, 1)),
+        period = '2014',
+        variables = ['irpp', 'revdisp'],
+        ),
+    dict(
+        axis = dict(max = 10000, min = 0, name = 'salaire_de_base'),
+        name = 'payroll',
+        parent1 = dict(birth = datetime.date(1970, 1, 1), effectif_entreprise = 25, type_sal = 0),
+        period = '2014-01',
+        variables = ['salsuperbrut', 'salaire_net_a_payer'],
+        ),
+    dict(
+        axis = dict(max = 4000, min = 0, name = 'salaire_de_base'),
+        enfants = [
+            dict(birth = datetime.date(2008, 1, 1)),
+            dict(birth = datetime.date(2013, 6, 1)),
+            ],
+        menage = dict(loyer = 600, statut_occupation = 4),
+        name = 'family_benefits',
+        parent1 = dict(birth = datetime.date(1980, 1, 1)),
+        parent2 = dict(birth = datetime.date(1982, 1, 1)),
+        period = '2014-01',
+        variables = ['aide_logement', 'rsa', 'af', 'paje'],
+        ),
+    ]
+
+
+def measure(function, repetitions = 5, warm_up = 1):
+    """Call function warm_up times, then repetitions times, and return statistics of the durations of the latter."""
+    for index in range(warm_up):
+        function()
+    durations = []
+    for index in range(repetitions):
+        start_time = time.time()
+        function()
+        durations.append(time.time() - start_time)
+    return summarize_durations(durations)
+
+
+def summarize_durations(durations):
+    durations = np.array(durations)
+    return collections.OrderedDict((
+        ('repetitions', len(durations)),
+        ('min', durations.min()),
+        ('mean', durations.mean()),
+        ('p50', np.percentile(durations, 50)),
+        ('p90', np.percentile(durations, 90)),
+        ('p99', np.percentile(durations, 99)),
+        ('max', durations.max()),
+        ))
+
+
+def benchmark_cold_start(repetitions, warm_up):
+    command = [
+        sys.executable,
+        '-c',
+        'from openfisca_france import init_country; init_country()()',
+        ]
+    return measure(lambda: subprocess.check_call(command), repetitions = repetitions, warm_up = warm_up)
+
+
+def benchmark_single_case(tax_benefit_system, repetitions, warm_up):
+    def calculate_irpp_cases():
+        for variable_name, value, year, irpp in irpp_cases:
+            entity_symbol = tax_benefit_system.column_by_name[variable_name].entity
+            scenario_arguments = dict(parent1 = {}, period = year)
+            if entity_symbol == 'ind':
+                scenario_arguments['parent1'][variable_name] = value
+            else:
+                scenario_arguments[dict(fam = 'famille', foy = 'foyer_fiscal', men = 'menage')[entity_symbol]] = {
+                    variable_name: value,
+                    }
+            simulation = tax_benefit_system.new_scenario().init_single_entity(**scenario_arguments).new_simulation()
+            assert_near(simulation.calculate('irpp'), irpp, absolute_error_margin = 0.51)
+
+    result = measure(calculate_irpp_cases, repetitions = repetitions, warm_up = warm_up)
+    result['cases'] = len(irpp_cases)
+    result['mean_per_case'] = result['mean'] / len(irpp_cases)
+    return result
+
+
+def benchmark_throughput(tax_benefit_system, workload, count, repetitions, warm_up):
+    scenario_arguments = dict(
+        (key, value)
+        for key, value in workload.iteritems()
+        if key in ('enfants', 'famille', 'foyer_fiscal', 'menage', 'parent1', 'parent2', 'period')
+        )
+    scenario_arguments['axes'] = [dict(workload['axis'], count = count)]
+
+    def new_simulation():
+        return tax_benefit_system.new_scenario().init_single_entity(**scenario_arguments).new_simulation()
+
+    def calculate():
+        simulation = new_simulation()
+        for variable_name in workload['variables']:
+            simulation.calculate(variable_name)
+
+    result = collections.OrderedDict((
+        ('count', count),
+        ('variables', workload['variables']),
+        ('build', measure(new_simulation, repetitions = repetitions, warm_up = warm_up)),
+        ('build_and_calculate', measure(calculate, repetitions = repetitions, warm_up = warm_up)),
+        ))
+    result['households_per_second'] = count / result['build_and_calculate']['p50']
+    return result
+
+
+def benchmark_parallel(tax_benefit_system, workload, count, threads, repetitions, warm_up):
+    from openfisca_france.dependency_graph import ParallelEvaluator, record_dependency_graph
+
+    scenario_arguments = dict(
+        (key, value)
+        for key, value in workload.iteritems()
+        if key in ('enfants', 'famille', 'foyer_fiscal', 'menage', 'parent1', 'parent2', 'period')
+        )
+
+    def new_simulation(count):
+        return tax_benefit_system.new_scenario().init_single_entity(
+            axes = [dict(workload['axis'], count = count)],
+            **scenario_arguments
+            ).new_simulation()
+
+    # Record the graph on a small sample of the axis, to cover most branches of the formulas.
+    graph = record_dependency_graph(new_simulation(min(count, 20)), workload['variables'])
+    simulations = []
+
+    def prepare():
+        simulations[:] = [new_simulation(count)]
+
+    def calculate_sequentially():
+        simulation = simulations.pop()
+        for variable_name in workload['variables']:
+            simulation.calculate(variable_name)
+
+    def calculate_in_parallel():
+        ParallelEvaluator(simulations.pop(), graph, threads = threads).calculate(workload['variables'])
+
+    def measure_calculation(calculate):
+        durations = []
+        for index in range(warm_up + repetitions):
+            prepare()
+            start_time = time.time()
+            calculate()
+            durations.append(time.time() - start_time)
+        return summarize_durations(durations[warm_up:])
+
+    result = collections.OrderedDict((
+        ('count', count),
+        ('threads', threads),
+        ('variables', workload['variables']),
+        ('sequential', measure_calculation(calculate_sequentially)),
+        ('parallel', measure_calculation(calculate_in_parallel)),
+        ))
+    result['speedup'] = result['sequential']['p50'] / result['parallel']['p50']
+    return result
+
+
+def benchmark_scenario(tax_benefit_system, workload, repetitions, warm_up):
+    scenario_arguments = dict(
+        (key, value)
+        for key, value in workload.iteritems()
+        if key in ('enfants', 'famille', 'foyer_fiscal', 'menage', 'parent1', 'parent2', 'period')
+        )
+
+    def new_simulation(trusted):
+        return tax_benefit_system.new_scenario().init_single_entity(trusted = trusted, **scenario_arguments) \
+            .new_simulation()
+
+    result = collections.OrderedDict()
+    result['validated'] = measure(lambda: new_simulation(False), repetitions = repetitions, warm_up = warm_up)
+    result['trusted'] = measure(lambda: new_simulation(True), repetitions = repetitions, warm_up = warm_up)
+    result['speedup'] = result['validated']['mean'] / result['trusted']['mean']
+    return result
+
+
+def get_environment():
+    environment = collections.OrderedDict()
+    for distribution_name in ('OpenFisca-France', 'OpenFisca-Core', 'numpy'):
+        try:
+            environment[distribution_name] = pkg_resources.get_distribution(distribution_name).version
+        except pkg_resources.DistributionNotFound:
+            environment[distribution_name] = None
+    environment['python'] = platform.python_version()
+    environment['platform'] = platform.platform()
+    environment['date'] = datetime.datetime.now().isoformat()
+    return environment
 
 
 def main():
-    parser = argparse.ArgumentParser(description = __doc__)
+    parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-b', '--benchmark', action = 'append',
+        choices = ['cold_start', 'single_case', 'throughput', 'parallel', 'scenario'],
+        help = "benchmark to run (default: all)")
+    parser.add_argument('-c', '--counts', default = '1000,100000,1000000',
+        help = "comma-separated numbers of households of throughput benchmarks (default: %(default)s)")
+    parser.add_argument('-o', '--output', default = None, help = "path of the JSON results (default: stdout)")
+    parser.add_argument('-r', '--repetitions', default = 5, type = int,
+        help = "number of measured runs (default: %(default)s)")
+    parser.add_argument('-t', '--threads', default = None, type = int,
+        help = "number of threads of parallel benchmarks (default: number of CPUs)")
+    parser.add_argument('-w', '--warm-up', default = 1, type = int,
+        help = "number of runs before measuring (default: %(default)s)")
+    parser.add_argument('-W', '--workload', action = 'append',
+        choices = [workload['name'] for workload in throughput_workloads],
+        help = "throughput workload to run (default: all)")
     parser.add_argument('-v', '--verbose', action = 'store_true', default = False, help = "increase output verbosity")
-    global args
     args = parser.parse_args()
-    logging.basicConfig(level = logging.DEBUG if args.verbose else logging.WARNING, stream = sys.stdout)
-
-    print 'salaire_imposable'
-
-    test_irpp(2010, -1181, salaire_imposable =  20000)
-    test_irpp(2010, -7934, salaire_imposable =  50000)
-    test_irpp(2010, -42338, salaire_imposable =  150000)
-    test_irpp(2011, -1181, salaire_imposable =  20000)
-    test_irpp(2011, -7934, salaire_imposable =  50000)
-    test_irpp(2011, -42338, salaire_imposable =  150000)
-    test_irpp(2012, -1181, salaire_imposable =  20000)
-    test_irpp(2012, -7934, salaire_imposable =  50000)
-    test_irpp(2012, -43222, salaire_imposable =  150000)
-    test_irpp(2013, -1170, salaire_imposable =  20000)
-    test_irpp(2013, -7889, salaire_imposable =  50000)
-    test_irpp(2013, -43076, salaire_imposable =  150000)
-
-    print 'rst'
-
-    test_irpp(2010, -1181, rst = 20000)
-    test_irpp(2010, -8336, rst = 50000)
-    test_irpp(2010, -46642, rst = 150000)
-    test_irpp(2011, -1181, rst = 20000)
-    test_irpp(2011, -8336, rst = 50000)
-    test_irpp(2011, -46642, rst = 150000)
-    test_irpp(2012, -1181, rst = 20000)
-    test_irpp(2012, -8336, rst = 50000)
-    test_irpp(2012, -46642, rst = 150000)
-    test_irpp(2013, -1170, rst = 20000)
-    test_irpp(2013, -8283, rst = 50000)
-    test_irpp(2013, -46523, rst = 150000)
-
-    print 'f2da'
-
-    test_irpp(2010, 0, f2da = 20000)
-    test_irpp(2010, 0, f2da = 50000)
-    test_irpp(2010, 0, f2da = 150000)
-    test_irpp(2011, 0, f2da = 20000)
-    test_irpp(2011, 0, f2da = 50000)
-    test_irpp(2011, 0, f2da = 150000)
-    test_irpp(2012, 0, f2da = 20000)
-    test_irpp(2012, 0, f2da = 50000)
-    test_irpp(2012, 0, f2da = 150000)
-    # test_irpp(2013, 0, f2da = 20000)
-    # test_irpp(2013, 0, f2da = 50000)
-    # test_irpp(2013, 0, f2da = 150000)
-
-    print 'f2dc'
-
-    test_irpp(2010, 0, f2dc = 20000)
-    test_irpp(2010, -2976, f2dc = 50000)
-    test_irpp(2010, -22917, f2dc = 150000)
-    test_irpp(2011, 0, f2dc = 20000)
-    test_irpp(2011, -2976, f2dc = 50000)
-    test_irpp(2011, -22917, f2dc = 150000)
-    test_irpp(2012, 0, f2dc = 20000)
-    test_irpp(2012, -3434, f2dc = 50000)
-    test_irpp(2012, -23542, f2dc = 150000)
-    # test_irpp(2013, 0, f2dc = 20000)
-    # test_irpp(2013, 0, f2dc = 50000)
-    # test_irpp(2013, 0, f2dc = 150000)
-
-    print 'f2dh'
-
-    test_irpp(2010, 345, f2dh = 20000)
-    test_irpp(2010, 345, f2dh = 50000)
-    test_irpp(2010, 345, f2dh = 150000)
-    test_irpp(2011, 345, f2dh = 20000)
-    test_irpp(2011, 345, f2dh = 50000)
-    test_irpp(2011, 345, f2dh = 150000)
-    test_irpp(2012, 345, f2dh = 20000)
-    test_irpp(2012, 345, f2dh = 50000)
-    test_irpp(2012, 345, f2dh = 150000)
-    test_irpp(2013, 345, f2dh = 20000)
-    test_irpp(2013, 345, f2dh = 50000)
-    test_irpp(2013, 345, f2dh = 150000)
-
-    print 'f2tr'
-
-    test_irpp(2010, -1461, f2tr = 20000)
-    test_irpp(2010, -9434, f2tr = 50000)
-    test_irpp(2010, -48142, f2tr = 150000)
-    test_irpp(2011, -1461, f2tr = 20000)
-    test_irpp(2011, -9434, f2tr = 50000)
-    test_irpp(2011, -48142, f2tr = 150000)
-    test_irpp(2012, -1461, f2tr = 20000)
-    test_irpp(2012, -9434, f2tr = 50000)
-    test_irpp(2012, -48142, f2tr = 150000)
-    test_irpp(2013, -1450, f2tr = 20000)
-    test_irpp(2013, -9389, f2tr = 50000)
-    test_irpp(2013, -48036, f2tr = 150000)
-
-    print 'f2ts'
-
-    test_irpp(2010, -1461, f2ts = 20000)
-    test_irpp(2010, -9434, f2ts = 50000)
-    test_irpp(2010, -48142, f2ts = 150000)
-    test_irpp(2011, -1461, f2ts = 20000)
-    test_irpp(2011, -9434, f2ts = 50000)
-    test_irpp(2011, -48142, f2ts = 150000)
-    test_irpp(2012, -1461, f2ts = 20000)
-    test_irpp(2012, -9434, f2ts = 50000)
-    test_irpp(2012, -48142, f2ts = 150000)
-    test_irpp(2013, -1450, f2ts = 20000)
-    test_irpp(2013, -9389, f2ts = 50000)
-    test_irpp(2013, -48036, f2ts = 150000)
-
-    print 'f3vg'
-
-    test_irpp(2010, -3600, f3vg = 20000)
-    test_irpp(2010, -9000, f3vg = 50000)
-    test_irpp(2010, -27000, f3vg = 150000)
-    test_irpp(2011, -3800, f3vg = 20000)
-    test_irpp(2011, -9500, f3vg = 50000)
-    test_irpp(2011, -28500, f3vg = 150000)
-    test_irpp(2012, -4800, f3vg = 20000)
-    test_irpp(2012, -12000, f3vg = 50000)
-    test_irpp(2012, -36000, f3vg = 150000)
-    test_irpp(2013, -1450, f3vg = 20000)
-    test_irpp(2013, -9389, f3vg = 50000)
-    test_irpp(2013, -48036, f3vg = 150000)
-
-    print 'f3vz'
-
-    # test_irpp(2010, 0, f3vz = 20000)
-    # test_irpp(2010, 0, f3vz = 50000)
-    # test_irpp(2010, 0, f3vz = 150000)
-    test_irpp(2011, 0, f3vz = 20000)
-    test_irpp(2011, 0, f3vz = 50000)
-    test_irpp(2011, 0, f3vz = 150000)
-    test_irpp(2012, 0, f3vz = 20000)
-    test_irpp(2012, 0, f3vz = 50000)
-    test_irpp(2012, 0, f3vz = 150000)
-    test_irpp(2013, 0, f3vz = 20000)
-    test_irpp(2013, 0, f3vz = 50000)
-    test_irpp(2013, 0, f3vz = 150000)
-
-    print 'f4ba'
-
-    test_irpp(2010, -1461, f4ba = 20000)
-    test_irpp(2010, -9434, f4ba = 50000)
-    test_irpp(2010, -48142, f4ba = 150000)
-    test_irpp(2011, -1461, f4ba = 20000)
-    test_irpp(2011, -9434, f4ba = 50000)
-    test_irpp(2011, -48142, f4ba = 150000)
-    test_irpp(2012, -1461, f4ba = 20000)
-    test_irpp(2012, -9434, f4ba = 50000)
-    test_irpp(2012, -48142, f4ba = 150000)
-    test_irpp(2013, -1450, f4ba = 20000)
-    test_irpp(2013, -9389, f4ba = 50000)
-    test_irpp(2013, -48036, f4ba = 150000)
+    logging.basicConfig(level = logging.DEBUG if args.verbose else logging.WARNING, stream = sys.stderr)
+
+    benchmarks_name = args.benchmark or ['cold_start', 'single_case', 'throughput', 'parallel', 'scenario']
+    results = collections.OrderedDict((
+        ('environment', get_environment()),
+        ('repetitions', args.repetitions),
+        ('warm_up', args.warm_up),
+        ))
+
+    if 'cold_start' in benchmarks_name:
+        log.info(u'Running cold_start')
+        results['cold_start'] = benchmark_cold_start(args.repetitions, args.warm_up)
+
+    if any(benchmark_name in benchmarks_name
+            for benchmark_name in ('parallel', 'scenario', 'single_case', 'throughput')):
+        from openfisca_france import init_country
+        tax_benefit_system = init_country()()
+
+    if 'single_case' in benchmarks_name:
+        log.info(u'Running single_case')
+        results['single_case'] = benchmark_single_case(tax_benefit_system, args.repetitions, args.warm_up)
+
+    if 'throughput' in benchmarks_name:
+        results['throughput'] = throughput_results = collections.OrderedDict()
+        for workload in throughput_workloads:
+            if args.workload and workload['name'] not in args.workload:
+                continue
+            throughput_results[workload['name']] = workload_results = []
+            for count in (int(count) for count in args.counts.split(',')):
+                log.info(u'Running throughput {} for {} households'.format(workload['name'], count))
+                workload_results.append(benchmark_throughput(tax_benefit_system, workload, count,
+                    args.repetitions, args.warm_up))
+
+    if 'parallel' in benchmarks_name:
+        results['parallel'] = parallel_results = collections.OrderedDict()
+        threads = args.threads or multiprocessing.cpu_count()
+        for workload in throughput_workloads:
+            if args.workload and workload['name'] not in args.workload:
+                continue
+            parallel_results[workload['name']] = workload_results = []
+            for count in (int(count) for count in args.counts.split(',')):
+                log.info(u'Running parallel {} for {} households on {} threads'.format(workload['name'], count,
+                    threads))
+                workload_results.append(benchmark_parallel(tax_benefit_system, workload, count, threads,
+                    args.repetitions, args.warm_up))
+
+    if 'scenario' in benchmarks_name:
+        results['scenario'] = scenario_results = collections.OrderedDict()
+        for workload in throughput_workloads:
+            if args.workload and workload['name'] not in args.workload:
+                continue
+            log.info(u'Running scenario {}'.format(workload['name']))
+            scenario_results[workload['name']] = benchmark_scenario(tax_benefit_system, workload, args.repetitions,
+                args.warm_up)
+
+    if args.output is None:
+        json.dump(results, sys.stdout, indent = 2)
+        sys.stdout.write('\n')
+    else:
+        with open(args.output, 'w') as output_file:
+            json.dump(results, output_file, indent = 2)
+    return 0
 
 
 if __name__ == "__main__":
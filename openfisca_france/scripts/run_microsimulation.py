@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+
+
+# OpenFisca -- A versatile microsimulation software
+# By: OpenFisca Team <contact@openfisca.fr>
+#
+# Copyright (C) 2011, 2012, 2013, 2014, 2015 OpenFisca Team
+# https://github.com/openfisca
+#
+# This file is part of OpenFisca.
+#
+# OpenFisca is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# OpenFisca is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Compute variables for a population stored as a directory of NumPy files, chunk by chunk.
+
+See openfisca_france.microsimulation for the layout of the input and output directories.
+"""
+
+
+import argparse
+import logging
+import os
+import sys
+
+from openfisca_france.microsimulation import run_microsimulation
+
+
+app_name = os.path.splitext(os.path.basename(__file__))[0]
+log = logging.getLogger(app_name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__)
+    parser.add_argument('input_dir', help = "directory of the input variables")
+    parser.add_argument('output_dir', help = "directory of the computed variables")
+    parser.add_argument('variables', metavar = 'VARIABLE', nargs = '+', help = "names of the variables to compute")
+    parser.add_argument('-c', '--chunk-size', default = 100000, type = int,
+        help = "number of persons of each simulation (default: %(default)s)")
+    parser.add_argument('-j', '--processes', default = 1, type = int,
+        help = "number of processes computing the chunks (default: %(default)s)")
+    parser.add_argument('-p', '--period', default = '2014', help = "period of the simulations (default: %(default)s)")
+    parser.add_argument('-v', '--verbose', action = 'store_true', default = False, help = "increase output verbosity")
+    args = parser.parse_args()
+    logging.basicConfig(level = logging.DEBUG if args.verbose else logging.WARNING, stream = sys.stdout)
+
+    persons_count = run_microsimulation(args.input_dir, args.output_dir, args.variables, args.period,
+        chunk_size = args.chunk_size, processes = args.processes)
+    log.info(u'Computed {} persons'.format(persons_count))
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+
+
+# OpenFisca -- A versatile microsimulation software
+# By: OpenFisca Team <contact@openfisca.fr>
+#
+# Copyright (C) 2011, 2012, 2013, 2014, 2015 OpenFisca Team
+# https://github.com/openfisca
+#
+# This file is part of OpenFisca.
+#
+# OpenFisca is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# OpenFisca is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Sparse evaluation of the zero-preserving formulas (tax reductions and credits).
+
+Most of the CERFA boxes of the reductions and credits (f7xx) are empty for nearly all the foyers fiscaux. A formula
+declared with @zero_preserving returns 0 when all the CERFA boxes and zero-preserving variables it reads are 0, so when
+these inputs are null for every entity, its array is set to zeros without calling the formula. Null inputs propagate
+through the zero-preserving variables, so that whole subtrees of reductions and credits are skipped:
+
+    evaluator = SparseEvaluator(simulation)
+    irpp, = evaluator.calculate(['irpp'])
+    print evaluator.skipped_variables_name
+
+The variables read by a formula are found by parsing the source of its module. A formula reading a variable whose name
+is not a literal, or at another period than the one it computes, is never skipped.
+"""
+
+
+import ast
+
+import numpy as np
+from openfisca_core import formulas
+
+from .dependency_graph import unwrap_holders_compute, wrap_holders_compute
+from .model import lazy_loading
+from .model.base import zero_preserving_column_by_name
+
+
+__all__ = [
+    'iter_read_variables_name',
+    'SparseEvaluator',
+    ]
+
+calculate_methods_name = set([
+    'calculate',
+    'calculate_add',
+    'calculate_add_divide',
+    'calculate_divide',
+    'compute',
+    'compute_add',
+    'compute_add_divide',
+    'compute_divide',
+    ])
+module_name_by_column_name = None
+read_variables_name_by_column_name = {}
+
+
+def get_read_variables_name(column_name):
+    """Return the names of the variables read by the formula of column at the period it computes, or None if unknown."""
+    if column_name in read_variables_name_by_column_name:
+        return read_variables_name_by_column_name[column_name]
+    global module_name_by_column_name
+    if module_name_by_column_name is None:
+        module_name_by_column_name = lazy_loading.load_manifest()
+    module_name = module_name_by_column_name.get(column_name)
+    read_variables_name = None
+    if module_name is not None:
+        file_path = lazy_loading.get_module_file_path(module_name)
+        with open(file_path) as module_file:
+            tree = ast.parse(module_file.read(), file_path)
+        for node in tree.body:
+            if isinstance(node, ast.ClassDef) and get_class_column_name(node) == column_name:
+                try:
+                    read_variables_name = set(iter_read_variables_name(node))
+                except ValueError:
+                    read_variables_name = None
+                break
+    read_variables_name_by_column_name[column_name] = read_variables_name
+    return read_variables_name
+
+
+def get_class_column_name(node):
+    for statement in node.body:
+        if isinstance(statement, ast.Assign) and isinstance(statement.value, ast.Str) and [
+                getattr(target, 'id', None) for target in statement.targets] == ['name']:
+            return statement.value.s
+    return node.name
+
+
+def is_input_column(column):
+    return issubclass(column.formula_class, formulas.SimpleFormula) and column.formula_class.function is None
+
+
+def iter_read_variables_name(node):
+    """Yield the names of the variables requested to the simulation in the AST node of a formula class.
+
+    Raise ValueError when a variable is requested with a name which is not a literal, or at another period than the
+    one of the formula.
+    """
+    for child in ast.walk(node):
+        if not (isinstance(child, ast.Call) and isinstance(child.func, ast.Attribute)
+                and child.func.attr in calculate_methods_name and isinstance(child.func.value, ast.Name)
+                and child.func.value.id == 'simulation'):
+            continue
+        if not child.args or not isinstance(child.args[0], ast.Str):
+            raise ValueError(u'Variable name is not a literal, line {}'.format(child.lineno))
+        if len(child.args) != 2 or not isinstance(child.args[1], ast.Name) or child.args[1].id != 'period' \
+                or child.keywords:
+            raise ValueError(u'Variable {} is requested at another period, line {}'.format(child.args[0].s,
+                child.lineno))
+        yield child.args[0].s
+
+
+class SparseEvaluator(object):
+    """Compute variables, skipping the zero-preserving formulas whose inputs are null for every entity."""
+    null_by_key = None  # Whether the array of a CERFA box or a zero-preserving variable is null for every entity
+    simulation = None
+    skipped_variables_name = None
+
+    def __init__(self, simulation):
+        self.null_by_key = {}
+        self.simulation = simulation
+        self.skipped_variables_name = []
+
+    def calculate(self, variables_name, period = None):
+        """Compute the variables and return their arrays."""
+        simulation = self.simulation
+        if period is None:
+            period = simulation.period
+
+        def wrap_compute(holder, compute):
+            column = holder.column
+            if zero_preserving_column_by_name.get(column.name) is not column:
+                return compute
+
+            def sparse_compute(period = None, **parameters):
+                if period is None:
+                    period = simulation.period
+                year = period.start.offset('first-of', 'year').period('year')
+                if period == year and not parameters and holder.get_array(period) is None \
+                        and self.is_null_formula(column, period):
+                    holder.set_array(period, np.zeros(holder.entity.count, dtype = column.dtype))
+                    self.skipped_variables_name.append(column.name)
+                return compute(period = period, **parameters)
+
+            return sparse_compute
+
+        wrap_holders_compute(simulation, wrap_compute)
+        try:
+            return [
+                simulation.calculate(variable_name, period)
+                for variable_name in variables_name
+                ]
+        finally:
+            unwrap_holders_compute(simulation)
+
+    def is_null(self, column_name, period):
+        key = (column_name, unicode(period))
+        null = self.null_by_key.get(key)
+        if null is None:
+            null = self.null_by_key[key] = not self.simulation.calculate(column_name, period).any()
+        return null
+
+    def is_null_formula(self, column, period):
+        """Tell whether the zero-preserving formula of column returns 0 for every entity at the given period."""
+        read_variables_name = get_read_variables_name(column.name)
+        if read_variables_name is None:
+            return False
+        column_by_name = self.simulation.tax_benefit_system.column_by_name
+        # Variables other than the CERFA boxes and the zero-preserving variables (nb_pac, marpac, rbg_int, etc.) don't
+        # prevent null results. The input CERFA boxes are checked first, since they are cheap: the formulas of the
+        # other variables are computed only when all these boxes are null.
+        checked_variables_name = [[], [], []]
+        for variable_name in read_variables_name:
+            read_column = column_by_name[variable_name]
+            if read_column.cerfa_field is not None and is_input_column(read_column):
+                checked_variables_name[0].append(variable_name)
+            elif zero_preserving_column_by_name.get(variable_name) is read_column:
+                checked_variables_name[1].append(variable_name)
+            elif read_column.cerfa_field is not None:
+                checked_variables_name[2].append(variable_name)
+        for variables_name in checked_variables_name:
+            for variable_name in sorted(variables_name):
+                if not self.is_null(variable_name, period):
+                    return False
+        return True
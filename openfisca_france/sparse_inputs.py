@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+
+
+# OpenFisca -- A versatile microsimulation software
+# By: OpenFisca Team <contact@openfisca.fr>
+#
+# Copyright (C) 2011, 2012, 2013, 2014, 2015 OpenFisca Team
+# https://github.com/openfisca
+#
+# This file is part of OpenFisca.
+#
+# OpenFisca is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# OpenFisca is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Sparse storage of the input variables, for the CERFA boxes which are empty for nearly all the entities.
+
+An input is stored as the indexes of its non-default values and these values. Its dense array is only built when a
+formula requests it, and is then kept by the holder like any other array:
+
+    store = SparseInputStore(simulation)
+    store.set_input('f7uf', period, index = np.array([12, 857]), values = np.array([300., 1500.]))
+    print store.nbytes, store.dense_nbytes
+
+Combined with dependency_graph.ReleasingEvaluator, the dense array is dropped again once its consumers are computed,
+since it wasn't present before the evaluation.
+"""
+
+
+import numpy as np
+from openfisca_core import periods
+
+
+__all__ = [
+    'SparseInput',
+    'SparseInputStore',
+    ]
+
+
+class SparseInput(object):
+    """Array of an entity variable, stored as the indexes of its non-default values and these values."""
+    __slots__ = ('count', 'default', 'index', 'values')
+
+    def __init__(self, count, default, index, values):
+        assert len(index) == len(values)
+        self.count = count
+        self.default = default
+        self.index = np.asarray(index, dtype = np.int32)
+        self.values = np.asarray(values)
+
+    @classmethod
+    def from_dense(cls, array, default):
+        index = (array != default).nonzero()[0]
+        return cls(len(array), default, index, array[index])
+
+    @property
+    def nbytes(self):
+        return self.index.nbytes + self.values.nbytes
+
+    def to_dense(self, dtype = None):
+        array = np.empty(self.count, dtype = dtype or self.values.dtype)
+        array.fill(self.default)
+        array[self.index] = self.values
+        return array
+
+
+class SparseInputStore(object):
+    """Sparse inputs of a simulation, materialised as dense arrays by the holders when they are requested."""
+    materialised_arrays_count = 0
+    simulation = None
+    sparse_input_by_period_by_name = None
+
+    def __init__(self, simulation):
+        self.simulation = simulation
+        self.sparse_input_by_period_by_name = {}
+
+    @property
+    def dense_nbytes(self):
+        """Size that the stored inputs would have as dense arrays"""
+        nbytes = 0
+        for column_name, sparse_input_by_period in self.sparse_input_by_period_by_name.iteritems():
+            itemsize = np.dtype(self.simulation.tax_benefit_system.column_by_name[column_name].dtype).itemsize
+            for sparse_input in sparse_input_by_period.itervalues():
+                nbytes += sparse_input.count * itemsize
+        return nbytes
+
+    def get_sparse_input(self, column_name, period):
+        period = periods.period(period)
+        sparse_input_by_period = self.sparse_input_by_period_by_name.get(column_name)
+        return sparse_input_by_period.get(period) if sparse_input_by_period is not None else None
+
+    @property
+    def nbytes(self):
+        return sum(
+            sparse_input.nbytes
+            for sparse_input_by_period in self.sparse_input_by_period_by_name.itervalues()
+            for sparse_input in sparse_input_by_period.itervalues()
+            )
+
+    def set_dense_input(self, column_name, period, array):
+        """Store a dense input array sparsely."""
+        holder = self.simulation.get_or_new_holder(column_name)
+        assert len(array) == holder.entity.count
+        self.set_sparse_input(column_name, period, SparseInput.from_dense(array, holder.column.default))
+
+    def set_input(self, column_name, period, index, values):
+        """Store the non-default values of an input, given with the indexes of their entities."""
+        holder = self.simulation.get_or_new_holder(column_name)
+        self.set_sparse_input(column_name, period, SparseInput(holder.entity.count, holder.column.default, index,
+            values))
+
+    def set_sparse_input(self, column_name, period, sparse_input):
+        period = periods.period(period)
+        holder = self.simulation.get_or_new_holder(column_name)
+        column = holder.column
+        assert not column.is_permanent, u'Permanent variable {} can not be stored sparsely'.format(column_name)
+        assert holder.get_array(period) is None, u'Variable {} already has an array for {}'.format(column_name,
+            period)
+        self.sparse_input_by_period_by_name.setdefault(column_name, {})[period] = sparse_input
+        if 'get_array' in holder.__dict__:
+            return
+
+        get_array = holder.get_array
+
+        def materialising_get_array(period):
+            array = get_array(period)
+            if array is None:
+                sparse_input = self.get_sparse_input(column_name, period)
+                if sparse_input is not None:
+                    array = sparse_input.to_dense(dtype = column.dtype)
+                    holder.set_array(period, array)
+                    self.materialised_arrays_count += 1
+            return array
+
+        holder.get_array = materialising_get_array
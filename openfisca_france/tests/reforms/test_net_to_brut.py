@@ -24,7 +24,9 @@
 
 
 import datetime
+import logging
 
+import numpy as np
 from openfisca_core import periods
 from openfisca_core.tools import assert_near
 
@@ -174,12 +176,72 @@ def test_salaire_net_to_salaire_de_base():
             yield check_salaire_net_to_salaire_de_base, count, salaire_de_base_max, salaire_de_base_min, type_sal, year
 
 
+def test_solve_elementwise():
+    # Piecewise-linear and rounded chain, similar to the gross to net ones.
+    def brut_to_net(brut):
+        plafond = 3000
+        return brut - np.round(0.2 * np.minimum(brut, plafond), 2) - np.round(0.1 * np.maximum(brut - plafond, 0), 2)
+
+    brut = np.linspace(0, 10000, 1001)
+    net = brut_to_net(brut)
+    new_brut = inversion_revenus.solve_elementwise(brut_to_net, net)
+    assert_near(brut_to_net(new_brut), net, absolute_error_margin = 0.01)
+    assert_near(new_brut, brut, absolute_error_margin = 0.1)
+
+
+def solve_elementwise_with_warnings(function, target, **kwargs):
+    """Return the solution of solve_elementwise and the warnings it logged."""
+    warnings = []
+
+    class WarningsHandler(logging.Handler):
+        def emit(self, record):
+            warnings.append(record.getMessage())
+
+    handler = WarningsHandler(level = logging.WARNING)
+    inversion_revenus.log.addHandler(handler)
+    try:
+        return inversion_revenus.solve_elementwise(function, target, **kwargs), warnings
+    finally:
+        inversion_revenus.log.removeHandler(handler)
+
+
+def test_solve_elementwise_warns_when_not_converged():
+    # No solution for the second element
+    x, warnings = solve_elementwise_with_warnings(lambda x: np.minimum(x, 100), np.array([50., 200.]),
+        max_iterations = 10)
+    assert len(warnings) == 1 and u'did not converge' in warnings[0] and u'1 of 2 elements' in warnings[0], warnings
+
+
+def test_solve_elementwise_warns_on_jumps():
+    # The function jumps from 500 to 800 at 1000: no solution for the first element.
+    x, warnings = solve_elementwise_with_warnings(lambda x: np.where(x < 1000, .5 * x, .8 * x),
+        np.array([600., 300., 1600.]))
+    assert_near(x, [1000, 600, 2000], absolute_error_margin = 0.01)
+    assert len(warnings) == 1 and u'discontinuity' in warnings[0] and u'1 of 3 elements' in warnings[0], warnings
+
+
+def test_invert_piecewise_linear():
+    def brut_to_net(brut):
+        plafond = 3000
+        return brut - np.round(0.2 * np.minimum(brut, plafond), 2) - np.round(0.1 * np.maximum(brut - plafond, 0), 2)
+
+    breakpoints, values, linear = inversion_revenus.compile_piecewise_linear(brut_to_net, 20000)
+    brut = np.linspace(0, 10000, 1001)
+    net = brut_to_net(brut)
+    new_brut, exact = inversion_revenus.invert_piecewise_linear(breakpoints, values, linear, net)
+    assert exact.all()
+    assert_near(new_brut, brut, absolute_error_margin = 0.1)
+
+
 if __name__ == '__main__':
-    import logging
     import sys
 
     logging.basicConfig(level = logging.ERROR, stream = sys.stdout)
     # TOD0 test_chonet_to_chobrut,
+    test_solve_elementwise()
+    test_solve_elementwise_warns_when_not_converged()
+    test_solve_elementwise_warns_on_jumps()
+    test_invert_piecewise_linear()
     for test in (test_chonet_to_chobrut, test_rstnet_to_rstbrut, test_salaire_net_to_salaire_de_base):
         for function_and_arguments in test():
             function_and_arguments[0](*function_and_arguments[1:])
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+
+
+# OpenFisca -- A versatile microsimulation software
+# By: OpenFisca Team <contact@openfisca.fr>
+#
+# Copyright (C) 2011, 2012, 2013, 2014, 2015 OpenFisca Team
+# https://github.com/openfisca
+#
+# This file is part of OpenFisca.
+#
+# OpenFisca is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# OpenFisca is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE,  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program,  If not, see <http://www.gnu.org/licenses/>.
+
+
+import datetime
+
+from openfisca_core import periods, reforms
+from openfisca_core.tools import assert_near
+from openfisca_france.reform_diff import iter_changed_legislation_paths, ReformDiff
+from openfisca_france.tests import base
+
+
+def test_iter_changed_legislation_paths():
+    reference_json = dict(children = dict(
+        ir = dict(children = dict(bareme = dict(brackets = [dict(rate = 0), dict(rate = 0.055)]))),
+        ))
+    reform_json = dict(children = dict(
+        ir = dict(children = dict(bareme = dict(brackets = [dict(rate = 0), dict(rate = 0.14)]))),
+        plf2015 = dict(children = dict()),
+        ))
+    assert list(iter_changed_legislation_paths(reference_json, reform_json)) == [
+        ('children', 'ir', 'children', 'bareme', 'brackets', 1, 'rate'),
+        ('children', 'plf2015'),
+        ]
+
+
+def test_reform_diff():
+    year = 2013
+    reform = base.get_cached_reform(
+        reform_key = 'trannoy_wasmer',
+        tax_benefit_system = base.tax_benefit_system,
+        )
+    scenario = reform.new_scenario().init_single_entity(
+        axes = [
+            dict(
+                count = 10,
+                max = 30000,
+                min = 0,
+                name = 'salaire_de_base',
+                ),
+            ],
+        period = periods.period('year', year),
+        parent1 = dict(birth = datetime.date(year - 40, 1, 1)),
+        menage = dict(
+            loyer = 1000,
+            ),
+        )
+    reference_simulation = scenario.new_simulation(reference = True)
+    reform_diff = ReformDiff(reference_simulation, ['revdisp'])
+    reform_simulation = scenario.new_simulation()
+    reform_revdisp, = reform_diff.calculate(reform_simulation)
+    assert_near(reform_revdisp, scenario.new_simulation().calculate('revdisp'), absolute_error_margin = 0.01)
+    # Only charge_loyer and its consumers are computed again.
+    period = periods.period('year', year)
+    assert reform_simulation.get_or_new_holder('salaire_net').get_array(period) is \
+        reference_simulation.get_or_new_holder('salaire_net').get_array(period)
+    assert 'ir_brut' in set(reform_diff.legislation_index.iter_variables_name(
+        ('children', 'ir', 'children', 'bareme', 'brackets', 1, 'rate')))
+
+
+def check_legislation_reform_diff(reform, year):
+    scenario = reform.new_scenario().init_single_entity(
+        axes = [
+            dict(
+                count = 10,
+                max = 100000,
+                min = 0,
+                name = 'salaire_de_base',
+                ),
+            ],
+        period = periods.period('year', year),
+        parent1 = dict(birth = datetime.date(year - 40, 1, 1)),
+        )
+    reform_diff = ReformDiff(scenario.new_simulation(reference = True), ['revdisp'])
+    reform_revdisp, = reform_diff.calculate(scenario.new_simulation())
+    assert_near(reform_revdisp, scenario.new_simulation().calculate('revdisp'), absolute_error_margin = 0.01)
+    return reform_diff.reference_arrays[0], reform_revdisp
+
+
+def test_cotisation_reform_diff():
+    year = 2014
+
+    def modify_legislation_json(reference_legislation_json_copy):
+        return reforms.update_legislation(
+            legislation_json = reference_legislation_json_copy,
+            path = ('children', 'cotsoc', 'children', 'cotisations_salarie', 'children', 'prive_non_cadre',
+                'children', 'vieillesse_deplafonnee', 'brackets', 0, 'rate'),
+            period = periods.period('year', year),
+            value = 0.05,
+            )
+
+    Reform = reforms.make_reform(
+        key = 'vieillesse_deplafonnee_salarie_5',
+        name = u"Cotisation vieillesse déplafonnée salarié à 5 %",
+        reference = base.tax_benefit_system,
+        )
+    reform = Reform()
+    reform.modify_legislation_json(modifier_function = modify_legislation_json)
+    revdisp, reform_revdisp = check_legislation_reform_diff(reform, year)
+    assert (reform_revdisp < revdisp - 1).any()
+
+
+def test_plf2015_reform_diff():
+    reform = base.get_cached_reform(
+        reform_key = 'plf2015',
+        tax_benefit_system = base.tax_benefit_system,
+        )
+    check_legislation_reform_diff(reform, 2014)
+
+
+if __name__ == '__main__':
+    import logging
+    import sys
+    logging.basicConfig(level = logging.ERROR, stream = sys.stdout)
+    test_iter_changed_legislation_paths()
+    test_reform_diff()
+    test_cotisation_reform_diff()
+    test_plf2015_reform_diff()
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+
+
+# OpenFisca -- A versatile microsimulation software
+# By: OpenFisca Team <contact@openfisca.fr>
+#
+# Copyright (C) 2011, 2012, 2013, 2014, 2015 OpenFisca Team
+# https://github.com/openfisca
+#
+# This file is part of OpenFisca.
+#
+# OpenFisca is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# OpenFisca is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+import datetime
+import os
+import shutil
+import tempfile
+
+from ..cerfa_ingestion import new_simulation_from_declarations, read_declarations
+from . import base
+
+
+def test_cerfa_ingestion():
+    temp_dir = tempfile.mkdtemp()
+    try:
+        file_path = os.path.join(temp_dir, 'declarations.csv')
+        with open(file_path, 'w') as csv_file:
+            csv_file.write('0DA,0DB,0F0,0AM,1AJ,1BJ,7UF\n')
+            csv_file.write('1970,1972,2005,1,30000,15000,300\n')
+            csv_file.write('1980,,,,20000,,\n')
+        array_by_code = read_declarations(file_path)
+    finally:
+        shutil.rmtree(temp_dir)
+    for sparse in (False, True):
+        simulation = new_simulation_from_declarations(base.tax_benefit_system, array_by_code, 2013, sparse = sparse)
+        assert simulation.entity_by_key_plural['individus'].count == 4
+        irpp = simulation.calculate('irpp')
+        assert len(irpp) == 2
+
+        couple_irpp = base.tax_benefit_system.new_scenario().init_single_entity(
+            enfants = [dict(birth = datetime.date(2005, 1, 1))],
+            foyer_fiscal = dict(f7uf = 300),
+            parent1 = dict(birth = datetime.date(1970, 1, 1), salaire_imposable = 30000, statmarit = 1),
+            parent2 = dict(birth = datetime.date(1972, 1, 1), salaire_imposable = 15000, statmarit = 1),
+            period = 2013,
+            ).new_simulation().calculate('irpp')
+        assert abs(irpp[0] - couple_irpp[0]) < 0.01, (irpp, couple_irpp)
+        single_irpp = base.tax_benefit_system.new_scenario().init_single_entity(
+            parent1 = dict(birth = datetime.date(1980, 1, 1), salaire_imposable = 20000),
+            period = 2013,
+            ).new_simulation().calculate('irpp')
+        assert abs(irpp[1] - single_irpp[0]) < 0.01, (irpp, single_irpp)
+
+
+if __name__ == '__main__':
+    import logging
+    import sys
+
+    logging.basicConfig(level = logging.ERROR, stream = sys.stdout)
+    test_cerfa_ingestion()
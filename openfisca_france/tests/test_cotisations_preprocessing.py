@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+
+
+# OpenFisca -- A versatile microsimulation software
+# By: OpenFisca Team <contact@openfisca.fr>
+#
+# Copyright (C) 2011, 2012, 2013, 2014, 2015 OpenFisca Team
+# https://github.com/openfisca
+#
+# This file is part of OpenFisca.
+#
+# OpenFisca is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# OpenFisca is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+import copy
+import json
+import xml.etree.ElementTree
+
+from openfisca_core import conv, legislations, legislationsxml
+
+from openfisca_france import init_country
+from openfisca_france.model.prelevements_obligatoires.prelevements_sociaux.cotisations_sociales import preprocessing
+
+
+TaxBenefitSystem = init_country()
+
+
+def load_legislation_json():
+    """Return the legislation of param.xml, before its preprocessing."""
+    legislation_tree = xml.etree.ElementTree.parse(TaxBenefitSystem.legislation_xml_file_path)
+    legislation_xml_json = conv.check(legislationsxml.xml_legislation_to_json)(legislation_tree.getroot(),
+        state = conv.default_state)
+    legislation_xml_json = conv.check(legislationsxml.validate_legislation_xml_json)(legislation_xml_json,
+        state = conv.default_state)
+    _, legislation_json = legislationsxml.transform_node_xml_json_to_json(legislation_xml_json)
+    return conv.check(legislations.validate_legislation_json)(legislation_json, state = conv.default_state)
+
+
+def iter_lists(value_json):
+    if isinstance(value_json, dict):
+        for item_json in value_json.itervalues():
+            for list_json in iter_lists(item_json):
+                yield list_json
+    elif isinstance(value_json, list):
+        yield value_json
+        for item_json in value_json:
+            for list_json in iter_lists(item_json):
+                yield list_json
+
+
+def test_preprocessing_unchanged():
+    legislation_json = load_legislation_json()
+    reference_legislation_json = copy.deepcopy(legislation_json)
+
+    preprocessing.preprocess_legislation(legislation_json)
+    # Reference: the barèmes built by deep-copying cotsoc.pat and cotsoc.sal with copy.deepcopy.
+    copy_json = preprocessing.copy_json
+    preprocessing.copy_json = copy.deepcopy
+    try:
+        preprocessing.preprocess_legislation(reference_legislation_json)
+    finally:
+        preprocessing.copy_json = copy_json
+
+    assert json.dumps(legislation_json, default = unicode) == json.dumps(reference_legislation_json,
+        default = unicode)
+
+
+def test_preprocessing_shares_no_leaf():
+    legislation_json = load_legislation_json()
+    preprocessing.preprocess_legislation(legislation_json)
+
+    cotsoc_json = legislation_json['children']['cotsoc']
+    source_lists_id = set(
+        id(list_json)
+        for name in ('pat', 'sal')
+        for list_json in iter_lists(cotsoc_json['children'][name])
+        )
+    for name in ('cotisations_employeur', 'cotisations_salarie'):
+        for list_json in iter_lists(cotsoc_json['children'][name]):
+            assert id(list_json) not in source_lists_id, name
+
+
+if __name__ == '__main__':
+    import logging
+    import sys
+
+    logging.basicConfig(level = logging.ERROR, stream = sys.stdout)
+    test_preprocessing_unchanged()
+    test_preprocessing_shares_no_leaf()
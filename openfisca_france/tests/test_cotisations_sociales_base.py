@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+
+
+# OpenFisca -- A versatile microsimulation software
+# By: OpenFisca Team <contact@openfisca.fr>
+#
+# Copyright (C) 2011, 2012, 2013, 2014, 2015 OpenFisca Team
+# https://github.com/openfisca
+#
+# This file is part of OpenFisca.
+#
+# OpenFisca is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# OpenFisca is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+from __future__ import division
+
+import numpy as np
+from openfisca_core import periods
+
+from ..model.base import CAT
+from ..model.prelevements_obligatoires.prelevements_sociaux.cotisations_sociales.base import (
+    apply_bareme_for_relevant_type_sal, compute_cotisations_bundle, get_type_sal_partition, partition_by_type_sal)
+from . import base
+
+
+def check_apply_bareme_for_relevant_type_sal(bareme_by_type_sal_name, bareme_name):
+    count = 1000
+    random_state = np.random.RandomState(1)
+    type_sal = random_state.randint(0, 7, size = count)
+    assiette = random_state.uniform(0, 20000, size = count)
+    plafond_securite_sociale = random_state.uniform(1000, 3200, size = count)
+
+    # Reference: evaluate every barème on the whole population, masked by category.
+    expected = np.zeros(count)
+    for type_sal_name, type_sal_index in CAT:
+        if type_sal_name not in bareme_by_type_sal_name:
+            continue
+        bareme = bareme_by_type_sal_name[type_sal_name].get(bareme_name)
+        if bareme is not None:
+            expected -= bareme.calc(
+                assiette * (type_sal == type_sal_index),
+                factor = plafond_securite_sociale,
+                round_base_decimals = 2,
+                )
+
+    cotisation = apply_bareme_for_relevant_type_sal(
+        bareme_by_type_sal_name = bareme_by_type_sal_name,
+        bareme_name = bareme_name,
+        base = assiette,
+        plafond_securite_sociale = plafond_securite_sociale,
+        type_sal = type_sal,
+        )
+    assert (cotisation == expected).all(), bareme_name
+
+
+def test_apply_bareme_for_relevant_type_sal():
+    period = periods.period('2014-01')
+    simulation = base.tax_benefit_system.new_scenario().init_single_entity(
+        period = period,
+        parent1 = dict(),
+        ).new_simulation()
+    cotsoc = simulation.legislation_at(period.start).cotsoc
+    for bareme_by_type_sal_name in (cotsoc.cotisations_employeur, cotsoc.cotisations_salarie):
+        for bareme_name in ('agirc', 'arrco', 'assedic', 'famille', 'ircantec', 'maladie', 'vieillesse'):
+            yield check_apply_bareme_for_relevant_type_sal, bareme_by_type_sal_name, bareme_name
+
+
+def check_cotisations_bundle(bareme_by_type_sal_name):
+    count = 1000
+    random_state = np.random.RandomState(2)
+    type_sal = random_state.randint(0, 7, size = count)
+    assiette = random_state.uniform(0, 20000, size = count)
+    plafond_securite_sociale = random_state.uniform(1000, 3200, size = count)
+
+    column_index_by_name, cotisations = compute_cotisations_bundle(
+        bareme_by_type_sal_name = bareme_by_type_sal_name,
+        base = assiette,
+        plafond_securite_sociale = plafond_securite_sociale,
+        type_sal_partition = partition_by_type_sal(type_sal),
+        )
+    assert cotisations.shape == (count, len(column_index_by_name))
+    for bareme_name, column_index in column_index_by_name.iteritems():
+        cotisation = apply_bareme_for_relevant_type_sal(
+            bareme_by_type_sal_name = bareme_by_type_sal_name,
+            bareme_name = bareme_name,
+            base = assiette,
+            plafond_securite_sociale = plafond_securite_sociale,
+            type_sal = type_sal,
+            )
+        assert (cotisations[:, column_index] == cotisation).all(), bareme_name
+
+
+def test_cotisations_bundle():
+    for year in (2005, 2010, 2014):
+        period = periods.period(year)
+        simulation = base.tax_benefit_system.new_scenario().init_single_entity(
+            period = period,
+            parent1 = dict(),
+            ).new_simulation()
+        cotsoc = simulation.legislation_at(period.start).cotsoc
+        yield check_cotisations_bundle, cotsoc.cotisations_employeur
+        yield check_cotisations_bundle, cotsoc.cotisations_salarie
+
+
+def test_cumul_annuel():
+    year = 2014
+    simulation = base.tax_benefit_system.new_scenario().init_single_entity(
+        axes = [
+            dict(
+                count = 3,
+                name = 'salaire_de_base',
+                max = 5000,
+                min = 1000,
+                ),
+            ],
+        period = year,
+        parent1 = dict(
+            allegement_fillon_mode_recouvrement = 2,
+            effectif_entreprise = 3000,
+            type_sal = CAT['prive_non_cadre'],
+            ),
+        ).new_simulation()
+    for month in range(1, 13):
+        up_to_this_month = periods.period('year', year).start.period('month', month)
+        this_month = up_to_this_month.start.offset(month - 1, 'month').period('month')
+        for variable_name in ('allegement_fillon', 'assiette_cotisations_sociales', 'smic_proratise'):
+            base.assert_near(
+                simulation.calculate('{}_cumul_annuel'.format(variable_name), this_month),
+                simulation.calculate_add(variable_name, up_to_this_month),
+                absolute_error_margin = 1e-6,
+                )
+
+
+def test_partition_by_type_sal():
+    type_sal = np.array([3, 0, 1, 0, 6, 3, 1])
+    partition = partition_by_type_sal(type_sal)
+    assert [type_sal_name for type_sal_name, indices in partition] == [
+        'prive_non_cadre',
+        'prive_cadre',
+        'public_titulaire_militaire',
+        'public_non_titulaire',
+        ]
+    assert sorted(np.concatenate([indices for type_sal_name, indices in partition]).tolist()) == range(len(type_sal))
+    for type_sal_name, indices in partition:
+        assert (type_sal[indices] == CAT[type_sal_name]).all()
+
+
+def test_get_type_sal_partition_is_cached():
+    period = periods.period('2014-01')
+    simulation = base.tax_benefit_system.new_scenario().init_single_entity(
+        period = period,
+        parent1 = dict(type_sal = CAT['prive_cadre']),
+        parent2 = dict(type_sal = CAT['public_titulaire_etat']),
+        ).new_simulation()
+    partition = get_type_sal_partition(simulation, period)
+    assert get_type_sal_partition(simulation, period) is partition
+    assert [type_sal_name for type_sal_name, indices in partition] == ['prive_cadre', 'public_titulaire_etat']
+
+
+if __name__ == '__main__':
+    import logging
+    import sys
+
+    logging.basicConfig(level = logging.ERROR, stream = sys.stdout)
+    test_partition_by_type_sal()
+    test_cumul_annuel()
+    test_get_type_sal_partition_is_cached()
+    for function_and_arguments in test_apply_bareme_for_relevant_type_sal():
+        function_and_arguments[0](*function_and_arguments[1:])
+    for function_and_arguments in test_cotisations_bundle():
+        function_and_arguments[0](*function_and_arguments[1:])
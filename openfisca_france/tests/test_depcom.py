@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+
+
+# OpenFisca -- A versatile microsimulation software
+# By: OpenFisca Team <contact@openfisca.fr>
+#
+# Copyright (C) 2011, 2012, 2013, 2014, 2015 OpenFisca Team
+# https://github.com/openfisca
+#
+# This file is part of OpenFisca.
+#
+# OpenFisca is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# OpenFisca is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+from __future__ import division
+
+import shutil
+import tempfile
+
+import numpy as np
+
+from ..model.depcom import DepcomIndex, load_depcom_indexes, pack_depcom, save_depcom_indexes
+from ..model.prestations import aides_logement
+
+
+def test_pack_depcom():
+    codes = pack_depcom(np.array(['01001', '2A004', '2B033', '75056', '', '7505'], dtype = 'S5'))
+    assert (codes[:4] >= 0).all()
+    assert len(set(codes[:4])) == 4
+    assert (codes[4:] == -1).all()
+
+
+def test_depcom_index():
+    zone_by_depcom = {
+        '01001': 3,
+        '2A004': 2,
+        '75056': 1,
+        }
+    index = DepcomIndex(zone_by_depcom, dtype = np.int16)
+    depcom = np.array(['75056', '99999', '2A004', '', '01001'], dtype = 'S5')
+    zone = index.lookup(depcom, 2)
+    assert zone.dtype == np.int16
+    assert zone.tolist() == [1, 2, 2, 2, 3], zone
+
+
+def test_zone_apl_index():
+    aides_logement.preload_zone_apl()
+    # Paris and its arrondissements are in zone 1.
+    zone = aides_logement.zone_apl_index.lookup(np.array(['75056', '75101', '75120'], dtype = 'S5'), 2)
+    assert zone.tolist() == [1, 1, 1], zone
+
+
+def test_depcom_indexes_cache():
+    cache_dir = tempfile.mkdtemp()
+    try:
+        assert load_depcom_indexes('zone_apl', aides_logement.zone_apl_asset_names, cache_dir = cache_dir) is None
+        index_by_key = aides_logement.build_zone_apl_index_by_key()
+        save_depcom_indexes('zone_apl', aides_logement.zone_apl_asset_names, index_by_key, cache_dir = cache_dir)
+        cached_index_by_key = load_depcom_indexes('zone_apl', aides_logement.zone_apl_asset_names,
+            cache_dir = cache_dir)
+        assert sorted(cached_index_by_key) == ['zone_apl']
+        cached_index = cached_index_by_key['zone_apl']
+        assert (cached_index.codes == index_by_key['zone_apl'].codes).all()
+        assert (cached_index.values == index_by_key['zone_apl'].values).all()
+        # Indexes built from other assets are not reused.
+        assert load_depcom_indexes('zone_apl', aides_logement.zone_apl_asset_names[:1], cache_dir = cache_dir) is None
+    finally:
+        shutil.rmtree(cache_dir)
+
+
+if __name__ == '__main__':
+    import logging
+    import sys
+
+    logging.basicConfig(level = logging.ERROR, stream = sys.stdout)
+    test_pack_depcom()
+    test_depcom_index()
+    test_zone_apl_index()
+    test_depcom_indexes_cache()
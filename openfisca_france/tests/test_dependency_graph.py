@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+
+
+# OpenFisca -- A versatile microsimulation software
+# By: OpenFisca Team <contact@openfisca.fr>
+#
+# Copyright (C) 2011, 2012, 2013, 2014, 2015 OpenFisca Team
+# https://github.com/openfisca
+#
+# This file is part of OpenFisca.
+#
+# OpenFisca is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# OpenFisca is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import collections
+import threading
+import time
+
+from openfisca_core import holders, periods
+
+from ..dependency_graph import DependencyGraph, ParallelEvaluator, record_dependency_graph, ReleasingEvaluator
+from . import base
+
+
+def test_evaluation_plan():
+    graph = DependencyGraph()
+    graph.add_dependency(('c', '2014'), ('b', '2014'))
+    graph.add_dependency(('c', '2014'), ('a', '2014'))
+    graph.add_dependency(('b', '2014'), ('a', '2014'))
+    graph.add_dependency(('d', '2014'), ('a', '2014'))
+    plan = graph.evaluation_plan([('c', '2014')])
+    assert plan == [('a', '2014'), ('b', '2014'), ('c', '2014')], plan
+    assert list(graph.iter_levels([('c', '2014'), ('d', '2014')])) == [
+        [('a', '2014')],
+        [('b', '2014'), ('d', '2014')],
+        [('c', '2014')],
+        ]
+    assert graph.last_consumer_index_by_key(plan) == {('a', '2014'): 2, ('b', '2014'): 2}
+    assert DependencyGraph.from_json(graph.to_json()).dependencies_by_key == graph.dependencies_by_key
+
+
+def test_record_dependency_graph():
+    simulation = base.tax_benefit_system.new_scenario().init_single_entity(
+        period = 2014,
+        parent1 = dict(
+            salaire_de_base = 30000,
+            ),
+        ).new_simulation()
+    graph = record_dependency_graph(simulation, ['revdisp'])
+    plan = graph.evaluation_plan([('revdisp', '2014')])
+    assert plan[-1] == ('revdisp', '2014')
+    assert ('salaire_net', '2014') in plan
+    position_by_key = dict((key, index) for index, key in enumerate(plan))
+    for key in plan:
+        for dependency_key in graph.dependencies_by_key[key]:
+            assert position_by_key[dependency_key] < position_by_key[key]
+
+
+def test_releasing_evaluator():
+    scenario = base.tax_benefit_system.new_scenario().init_single_entity(
+        period = 2014,
+        parent1 = dict(
+            salaire_de_base = 30000,
+            ),
+        )
+    reference_simulation = scenario.new_simulation()
+    graph = record_dependency_graph(reference_simulation, ['revdisp'])
+    simulation = scenario.new_simulation()
+    evaluator = ReleasingEvaluator(simulation, graph)
+    revdisp, = evaluator.calculate(['revdisp'])
+    assert revdisp == reference_simulation.calculate('revdisp')
+    assert evaluator.released_arrays_count > 0
+    assert 0 < evaluator.resident_bytes < evaluator.peak_resident_bytes
+    assert simulation.get_or_new_holder('salaire_de_base').get_array(2014) is not None
+
+
+def test_parallel_evaluator():
+    scenario = base.tax_benefit_system.new_scenario().init_single_entity(
+        axes = [
+            dict(
+                count = 10,
+                max = 100000,
+                min = 0,
+                name = 'salaire_de_base',
+                ),
+            ],
+        period = 2014,
+        parent1 = dict(),
+        )
+    reference_simulation = scenario.new_simulation()
+    graph = record_dependency_graph(reference_simulation, ['revdisp'])
+    revdisp, = ParallelEvaluator(scenario.new_simulation(), graph, threads = 4).calculate(['revdisp'])
+    assert (revdisp == reference_simulation.calculate('revdisp')).all()
+
+
+def test_parallel_evaluator_empty_plan():
+    simulation = base.tax_benefit_system.new_scenario().init_single_entity(
+        period = 2014,
+        parent1 = dict(),
+        ).new_simulation()
+    assert ParallelEvaluator(simulation, DependencyGraph(), threads = 2).calculate([]) == []
+
+
+def test_parallel_evaluator_locks_variables():
+    # The same variable, requested for the year and for each of its months, is never computed by 2 threads at once.
+    simulation = base.tax_benefit_system.new_scenario().init_single_entity(
+        period = 2014,
+        parent1 = dict(
+            salaire_de_base = 30000,
+            ),
+        ).new_simulation()
+    graph = DependencyGraph()
+    graph.add_dependency(('revdisp', '2014'), ('salaire_net', '2014'))
+    for month in range(1, 13):
+        graph.add_dependency(('revdisp', '2014'), ('salaire_net', '2014-{:02d}'.format(month)))
+
+    lock = threading.Lock()
+    threads_by_variable_name = collections.defaultdict(set)
+    max_threads_count_by_variable_name = collections.defaultdict(int)
+    compute = holders.Holder.compute
+
+    def counting_compute(holder, period = None, **parameters):
+        if holder.get_array(period if period is not None else simulation.period) is not None:
+            return compute(holder, period = period, **parameters)
+        variable_name = holder.column.name
+        thread = threading.current_thread()
+        with lock:
+            threads = threads_by_variable_name[variable_name]
+            added = thread not in threads
+            threads.add(thread)
+            max_threads_count_by_variable_name[variable_name] = max(
+                max_threads_count_by_variable_name[variable_name], len(threads))
+        try:
+            return compute(holder, period = period, **parameters)
+        finally:
+            if added:
+                with lock:
+                    threads.discard(thread)
+
+    holders.Holder.compute = counting_compute
+    try:
+        ParallelEvaluator(simulation, graph, threads = 4).calculate(['revdisp'])
+    finally:
+        holders.Holder.compute = compute
+    assert max_threads_count_by_variable_name['salaire_net'] == 1, max_threads_count_by_variable_name
+
+
+def test_parallel_evaluator_missing_dependency():
+    # The graph misses dependencies crossing the months: salaire_net@2014-02 needs salaire_imposable@2014-01, and
+    # salaire_imposable@2014-02 needs salaire_net@2014-01, so that the 2 threads wait for each other's lock.
+    scenario = base.tax_benefit_system.new_scenario().init_single_entity(
+        period = 2014,
+        parent1 = dict(
+            salaire_de_base = 30000,
+            ),
+        )
+    period = periods.period('2014-02')
+    graph = DependencyGraph()
+    graph.dependencies_by_key[('salaire_net', unicode(period))] = set()
+    graph.dependencies_by_key[('salaire_imposable', unicode(period))] = set()
+    simulation = scenario.new_simulation()
+    other_variable_name_by_name = dict(
+        salaire_imposable = 'salaire_net',
+        salaire_net = 'salaire_imposable',
+        )
+    compute = holders.Holder.compute
+
+    def crossing_compute(holder, period = None, **parameters):
+        other_variable_name = other_variable_name_by_name.get(holder.column.name)
+        if other_variable_name is not None and unicode(period) == u'2014-02' and holder.get_array(period) is None:
+            time.sleep(0.1)
+            simulation.get_or_new_holder(other_variable_name).compute(period = period.offset(-1))
+        return compute(holder, period = period, **parameters)
+
+    holders.Holder.compute = crossing_compute
+    try:
+        evaluator = ParallelEvaluator(simulation, graph, threads = 2, lock_timeout = 1)
+        salaire_net, salaire_imposable = evaluator.calculate(['salaire_net', 'salaire_imposable'], period)
+    finally:
+        holders.Holder.compute = compute
+    assert evaluator.sequential_fallback
+    reference_simulation = scenario.new_simulation()
+    assert (salaire_net == reference_simulation.calculate('salaire_net', period)).all()
+    assert (salaire_imposable == reference_simulation.calculate('salaire_imposable', period)).all()
+
+
+if __name__ == '__main__':
+    import logging
+    import sys
+
+    logging.basicConfig(level = logging.ERROR, stream = sys.stdout)
+    test_evaluation_plan()
+    test_record_dependency_graph()
+    test_releasing_evaluator()
+    test_parallel_evaluator()
+    test_parallel_evaluator_empty_plan()
+    test_parallel_evaluator_locks_variables()
+    test_parallel_evaluator_missing_dependency()
@@ -24,14 +24,22 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 
-"""Teste tous les fichiers .json créés par un script"""
+"""Teste tous les fichiers .json créés par un script
 
+Run as a module to compare the files in parallel and get a JSON summary of the pass rate of each code:
 
+    python -m openfisca_france.tests.test_jsons --processes 4 --summary summary.json
+"""
+
+
+import collections
 import datetime
 import json
 import logging
+import multiprocessing
 import os
 import sys
+import time
 
 from biryani.baseconv import check
 from nose.tools import assert_equal
@@ -43,93 +51,226 @@ json_dir_path = os.path.join(os.path.dirname(__file__), 'json')
 log = logging.getLogger(__name__)
 
 
+# Codes of impots.gouv.fr compared with OpenFisca variables
+openfisca_name_by_code = {
+    'IAVIM': 'iai',
+    'IDEC': 'decote',
+    'IDRS2': 'ir_plaf_qf',
+    'IINETIR': 'irpp',
+    'IRESTIR': 'irpp',
+    'ITRED': 'reductions',
+    'NBP': 'nbptr',
+    'NBPT': 'nbptr',
+    'PPETOT': 'ppe',
+    'REVKIRE': 'rfr',
+    'RNICOL': 'rni',
+    'RRBG': 'rbg',
+    # TODO: Checker si le montant net CSG/CRDS correspond à NAPCS, NAPRDS, checker IINET
+    }
+# Codes ignorés pour la comparaison
+ignored_codes = set([
+    'AVFISCOPTER', 'BCSG', 'BPRS', 'BRDS', 'CIADCRE', 'CICA', 'CICORSE', 'CIDEPENV', 'CIDEVDUR',
+    'CIGARD', 'CIGE', 'CIHABPRIN', 'CIMOBIL', 'CIPERT', 'CIPRETUD', 'RILMIA', 'IINET',
+    'CIRCM', 'CIRELANCE', 'CITEC', 'IAVF2', 'I2DH', 'IREST', 'IRESTIR', 'RILMIH',
+    'IRETS', 'ITRED', 'NAPCR', 'NAPCRP', 'NAPCS', 'RRIRENOV', 'RCELHL', 'RLOCIDEFG',
+    'NAPPS', 'NAPRD', 'PERPPLAFTC', 'PERPPLAFTV', 'RAH', 'RCEL', 'RCELREPGX', 'RCELREPGW', 'RDONS',
+    'RCELHJK', 'RCELREPHR', 'RCELRREDLA', 'RRESIVIEU', 'RMEUBLE', 'RREDMEUB', 'RSOCREPR', 'RRPRESCOMP',
+    'RCONS', 'RPECHE', 'RCELREPGS', 'RCELREPGU', 'RCELREPGT', 'RPATNAT', 'RPATNATOT', 'RPRESCOMPREP',
+    'RDIFAGRI', 'REI', 'RFOR', 'RTELEIR', 'RTOURREP', 'RTOUREPA', 'RTOUHOTR', 'RRESINEUV',
+    'RFORET', 'RHEBE', 'RILMIC', 'RILMIB', 'RRESIMEUB', 'RREPMEU', 'RREPNPRO', 'TEFF',
+    'RPROREP', 'RINVRED', 'RREDREP', 'RILMIX', 'PERPPLAFTP',
+    'RILMIZ', 'RILMJI', 'RILMJS', 'RCODJT', 'RCODJU', 'RCODJV', 'RCODJW', 'RCODJX',
+    'RIDOMENT', 'RIDOMPROE1', 'RIDOMPROE2', 'RLOGDOM', 'RREPA', 'RDUFLOGIH', 'IPROP',
+    'RIDOMPROE3', 'RIDOMPROE4', 'RIDOMPROE5', 'RTITPRISE', 'RRDOM', 'RINVDOMTOMLG', 'RCOTFOR',
+    'RNI', 'RNOUV', 'RRESTIMO', 'RTOUR', 'RCELRREDLC', 'RCELRREDLB', 'RCELNBGL', 'RCELFD',
+    'RCELLIER', 'RCELHNO', 'RCELHM', 'RCELHR', 'RCELRREDLS', 'RCELRREDLZ', 'RCELFABC',
+    'RCELREPHS', 'RCELNBGL', 'RCELCOM', 'RCELNQ', 'RCELRREDLD', 'RCELRREDLE', 'RCELRREDLF',
+    'RTOURHOT', 'RTOURES', 'RTOURNEUF', 'RCELREPHR', 'RCINE', 'RFCPI', 'RINNO', 'RAA',
+    'RCELREPGJ', 'RCELREPGK', 'RCELREPGL', 'RCELREPGP', 'RSOUFIP', 'RCODELOP',
+    'RTOURTRA', 'TXMARJ', 'RSURV', 'RAIDE', 'RCELREPHA', 'RCELREPHB', 'RCELJP', 'RCELJOQR',
+    'RCELREPHD', 'RCELREPHE', 'RCELREPHF', 'RCELREPHH', 'RCEL2012', 'RCELJBGL', 'RCOLENT',
+    'RCELREPHT', 'RCELREPHU', 'RCELREPHV', 'RCELREPHW', 'RCELREPHX', 'RCELREPHZ', 'RCELRRED09', 'TXMOYIMP',
+    'RFIPC', 'RILMJX', 'RILMJV', 'RCELREPGV', 'RCELRREDLM', 'RCELRREDMG', 'RILMJW', 'RCELREPHG',
+    ])
+
+
+def get_simulation(args):
+    # The simulation is shared by all the codes of a JSON file.
+    simulation_by_scenario = args['simulation_by_scenario']
+    simulation = simulation_by_scenario.get('simulation')
+    if simulation is None:
+        simulation = simulation_by_scenario['simulation'] = args['scenario'].new_simulation(debug = True)
+    return simulation
+
+
 def check_variable(args):
     scenario = args['scenario']
-    simulation = scenario.new_simulation(debug = True)
     code = args['code']
     openfisca_value = None
-    if code == 'IAVIM':
-        openfisca_name = 'iai'
-    elif code == 'IDEC':
-        openfisca_name = 'decote'
-    elif code == 'IDRS2':
-        openfisca_name = 'ir_plaf_qf'
-    elif code == 'IINETIR' or code == 'IRESTIR':
-        openfisca_name = 'irpp'
-    elif code == 'ITRED':
-        openfisca_name = 'reductions'
-    elif code == 'NBPT' or code == 'NBP':
-        openfisca_name = 'nbptr'
-    elif code == 'PPETOT':
-        openfisca_name = 'ppe'
-    elif code == 'REVKIRE':
-        openfisca_name = 'rfr'
-    elif code == 'RNICOL':
-        openfisca_name = 'rni'
-    elif code == 'RRBG':
-        openfisca_name = 'rbg'
-    # TODO: Checker si le montant net CSG/CRDS correspond à NAPCS, NAPRDS, checker IINET
-    elif code == 'TOTPAC':
+    if code == 'TOTPAC':
         openfisca_name = "len(args['totpac'] or [])"
-        openfisca_value = len(args['totpac'] or [])  # Codes ignorés pour la comparaison
-    elif code in ('AVFISCOPTER', 'BCSG', 'BPRS', 'BRDS', 'CIADCRE', 'CICA', 'CICORSE', 'CIDEPENV', 'CIDEVDUR',
-            'CIGARD', 'CIGE', 'CIHABPRIN', 'CIMOBIL', 'CIPERT', 'CIPRETUD', 'RILMIA', 'IINET',
-            'CIRCM', 'CIRELANCE', 'CITEC', 'IAVF2', 'I2DH', 'IREST', 'IRESTIR', 'RILMIH',
-            'IRETS', 'ITRED', 'NAPCR', 'NAPCRP', 'NAPCS', 'RRIRENOV', 'RCELHL', 'RLOCIDEFG',
-            'NAPPS', 'NAPRD', 'PERPPLAFTC', 'PERPPLAFTV', 'RAH', 'RCEL', 'RCELREPGX', 'RCELREPGW', 'RDONS',
-            'RCELHJK', 'RCELREPHR', 'RCELRREDLA', 'RRESIVIEU', 'RMEUBLE', 'RREDMEUB', 'RSOCREPR', 'RRPRESCOMP',
-            'RCONS', 'RPECHE', 'RCELREPGS', 'RCELREPGU', 'RCELREPGT', 'RPATNAT', 'RPATNATOT', 'RPRESCOMPREP',
-            'RDIFAGRI', 'REI', 'RFOR', 'RTELEIR', 'RTOURREP', 'RTOUREPA', 'RTOUHOTR', 'RRESINEUV',
-            'RFORET', 'RHEBE', 'RILMIC', 'RILMIB', 'RRESIMEUB', 'RREPMEU', 'RREPNPRO', 'TEFF',
-            'RPROREP', 'RINVRED', 'RREDREP', 'RILMIX', 'PERPPLAFTP',
-            'RILMIZ', 'RILMJI', 'RILMJS', 'RCODJT', 'RCODJU', 'RCODJV', 'RCODJW', 'RCODJX',
-            'RIDOMENT', 'RIDOMPROE1', 'RIDOMPROE2', 'RLOGDOM', 'RREPA', 'RDUFLOGIH', 'IPROP',
-            'RIDOMPROE3', 'RIDOMPROE4', 'RIDOMPROE5', 'RTITPRISE', 'RRDOM', 'RINVDOMTOMLG', 'RCOTFOR',
-            'RNI', 'RNOUV', 'RRESTIMO', 'RTOUR', 'RCELRREDLC', 'RCELRREDLB', 'RCELNBGL', 'RCELFD',
-            'RCELLIER', 'RCELHNO', 'RCELHM', 'RCELHR', 'RCELRREDLS', 'RCELRREDLZ', 'RCELFABC',
-            'RCELREPHS', 'RCELNBGL', 'RCELCOM', 'RCELNQ', 'RCELRREDLD', 'RCELRREDLE', 'RCELRREDLF',
-            'RTOURHOT', 'RTOURES', 'RTOURNEUF', 'RCELREPHR', 'RCINE', 'RFCPI', 'RINNO', 'RAA',
-            'RCELREPGJ', 'RCELREPGK', 'RCELREPGL', 'RCELREPGP', 'RSOUFIP', 'RCODELOP',
-            'RTOURTRA', 'TXMARJ', 'RSURV', 'RAIDE', 'RCELREPHA', 'RCELREPHB', 'RCELJP', 'RCELJOQR',
-            'RCELREPHD', 'RCELREPHE', 'RCELREPHF', 'RCELREPHH', 'RCEL2012', 'RCELJBGL', 'RCOLENT',
-            'RCELREPHT', 'RCELREPHU', 'RCELREPHV', 'RCELREPHW', 'RCELREPHX', 'RCELREPHZ', 'RCELRRED09', 'TXMOYIMP',
-            'RFIPC', 'RILMJX', 'RILMJV', 'RCELREPGV', 'RCELRREDLM', 'RCELRREDMG', 'RILMJW', 'RCELREPHG'):
+        openfisca_value = len(args['totpac'] or [])
+    elif code in openfisca_name_by_code:
+        openfisca_name = openfisca_name_by_code[code]
+    elif code in ignored_codes:
         return
     else:
         raise ValueError(u'"code" inconnu')
     log.info(u'Comparing impôts.gouv.fr variable {} with OpenFisca variable {}'.format(code, openfisca_name))
-    log.info(u'Scenario:\n{}'.format(json.dumps(scenario.to_json(), encoding = 'utf_8', ensure_ascii = False,
-        indent = 2)))
+    if log.isEnabledFor(logging.INFO):
+        log.info(u'Scenario:\n{}'.format(json.dumps(scenario.to_json(), encoding = 'utf_8', ensure_ascii = False,
+            indent = 2)))
     if openfisca_value is None:
-        openfisca_array = simulation.calculate(openfisca_name)
+        openfisca_array = get_simulation(args).calculate(openfisca_name)
         assert_equal(openfisca_array.shape, (1,))
         openfisca_value = openfisca_array[0]
     assert_near(abs(openfisca_value), args['field']['value'], absolute_error_margin = 2)
 
 
+def load_json_file(json_file_name):
+    with open(os.path.join(json_dir_path, json_file_name)) as json_file:
+        content = json.load(json_file)
+    scenario_json = content['scenario']
+    scenario = check(tax_benefit_system.Scenario.make_json_to_instance(tax_benefit_system = tax_benefit_system))(
+        scenario_json)
+    if 'year' in scenario_json:
+        year = scenario_json['year']
+    else:
+        date = datetime.datetime.strptime(scenario_json['date'], "%Y-%m-%d")
+        year = date.year
+    totpac = scenario.test_case['foyers_fiscaux'].values()[0].get('personnes_a_charge')
+    return content, scenario, year, totpac
+
+
 def test_jsons():
     for json_file_name in os.listdir(json_dir_path):
-        with open(os.path.join(json_dir_path, json_file_name)) as json_file:
-            content = json.load(json_file)
-        scenario_json = content['scenario']
-        scenario = check(tax_benefit_system.Scenario.make_json_to_instance(tax_benefit_system = tax_benefit_system))(
-            scenario_json)
-        if 'year' in scenario_json:
-            year = scenario_json['year']
-        else:
-            date = datetime.datetime.strptime(scenario_json['date'], "%Y-%m-%d")
-            year = date.year
-        totpac = scenario.test_case['foyers_fiscaux'].values()[0].get('personnes_a_charge')
+        content, scenario, year, totpac = load_json_file(json_file_name)
+        simulation_by_scenario = {}
         for code, field in content['resultat_officiel'].iteritems():
             yield check_variable, {
                 'code': code,
                 'field': field,
                 'json_file_name': json_file_name,
                 'scenario': scenario,
+                'simulation_by_scenario': simulation_by_scenario,
                 'totpac': totpac,
                 'year': year,
                 }
 
 
+# Parallel comparison
+
+
+def compare_json_file(json_file_name):
+    """Compare every code of a JSON file with OpenFisca, using a single simulation.
+
+    Return a dictionary giving the duration of the comparison and the result of each code.
+    """
+    start_time = time.time()
+    results = []
+    try:
+        content, scenario, year, totpac = load_json_file(json_file_name)
+        simulation = scenario.new_simulation()
+    except Exception as exception:
+        return dict(
+            duration = time.time() - start_time,
+            error = unicode(exception),
+            json_file_name = json_file_name,
+            results = results,
+            )
+    for code, field in content['resultat_officiel'].iteritems():
+        result = dict(code = code, expected = field['value'])
+        try:
+            if code == 'TOTPAC':
+                value = len(totpac or [])
+            elif code in openfisca_name_by_code:
+                value = float(simulation.calculate(openfisca_name_by_code[code])[0])
+            elif code in ignored_codes:
+                continue
+            else:
+                raise ValueError(u'"code" inconnu')
+        except Exception as exception:
+            result['error'] = unicode(exception)
+        else:
+            result['value'] = value
+            result['passed'] = bool(abs(abs(value) - field['value']) <= 2)
+        results.append(result)
+    return dict(
+        duration = time.time() - start_time,
+        json_file_name = json_file_name,
+        results = results,
+        )
+
+
+def summarize(file_comparisons, duration = None):
+    count_by_code = collections.defaultdict(lambda: dict(errors = 0, failed = 0, passed = 0))
+    failures = []
+    for file_comparison in file_comparisons:
+        for result in file_comparison['results']:
+            count = count_by_code[result['code']]
+            if 'error' in result:
+                count['errors'] += 1
+            elif result['passed']:
+                count['passed'] += 1
+            else:
+                count['failed'] += 1
+            if not result.get('passed'):
+                failures.append(dict(result, json_file_name = file_comparison['json_file_name']))
+    for count in count_by_code.itervalues():
+        total = count['errors'] + count['failed'] + count['passed']
+        count['pass_rate'] = count['passed'] / total if total else None
+    files_duration = [file_comparison['duration'] for file_comparison in file_comparisons]
+    return collections.OrderedDict((
+        ('duration', duration),
+        ('files_count', len(file_comparisons)),
+        ('files_errors', [
+            dict(error = file_comparison['error'], json_file_name = file_comparison['json_file_name'])
+            for file_comparison in file_comparisons
+            if 'error' in file_comparison
+            ]),
+        ('file_duration_max', max(files_duration) if files_duration else None),
+        ('file_duration_mean', sum(files_duration) / len(files_duration) if files_duration else None),
+        ('codes', collections.OrderedDict(sorted(count_by_code.iteritems()))),
+        ('failures', failures),
+        ))
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description = __doc__)
+    parser.add_argument('-n', '--name', default = None, help = "partial name of JSON files to compare")
+    parser.add_argument('-p', '--processes', default = multiprocessing.cpu_count(), type = int,
+        help = "number of worker processes (default: %(default)s)")
+    parser.add_argument('-s', '--summary', default = None, help = "path of the JSON summary (default: stdout)")
+    parser.add_argument('-v', '--verbose', action = 'store_true', default = False, help = "increase output verbosity")
+    args = parser.parse_args()
+    logging.basicConfig(level = logging.DEBUG if args.verbose else logging.WARNING, stream = sys.stderr)
+
+    json_files_name = sorted(
+        json_file_name
+        for json_file_name in os.listdir(json_dir_path)
+        if args.name is None or args.name in json_file_name
+        )
+    start_time = time.time()
+    if args.processes > 1:
+        # Workers are forked after the creation of tax_benefit_system, which they share.
+        pool = multiprocessing.Pool(args.processes)
+        file_comparisons = pool.map(compare_json_file, json_files_name, chunksize = 16)
+        pool.close()
+        pool.join()
+    else:
+        file_comparisons = [compare_json_file(json_file_name) for json_file_name in json_files_name]
+    summary = summarize(file_comparisons, duration = time.time() - start_time)
+
+    if args.summary is None:
+        json.dump(summary, sys.stdout, indent = 2)
+        sys.stdout.write('\n')
+    else:
+        with open(args.summary, 'w') as summary_file:
+            json.dump(summary, summary_file, indent = 2)
+    return 1 if summary['failures'] or summary['files_errors'] else 0
+
+
 if __name__ == "__main__":
-    sys.exit(test_jsons())
+    sys.exit(main())
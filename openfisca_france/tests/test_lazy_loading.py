@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+
+
+# OpenFisca -- A versatile microsimulation software
+# By: OpenFisca Team <contact@openfisca.fr>
+#
+# Copyright (C) 2011, 2012, 2013, 2014, 2015 OpenFisca Team
+# https://github.com/openfisca
+#
+# This file is part of OpenFisca.
+#
+# OpenFisca is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# OpenFisca is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+from __future__ import division
+
+import json
+import subprocess
+import sys
+import textwrap
+
+from openfisca_core.tools import assert_near
+
+from .. import init_country
+from ..model import lazy_loading
+from . import base
+
+
+def test_manifest_is_up_to_date():
+    assert lazy_loading.load_manifest() == lazy_loading.build_manifest(), \
+        "Manifest is outdated: run openfisca_france/scripts/generate_formulas_manifest.py"
+
+
+def test_manifest_columns_exist():
+    missing_column_names = sorted(set(lazy_loading.load_manifest()).difference(base.tax_benefit_system.column_by_name))
+    assert not missing_column_names, missing_column_names
+
+
+def test_lazy_tax_benefit_system():
+    lazy_tax_benefit_system = init_country(lazy = True)()
+    for tax_benefit_system in (base.tax_benefit_system, lazy_tax_benefit_system):
+        simulation = tax_benefit_system.new_scenario().init_single_entity(
+            period = 2014,
+            parent1 = dict(
+                salaire_de_base = 30000,
+                ),
+            ).new_simulation()
+        if tax_benefit_system is base.tax_benefit_system:
+            salaire_net = simulation.calculate_add('salaire_net')
+            revdisp = simulation.calculate('revdisp')
+        else:
+            assert_near(simulation.calculate_add('salaire_net'), salaire_net, absolute_error_margin = 0.01)
+            assert_near(simulation.calculate('revdisp'), revdisp, absolute_error_margin = 0.01)
+
+
+def test_lazy_loading_imports_only_needed_modules():
+    # Run in a new process, since this one has already imported every formula module through tests.base.
+    output = subprocess.check_output([sys.executable, '-c', textwrap.dedent("""\
+        import json
+        import sys
+
+        from openfisca_france import init_country
+
+        tax_benefit_system = init_country(lazy = True)()
+        simulation = tax_benefit_system.new_scenario().init_single_entity(
+            period = 2014,
+            parent1 = dict(
+                salaire_de_base = 30000,
+                ),
+            ).new_simulation()
+        salaire_net = simulation.calculate_add('salaire_net')
+        print json.dumps(dict(
+            module_names = sorted(name for name in sys.modules if name.startswith('openfisca_france.model.')),
+            salaire_net = salaire_net.tolist(),
+            ))
+        """)])
+    result = json.loads(output.splitlines()[-1])
+    assert 'openfisca_france.model.prelevements_obligatoires.impot_revenu.reductions_impot' \
+        not in result['module_names'], result['module_names']
+    simulation = base.tax_benefit_system.new_scenario().init_single_entity(
+        period = 2014,
+        parent1 = dict(
+            salaire_de_base = 30000,
+            ),
+        ).new_simulation()
+    assert_near(result['salaire_net'], simulation.calculate_add('salaire_net'), absolute_error_margin = 0.01)
+
+
+if __name__ == '__main__':
+    import logging
+
+    logging.basicConfig(level = logging.ERROR, stream = sys.stdout)
+    test_manifest_is_up_to_date()
+    test_manifest_columns_exist()
+    test_lazy_tax_benefit_system()
+    test_lazy_loading_imports_only_needed_modules()
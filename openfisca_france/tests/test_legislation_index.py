@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+
+
+# OpenFisca -- A versatile microsimulation software
+# By: OpenFisca Team <contact@openfisca.fr>
+#
+# Copyright (C) 2011, 2012, 2013, 2014, 2015 OpenFisca Team
+# https://github.com/openfisca
+#
+# This file is part of OpenFisca.
+#
+# OpenFisca is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# OpenFisca is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+from openfisca_core import periods
+
+from ..dependency_graph import record_dependency_graph
+from ..legislation_index import LegislationIndex
+from ..model.prelevements_obligatoires.prelevements_sociaux.cotisations_sociales.base import (
+    compute_cotisations_bundle, get_cotisations_bundle, get_type_sal_partition)
+from . import base
+
+
+def test_cotisations_bundle_through_index():
+    period = periods.period('2014-01')
+    simulation = base.tax_benefit_system.new_scenario().init_single_entity(
+        axes = [
+            dict(
+                count = 5,
+                max = 100000,
+                min = 0,
+                name = 'salaire_de_base',
+                ),
+            ],
+        period = period,
+        parent1 = dict(),
+        ).new_simulation()
+    reference_bundle = compute_cotisations_bundle(
+        bareme_by_type_sal_name = simulation.legislation_at(period.start).cotsoc.cotisations_salarie,
+        base = simulation.calculate('assiette_cotisations_sociales', period),
+        plafond_securite_sociale = simulation.calculate('plafond_securite_sociale', period),
+        type_sal_partition = get_type_sal_partition(simulation, period),
+        )
+
+    legislation_index = LegislationIndex()
+    legislation_index.attach(simulation, [(('cotisations_salariales', unicode(period)), None)])
+    try:
+        column_index_by_name, cotisations = compute_cotisations_bundle(
+            bareme_by_type_sal_name = simulation.legislation_at(period.start).cotsoc.cotisations_salarie,
+            base = simulation.calculate('assiette_cotisations_sociales', period),
+            plafond_securite_sociale = simulation.calculate('plafond_securite_sociale', period),
+            type_sal_partition = get_type_sal_partition(simulation, period),
+            )
+        # Legislation nodes are wrapped once, so the bundle cache keyed by node identity is hit.
+        bundle = get_cotisations_bundle(simulation, period, cotisation_type = 'salarie')
+        assert get_cotisations_bundle(simulation, period, cotisation_type = 'salarie') is bundle
+    finally:
+        legislation_index.detach(simulation)
+
+    assert column_index_by_name == reference_bundle[0]
+    assert (cotisations == reference_bundle[1]).all()
+    paths = legislation_index.variables_name_by_path.keys()
+    assert any(path[:4] == ('children', 'cotsoc', 'children', 'cotisations_salarie') for path in paths), paths
+    assert not any(path[-1] in ('get', 'iteritems', 'itervalues', 'keys') for path in paths)
+
+
+def test_cotisation_rate_selects_cotisations():
+    # Every cotisation reads its own barème, even when the bundle of all the cotisations comes from the cache.
+    simulation = base.tax_benefit_system.new_scenario().init_single_entity(
+        period = 2014,
+        parent1 = dict(
+            salaire_de_base = 30000,
+            ),
+        ).new_simulation()
+    legislation_index = LegislationIndex()
+    record_dependency_graph(simulation, ['cotisations_salariales'], legislation_index = legislation_index)
+    for bareme_name, variable_name in (
+            ('arrco', 'arrco_salarie'),
+            ('assedic', 'chomage_salarie'),
+            ('maladie', 'mmid_salarie'),
+            ('vieillesse', 'vieillesse_plafonnee_salarie'),
+            ('vieillesse_deplafonnee', 'vieillesse_deplafonnee_salarie'),
+            ):
+        changed_path = ('children', 'cotsoc', 'children', 'cotisations_salarie', 'children', 'prive_non_cadre',
+            'children', bareme_name, 'brackets', 0, 'rate')
+        assert variable_name in set(legislation_index.iter_variables_name(changed_path)), bareme_name
+
+
+if __name__ == '__main__':
+    import logging
+    import sys
+
+    logging.basicConfig(level = logging.ERROR, stream = sys.stdout)
+    test_cotisations_bundle_through_index()
+    test_cotisation_rate_selects_cotisations()
@@ -25,11 +25,14 @@
 
 import datetime
 import json
+import os
+import shutil
+import tempfile
 import xml.etree.ElementTree
 
 from openfisca_core import conv, legislations, legislationsxml
 
-from openfisca_france import init_country
+from openfisca_france import init_country, legislation_snapshots
 
 
 TaxBenefitSystem = init_country()
@@ -91,7 +94,54 @@ def test_legislation_xml_file():
         yield check_legislation_xml_file, year
 
 
+def test_legislation_snapshot():
+    legislation_json = TaxBenefitSystem().legislation_json
+    cache_dir = legislation_snapshots.cache_dir
+    legislation_snapshots.cache_dir = tempfile.mkdtemp()
+    try:
+        SnapshotTaxBenefitSystem = init_country(use_legislation_snapshot = True)
+        # First tax-benefit system saves the snapshot, second one loads it.
+        assert SnapshotTaxBenefitSystem().legislation_json == legislation_json
+        assert len(os.listdir(legislation_snapshots.cache_dir)) == 1
+        assert SnapshotTaxBenefitSystem().legislation_json == legislation_json
+    finally:
+        shutil.rmtree(legislation_snapshots.cache_dir)
+        legislation_snapshots.cache_dir = cache_dir
+
+
+def test_truncated_legislation_snapshot():
+    cache_dir = tempfile.mkdtemp()
+    try:
+        source_file_paths = [TaxBenefitSystem.legislation_xml_file_path]
+        snapshot_file_path = legislation_snapshots.save_legislation_json(source_file_paths, {u'@type': u'Node'},
+            cache_dir = cache_dir)
+        with open(snapshot_file_path, 'rb') as snapshot_file:
+            snapshot = snapshot_file.read()
+        with open(snapshot_file_path, 'wb') as snapshot_file:
+            snapshot_file.write(snapshot[:len(snapshot) // 2])
+        assert legislation_snapshots.load_legislation_json(source_file_paths, cache_dir = cache_dir) is None
+        assert not os.path.exists(snapshot_file_path)
+    finally:
+        shutil.rmtree(cache_dir)
+
+
+def test_unreadable_legislation_snapshot_sources():
+    # For example a zipped installation: no snapshot, but no error either.
+    cache_dir = tempfile.mkdtemp()
+    try:
+        source_file_paths = [os.path.join(cache_dir, 'missing.py')]
+        assert legislation_snapshots.save_legislation_json(source_file_paths, {u'@type': u'Node'},
+            cache_dir = cache_dir) is None
+        assert legislation_snapshots.load_legislation_json(source_file_paths, cache_dir = cache_dir) is None
+        assert os.listdir(cache_dir) == []
+    finally:
+        shutil.rmtree(cache_dir)
+
+
 if __name__ == '__main__':
+    test_legislation_snapshot()
+    test_truncated_legislation_snapshot()
+    test_unreadable_legislation_snapshot_sources()
     test_legislation_xml_file()
     import nose
     nose.core.runmodule(argv = [__file__, '-v', 'test_legislations:test_legislation_xml_file'])
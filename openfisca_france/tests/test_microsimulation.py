@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+
+
+# OpenFisca -- A versatile microsimulation software
+# By: OpenFisca Team <contact@openfisca.fr>
+#
+# Copyright (C) 2011, 2012, 2013, 2014, 2015 OpenFisca Team
+# https://github.com/openfisca
+#
+# This file is part of OpenFisca.
+#
+# OpenFisca is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# OpenFisca is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from ..microsimulation import load_dataset, run_microsimulation, save_dataset
+from . import base
+
+
+def test_chunked_microsimulation():
+    # 3 ménages: a couple with a child, a single person, a couple filing 2 tax returns.
+    array_by_name = dict(
+        idfam = np.array([10, 10, 10, 11, 12, 12]),
+        idfoy = np.array([20, 20, 20, 21, 22, 23]),
+        idmen = np.array([30, 30, 30, 31, 32, 32]),
+        quifam = np.array([0, 1, 2, 0, 0, 1]),
+        quifoy = np.array([0, 1, 2, 0, 0, 0]),
+        quimen = np.array([0, 1, 2, 0, 0, 1]),
+        salaire_de_base = np.array([30000, 20000, 0, 15000, 50000, 0], dtype = np.float32),
+        )
+    temporary_dir = tempfile.mkdtemp()
+    try:
+        input_dir = os.path.join(temporary_dir, 'input')
+        save_dataset(input_dir, array_by_name)
+        variables_name = ['salaire_net', 'irpp', 'revdisp']
+        reference_dir = os.path.join(temporary_dir, 'reference')
+        assert run_microsimulation(input_dir, reference_dir, variables_name, 2014, chunk_size = 100) == 6
+        chunked_dir = os.path.join(temporary_dir, 'chunked')
+        assert run_microsimulation(input_dir, chunked_dir, variables_name, 2014, chunk_size = 1) == 6
+        reference_array_by_name = load_dataset(reference_dir)
+        chunked_array_by_name = load_dataset(chunked_dir)
+        assert (chunked_array_by_name['idfoy'] == [20, 21, 22, 23]).all()
+        assert len(chunked_array_by_name['revdisp']) == 3
+        for name, array in reference_array_by_name.iteritems():
+            assert (chunked_array_by_name[name] == array).all(), name
+
+        # The single person (4th person, 2nd ménage) is computed like the same test case built by a scenario.
+        simulation = base.tax_benefit_system.new_scenario().init_single_entity(
+            period = 2014,
+            parent1 = dict(
+                salaire_de_base = 15000,
+                ),
+            ).new_simulation()
+        assert abs(chunked_array_by_name['salaire_net'][3] - simulation.calculate('salaire_net')[0]) < 0.01
+        assert abs(chunked_array_by_name['irpp'][1] - simulation.calculate('irpp')[0]) < 0.01
+        assert abs(chunked_array_by_name['revdisp'][1] - simulation.calculate('revdisp')[0]) < 0.01
+    finally:
+        shutil.rmtree(temporary_dir)
+
+
+if __name__ == '__main__':
+    import logging
+    import sys
+
+    logging.basicConfig(level = logging.ERROR, stream = sys.stdout)
+    test_chunked_microsimulation()
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+
+
+# OpenFisca -- A versatile microsimulation software
+# By: OpenFisca Team <contact@openfisca.fr>
+#
+# Copyright (C) 2011, 2012, 2013, 2014, 2015 OpenFisca Team
+# https://github.com/openfisca
+#
+# This file is part of OpenFisca.
+#
+# OpenFisca is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# OpenFisca is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+from __future__ import division
+
+import io
+
+from ..profiling import SimulationProfiler
+from . import base
+
+
+def test_profiler():
+    profiler = SimulationProfiler()
+    simulation = base.tax_benefit_system.new_scenario().init_single_entity(
+        period = 2014,
+        parent1 = dict(
+            salaire_de_base = 30000,
+            ),
+        ).new_simulation(profiler = profiler)
+    simulation.calculate('revdisp')
+    simulation.calculate('revdisp')
+    statistics = profiler.statistics_by_key[('revdisp', '2014')]
+    assert statistics.calls == 2
+    assert statistics.cache_hits == 1
+    assert statistics.array_size == 1
+    assert statistics.inclusive_duration >= statistics.exclusive_duration
+    assert len(profiler.statistics_by_key) > 10
+    assert profiler.format_table(limit = 10).startswith(u'variable')
+    collapsed_stacks = io.BytesIO()
+    profiler.write_collapsed_stacks(collapsed_stacks)
+    assert collapsed_stacks.getvalue().startswith('revdisp@2014')
+
+
+if __name__ == '__main__':
+    import logging
+    import sys
+
+    logging.basicConfig(level = logging.ERROR, stream = sys.stdout)
+    test_profiler()
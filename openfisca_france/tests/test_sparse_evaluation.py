@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+
+
+# OpenFisca -- A versatile microsimulation software
+# By: OpenFisca Team <contact@openfisca.fr>
+#
+# Copyright (C) 2011, 2012, 2013, 2014, 2015 OpenFisca Team
+# https://github.com/openfisca
+#
+# This file is part of OpenFisca.
+#
+# OpenFisca is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# OpenFisca is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+import datetime
+
+import numpy as np
+from openfisca_core import periods
+
+from ..model.base import zero_preserving_column_by_name
+from ..sparse_evaluation import get_read_variables_name, is_input_column, SparseEvaluator
+from . import base
+
+
+def check_sparse_evaluation(foyer_fiscal):
+    scenario = base.tax_benefit_system.new_scenario().init_single_entity(
+        foyer_fiscal = foyer_fiscal,
+        parent1 = dict(
+            salaire_de_base = 30000,
+            ),
+        period = 2013,
+        )
+    evaluator = SparseEvaluator(scenario.new_simulation())
+    irpp, = evaluator.calculate(['irpp'])
+    assert abs(irpp - scenario.new_simulation().calculate('irpp')).max() < 0.01
+    return evaluator
+
+
+def test_sparse_evaluation():
+    evaluator = check_sparse_evaluation(dict())
+    assert 'dfppce' in evaluator.skipped_variables_name
+    evaluator = check_sparse_evaluation(dict(f7uf = 1000))
+    assert 'dfppce' not in evaluator.skipped_variables_name
+    assert 'adhcga' in evaluator.skipped_variables_name
+
+
+def test_input_cerfa_boxes_checked_first():
+    simulation = base.tax_benefit_system.new_scenario().init_single_entity(
+        parent1 = dict(
+            f7ac = 100,
+            salaire_de_base = 30000,
+            ),
+        period = 2013,
+        ).new_simulation()
+    evaluator = SparseEvaluator(simulation)
+    column = base.tax_benefit_system.column_by_name['cotsyn']
+    assert not evaluator.is_null_formula(column, periods.period(2013))
+    # The non-null box f7ac is enough: the formulas read by cotsyn (salaire_imposable, etc) are not computed.
+    assert [variable_name for variable_name, period in evaluator.null_by_key] == ['f7ac'], evaluator.null_by_key
+
+
+def check_zero_preserving_formula(column_name, year):
+    period = periods.period('year', year)
+    simulation = base.tax_benefit_system.new_scenario().init_single_entity(
+        enfants = [
+            dict(birth = datetime.date(year - 10, 1, 1)),
+            ],
+        parent1 = dict(birth = datetime.date(year - 40, 1, 1)),
+        parent2 = dict(birth = datetime.date(year - 40, 1, 1)),
+        period = period,
+        ).new_simulation()
+    column_by_name = base.tax_benefit_system.column_by_name
+    for variable_name in sorted(get_read_variables_name(column_name)):
+        read_column = column_by_name[variable_name]
+        holder = simulation.get_or_new_holder(variable_name)
+        if read_column.cerfa_field is not None or zero_preserving_column_by_name.get(variable_name) is read_column:
+            # The inputs which must be null for the formula to return 0
+            if not is_input_column(read_column):
+                holder.set_array(period, np.zeros(holder.entity.count, dtype = read_column.dtype))
+        elif read_column.dtype.kind == 'b':
+            holder.set_array(period, np.ones(holder.entity.count, dtype = read_column.dtype))
+        elif read_column.dtype.kind in 'iu':
+            holder.set_array(period, np.ones(holder.entity.count, dtype = read_column.dtype))
+        elif read_column.dtype.kind == 'f':
+            holder.set_array(period, np.ones(holder.entity.count, dtype = read_column.dtype) * 10000)
+    array = simulation.calculate(column_name, period)
+    assert not array.any(), u'{}@{} is not null: {}'.format(column_name, year, array).encode('utf-8')
+
+
+def test_zero_preserving_formulas():
+    # A formula wrongly declared zero-preserving would be skipped while returning a non-null value.
+    for column_name in sorted(zero_preserving_column_by_name):
+        if get_read_variables_name(column_name) is None:
+            continue  # Never skipped
+        for year in range(2006, 2015):
+            yield check_zero_preserving_formula, column_name, year
+
+
+if __name__ == '__main__':
+    import logging
+    import sys
+
+    logging.basicConfig(level = logging.ERROR, stream = sys.stdout)
+    test_sparse_evaluation()
+    test_input_cerfa_boxes_checked_first()
+    for function_and_arguments in test_zero_preserving_formulas():
+        function_and_arguments[0](*function_and_arguments[1:])
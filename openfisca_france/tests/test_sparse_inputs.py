@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+
+
+# OpenFisca -- A versatile microsimulation software
+# By: OpenFisca Team <contact@openfisca.fr>
+#
+# Copyright (C) 2011, 2012, 2013, 2014, 2015 OpenFisca Team
+# https://github.com/openfisca
+#
+# This file is part of OpenFisca.
+#
+# OpenFisca is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# OpenFisca is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+import numpy as np
+
+from ..sparse_inputs import SparseInputStore
+from . import base
+
+
+def test_sparse_inputs():
+    scenario = base.tax_benefit_system.new_scenario().init_single_entity(
+        axes = [
+            dict(
+                count = 10,
+                max = 100000,
+                min = 0,
+                name = 'salaire_de_base',
+                ),
+            ],
+        period = 2013,
+        parent1 = dict(),
+        )
+    f7uf = np.zeros(10)
+    f7uf[[2, 7]] = [300, 1500]
+
+    dense_simulation = scenario.new_simulation()
+    dense_simulation.get_or_new_holder('f7uf').set_array(dense_simulation.period, f7uf)
+    simulation = scenario.new_simulation()
+    store = SparseInputStore(simulation)
+    store.set_dense_input('f7uf', simulation.period, f7uf)
+    assert store.nbytes < store.dense_nbytes
+    assert store.materialised_arrays_count == 0
+    irpp = simulation.calculate('irpp')
+    assert store.materialised_arrays_count == 1
+    assert abs(irpp - dense_simulation.calculate('irpp')).max() < 0.01
+
+
+if __name__ == '__main__':
+    import logging
+    import sys
+
+    logging.basicConfig(level = logging.ERROR, stream = sys.stdout)
+    test_sparse_inputs()
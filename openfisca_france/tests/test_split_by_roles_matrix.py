@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+
+
+# OpenFisca -- A versatile microsimulation software
+# By: OpenFisca Team <contact@openfisca.fr>
+#
+# Copyright (C) 2011, 2012, 2013, 2014, 2015 OpenFisca Team
+# https://github.com/openfisca
+#
+# This file is part of OpenFisca.
+#
+# OpenFisca is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# OpenFisca is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+import datetime
+import gc
+
+import numpy as np
+from openfisca_core import conv, periods
+
+from ..model.base import ENFS, split_by_roles_matrix
+from ..model.prestations.prestations_familiales.base_ressource import age_en_mois_benjamin, nb_enf
+from . import base
+
+
+def new_simulation(period):
+    # A famille with 2 children (9 roles of children, beyond its roles_count) and a famille without children
+    scenario = base.tax_benefit_system.new_scenario()
+    conv.check(scenario.make_json_or_python_to_attributes())(dict(
+        period = period,
+        test_case = dict(
+            familles = [
+                dict(enfants = ['enfant1', 'enfant2'], parents = ['parent1']),
+                dict(parents = ['parent2']),
+                ],
+            foyers_fiscaux = [
+                dict(declarants = ['parent1'], personnes_a_charge = ['enfant1', 'enfant2']),
+                dict(declarants = ['parent2']),
+                ],
+            individus = [
+                dict(birth = datetime.date(1970, 1, 1), id = 'parent1'),
+                dict(birth = datetime.date(2001, 5, 1), id = 'enfant1', salaire_de_base = 20000),
+                dict(birth = datetime.date(2012, 3, 1), id = 'enfant2'),
+                dict(birth = datetime.date(1980, 1, 1), id = 'parent2'),
+                ],
+            menages = [
+                dict(enfants = ['enfant1', 'enfant2'], personne_de_reference = 'parent1'),
+                dict(personne_de_reference = 'parent2'),
+                ],
+            ),
+        ))
+    return scenario.new_simulation()
+
+
+def test_split_by_roles_matrix():
+    period = periods.period('2014-01')
+    simulation = new_simulation(period)
+    formula = simulation.get_or_new_holder('af_age_aine').formula
+    age_holder = simulation.compute('age', period)
+    smic55 = simulation.calculate('smic55', period)
+    for array_or_dated_holder in (age_holder, simulation.compute('age_en_mois', period), smic55, smic55 * 1.5):
+        by_role = formula.split_by_roles(array_or_dated_holder, roles = ENFS)
+        matrix = split_by_roles_matrix(formula, array_or_dated_holder, roles = ENFS)
+        assert matrix.shape == (2, len(ENFS))
+        for column_index, role in enumerate(ENFS):
+            assert (matrix[:, column_index] == by_role[role]).all(), (role, matrix, by_role)
+    # Missing children are padded with the default of age.
+    age = split_by_roles_matrix(formula, age_holder, roles = ENFS)
+    assert (age[1] == -9999).all()
+    assert (age[0, 2:] == -9999).all()
+    # The matrix is cached as long as the persons array is alive.
+    assert split_by_roles_matrix(formula, age_holder, roles = ENFS) is age
+
+
+def test_split_by_roles_matrix_release():
+    period = periods.period('2014-01')
+    simulation = new_simulation(period)
+    formula = simulation.get_or_new_holder('af_age_aine').formula
+    age_holder = simulation.get_or_new_holder('age')
+    split_by_roles_matrix(formula, simulation.compute('age', period), roles = ENFS)
+    assert any(key[0] == 'age' for key in simulation.roles_matrix_by_key)
+    # When the persons array is released (for example by ReleasingEvaluator), its matrix is released too.
+    age_holder.delete_arrays()
+    gc.collect()
+    assert not any(key[0] == 'age' for key in simulation.roles_matrix_by_key), simulation.roles_matrix_by_key.keys()
+
+
+def test_matrix_helpers():
+    period = periods.period('2014-01')
+    simulation = new_simulation(period)
+    formula = simulation.get_or_new_holder('af_age_aine').formula
+    law = simulation.legislation_at(period.start).fam.af
+    age_holder = simulation.compute('age', period)
+    age_en_mois_holder = simulation.compute('age_en_mois', period)
+    smic55_holder = simulation.compute('smic55', period)
+    af_enfant_a_charge_holder = simulation.compute('af_enfant_a_charge', period)
+
+    # Reference implementations, on the dicts of split_by_roles
+    ages = formula.split_by_roles(age_holder, roles = ENFS)
+    smic55 = formula.split_by_roles(smic55_holder, roles = ENFS)
+    expected_nb_enf = np.zeros(2, dtype = np.int32)
+    for role, age in ages.iteritems():
+        expected_nb_enf += (law.age1 <= age) & (age <= law.age2) & np.logical_not(smic55[role])
+    expected_benjamin = 12 * 9999
+    for age_en_mois in formula.split_by_roles(age_en_mois_holder, roles = ENFS).itervalues():
+        is_benjamin = (age_en_mois < expected_benjamin) & (age_en_mois != -9999)
+        expected_benjamin = is_benjamin * age_en_mois + np.logical_not(is_benjamin) * expected_benjamin
+    af_enfants_a_charge = formula.split_by_roles(af_enfant_a_charge_holder, roles = ENFS)
+    expected_age_aine = -9999
+    for role, age in ages.iteritems():
+        a_charge = af_enfants_a_charge[role] * (age <= law.age2)
+        aine_potentiel = a_charge * (age > expected_age_aine)
+        expected_age_aine = aine_potentiel * age + np.logical_not(aine_potentiel) * expected_age_aine
+
+    assert (nb_enf(split_by_roles_matrix(formula, age_holder, roles = ENFS),
+        split_by_roles_matrix(formula, smic55_holder, roles = ENFS), law.age1, law.age2) == expected_nb_enf).all()
+    benjamin = age_en_mois_benjamin(split_by_roles_matrix(formula, age_en_mois_holder, roles = ENFS))
+    assert (benjamin == expected_benjamin).all(), (benjamin, expected_benjamin)
+    assert benjamin[1] == 12 * 9999  # Famille without children
+    assert (simulation.calculate('af_age_aine', period) == expected_age_aine).all()
+    # smic55 given as a plain boolean array, as in af_nbenf_fonc
+    smic55_array = smic55_holder.array.copy()
+    assert (nb_enf(split_by_roles_matrix(formula, age_holder, roles = ENFS),
+        split_by_roles_matrix(formula, smic55_array, roles = ENFS), law.age1, law.age2) == expected_nb_enf).all()
+    simulation.calculate('af_nbenf_fonc', period)
+
+
+if __name__ == '__main__':
+    import logging
+    import sys
+
+    logging.basicConfig(level = logging.ERROR, stream = sys.stdout)
+    test_split_by_roles_matrix()
+    test_split_by_roles_matrix_release()
+    test_matrix_helpers()
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+
+
+# OpenFisca -- A versatile microsimulation software
+# By: OpenFisca Team <contact@openfisca.fr>
+#
+# Copyright (C) 2011, 2012, 2013, 2014, 2015 OpenFisca Team
+# https://github.com/openfisca
+#
+# This file is part of OpenFisca.
+#
+# OpenFisca is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# OpenFisca is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+import datetime
+
+from . import base
+
+
+def check_trusted_scenario(scenario_arguments):
+    validated_simulation = base.tax_benefit_system.new_scenario().init_single_entity(**scenario_arguments) \
+        .new_simulation()
+    trusted_simulation = base.tax_benefit_system.new_scenario().init_single_entity(trusted = True,
+        **scenario_arguments).new_simulation()
+    for variable_name in ('birth', 'quifam', 'quimen', 'idfoy', 'quifoy'):
+        assert (trusted_simulation.calculate(variable_name) == validated_simulation.calculate(variable_name)).all(), \
+            variable_name
+    for variable_name in ('irpp', 'revdisp'):
+        assert abs(trusted_simulation.calculate(variable_name) - validated_simulation.calculate(variable_name)).max() \
+            < 0.01, variable_name
+
+
+def test_trusted_scenario():
+    yield check_trusted_scenario, dict(
+        parent1 = dict(birth = datetime.date(1980, 1, 1), salaire_de_base = 30000),
+        period = 2013,
+        )
+    yield check_trusted_scenario, dict(
+        enfants = [
+            dict(birth = datetime.date(2005, 1, 1)),
+            dict(birth = datetime.date(2010, 1, 1)),
+            ],
+        foyer_fiscal = dict(f7uf = 300),
+        menage = dict(loyer = 600, statut_occupation = 4),
+        parent1 = dict(birth = datetime.date(1970, 1, 1), salaire_de_base = 40000, statmarit = 1),
+        parent2 = dict(birth = datetime.date(1972, 1, 1), salaire_de_base = 15000, statmarit = 1),
+        period = 2014,
+        )
+
+
+if __name__ == '__main__':
+    import logging
+    import sys
+
+    logging.basicConfig(level = logging.ERROR, stream = sys.stdout)
+    for function, scenario_arguments in test_trusted_scenario():
+        function(scenario_arguments)
@@ -228,7 +228,141 @@ def check_calculate_output(yaml_path, name, period_str, test, force):
                     )
 
 
-def test(force = False, name_filter = None, options_by_path = None):
+# Batched tests
+
+
+id_keys_by_entity_key_plural = dict(
+    familles = ['enfants', 'parents'],
+    foyers_fiscaux = ['declarants', 'personnes_a_charge'],
+    individus = [],
+    menages = ['autres', 'conjoint', 'enfants', 'personne_de_reference'],
+    )
+
+
+class TestsBatch(object):
+    """Simulation shared by several tests having the same period and the same input variables.
+
+    Each test keeps its own entities in the shared test case, so that its results can be extracted from the arrays
+    computed for all the tests.
+    """
+    error = None
+    simulation = None
+    slice_by_entity_key_plural_by_test_index = None
+    value_by_variable_and_period = None
+
+    def __init__(self, tax_benefit_system, period, tests):
+        self.period = period
+        self.tax_benefit_system = tax_benefit_system
+        self.tests = tests
+        self.value_by_variable_and_period = {}
+
+    def build_simulation(self):
+        test_case_json = dict(
+            (entity_key_plural, [])
+            for entity_key_plural in id_keys_by_entity_key_plural
+            )
+        self.slice_by_entity_key_plural_by_test_index = []
+        for test_index, test in enumerate(self.tests):
+            scenario = test['scenario']
+            scenario.suggest()
+            slice_by_entity_key_plural = {}
+            for entity_key_plural, entities_json in scenario.to_json()['test_case'].iteritems():
+                start = len(test_case_json[entity_key_plural])
+                for entity_json in entities_json:
+                    entity_json = entity_json.copy()
+                    # Prefix ids, to keep the entities of each test separate.
+                    for key in ['id'] + id_keys_by_entity_key_plural[entity_key_plural]:
+                        value = entity_json.get(key)
+                        if isinstance(value, list):
+                            entity_json[key] = [u'{}-{}'.format(test_index, id) for id in value]
+                        elif value is not None:
+                            entity_json[key] = u'{}-{}'.format(test_index, value)
+                    test_case_json[entity_key_plural].append(entity_json)
+                slice_by_entity_key_plural[entity_key_plural] = slice(start, len(test_case_json[entity_key_plural]))
+            self.slice_by_entity_key_plural_by_test_index.append(slice_by_entity_key_plural)
+        scenario = self.tax_benefit_system.new_scenario()
+        conv.check(scenario.make_json_or_python_to_attributes())(dict(
+            period = unicode(self.period),
+            test_case = test_case_json,
+            ))
+        return scenario.new_simulation()
+
+    def calculate(self, test_index, variable_name, period = None, calculate_output = False):
+        """Return the values of the given variable for the entities of a test, or raise the error of the batch."""
+        if self.error is not None:
+            raise self.error
+        try:
+            if self.simulation is None:
+                self.simulation = self.build_simulation()
+            key = (variable_name, period, calculate_output)
+            value = self.value_by_variable_and_period.get(key)
+            if value is None:
+                if calculate_output:
+                    value = self.simulation.calculate_output(variable_name, period)
+                else:
+                    value = self.simulation.calculate(variable_name, period)
+                self.value_by_variable_and_period[key] = value
+        except Exception as error:
+            self.error = error
+            raise
+        entity_symbol = self.tax_benefit_system.column_by_name[variable_name].entity
+        entity_key_plural = [
+            entity_class.key_plural
+            for entity_class in self.tax_benefit_system.entity_class_by_key_plural.itervalues()
+            if entity_class.symbol == entity_symbol
+            ][0]
+        return value[self.slice_by_entity_key_plural_by_test_index[test_index][entity_key_plural]]
+
+
+def get_batch_key(test):
+    """Return the key of the tests which can share a simulation, or None when the test must run alone."""
+    scenario = test['scenario']
+    if scenario.axes or scenario.test_case is None:
+        return None
+    # A variable given to one entity is set for all the entities of the simulation, and would hide the formula of
+    # the other tests: only batch tests giving the same variables.
+    return (scenario.period, frozenset(
+        (entity_key_plural, key, tuple(sorted(value)) if isinstance(value, dict) else None)
+        for entity_key_plural, entities in scenario.test_case.iteritems()
+        for entity in (entities or [])
+        for key, value in entity.iteritems()
+        if key != 'id' and key not in id_keys_by_entity_key_plural[entity_key_plural]
+        ))
+
+
+def check_batched(yaml_path, name, period_str, test, force, batch, test_index, calculate_output):
+    output_variables = test.get(u'output_variables')
+    if output_variables is None:
+        return
+    assert_near_function = assert_near_calculate_output if calculate_output else assert_near
+    output_variables_name_to_ignore = test.get(u'output_variables_name_to_ignore') or set()
+    for variable_name, expected_value in output_variables.iteritems():
+        if not force and variable_name in output_variables_name_to_ignore:
+            continue
+        expected_value_by_period = expected_value if isinstance(expected_value, dict) else {None: expected_value}
+        for requested_period, expected_value_at_period in expected_value_by_period.iteritems():
+            try:
+                value = batch.calculate(test_index, variable_name, requested_period,
+                    calculate_output = calculate_output)
+            except Exception:
+                # Run the test alone, to report its own error.
+                log.info(u'Batch failed; running test {} alone'.format(name))
+                checker = check_calculate_output if calculate_output else check
+                return checker(yaml_path, name, period_str, test, force)
+            assert_near_function(
+                value,
+                expected_value_at_period,
+                absolute_error_margin = test.get('absolute_error_margin'),
+                message = u'{}@{}: '.format(variable_name, requested_period or period_str),
+                relative_error_margin = test.get('relative_error_margin'),
+                )
+
+
+def test(force = False, name_filter = None, options_by_path = None, batched = True):
+    """Yield the YAML tests.
+
+    When batched is True, tests sharing the same period and input variables are computed in a single simulation.
+    """
     if isinstance(name_filter, str):
         name_filter = name_filter.decode('utf-8')
     if options_by_path is None:
@@ -255,6 +389,7 @@ def test(force = False, name_filter = None, options_by_path = None):
             tax_benefit_system = base.tax_benefit_system,
             ) if reform_keys is not None else base.tax_benefit_system
 
+        checkers_and_arguments_by_batch_key = collections.OrderedDict()
         for yaml_path in yaml_paths:
             filename_core = os.path.splitext(os.path.basename(yaml_path))[0]
             with open(yaml_path) as yaml_file:
@@ -290,8 +425,22 @@ def test(force = False, name_filter = None, options_by_path = None):
                         and name_filter not in (test.get('keywords', [])):
                     continue
                 checker = check_calculate_output if options['calculate_output'] else check
-                yield checker, yaml_path, test.get('name') or filename_core, unicode(test['scenario'].period), test, \
-                    force
+                checker_and_arguments = (checker, yaml_path, test.get('name') or filename_core,
+                    unicode(test['scenario'].period), test, force)
+                batch_key = get_batch_key(test) if batched else None
+                if batch_key is None:
+                    yield checker_and_arguments
+                else:
+                    checkers_and_arguments_by_batch_key.setdefault(batch_key, []).append(checker_and_arguments)
+
+        for checkers_and_arguments in checkers_and_arguments_by_batch_key.itervalues():
+            if len(checkers_and_arguments) == 1:
+                yield checkers_and_arguments[0]
+                continue
+            batch = TestsBatch(tax_benefit_system_for_path, checkers_and_arguments[0][4]['scenario'].period,
+                [arguments[4] for arguments in checkers_and_arguments])
+            for test_index, checker_and_arguments in enumerate(checkers_and_arguments):
+                yield (check_batched,) + checker_and_arguments[1:] + (batch, test_index, options['calculate_output'])
 
 
 if __name__ == "__main__":
@@ -304,6 +453,8 @@ if __name__ == "__main__":
     parser.add_argument('-f', '--force', action = 'store_true', default = False,
         help = 'force testing of tests with "ignore" flag and formulas belonging to "ignore_output_variables" list')
     parser.add_argument('-n', '--name', default = None, help = "partial name of tests to execute")
+    parser.add_argument('--no-batch', action = 'store_true', default = False,
+        help = "compute each test in its own simulation")
     parser.add_argument('-v', '--verbose', action = 'store_true', default = False, help = "increase output verbosity")
     args = parser.parse_args()
     logging.basicConfig(level = logging.DEBUG if args.verbose else logging.WARNING, stream = sys.stdout)
@@ -324,13 +475,15 @@ if __name__ == "__main__":
         options_by_path = None
 
     tests_found = False
-    for test_index, (function, yaml_path, name, period_str, test, force) in enumerate(
+    for test_index, function_and_arguments in enumerate(
             test(
+                batched = not args.no_batch,
                 force = args.force,
                 name_filter = args.name,
                 options_by_path = options_by_path,
                 ),
             1):
+        function, yaml_path, name, period_str, test, force = function_and_arguments[:6]
         keywords = test.get('keywords', [])
         title = "Test {}: {} {}{} - {}".format(
             test_index,
@@ -342,7 +495,7 @@ if __name__ == "__main__":
         print("=" * len(title))
         print(title)
         print("=" * len(title))
-        function(yaml_path, name, period_str, test, force)
+        function(*function_and_arguments[1:])
         tests_found = True
     if not tests_found:
         print("No test found!")
@@ -57,7 +57,6 @@ setup(
         'numpy >= 1.6',
         'OpenFisca-Core >= 0.5.0',
         'PyYAML >= 3.10',
-        # 'scipy >= 0.12',  # Only for inversion_revenus reform
         # 'pandas >= 0.13',  # Only for taxipp_utils.py which is ignored in Makefile
         ],
     message_extractors = {'openfisca_france': [